@@ -1,34 +1,193 @@
-import math
-from flask import Flask, render_template, request, make_response
-from pymongo import MongoClient
-
-app = Flask(__name__)
-
-# MongoDB setup
-MONGO_URI = 'mongodb://localhost:27017/'
-DATABASE_NAME = 'university_db'
-COLLECTION_NAME = 'professors'
-professors_collection = None
-client = None
-
-try:
-    client = MongoClient(MONGO_URI)
-    db = client[DATABASE_NAME]
-    professors_collection = db[COLLECTION_NAME]
-    
-    # Create an index on 'name' for faster lookups/sorting
-    professors_collection.create_index("name")
-    
-except Exception as e:
-    print(f"Error connecting to MongoDB: {e}")
-    professors_collection = None
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+from datetime import datetime
+from urllib.parse import urlencode
 
+from bson import json_util
+from flask import Blueprint, Flask, Response, current_app, g, jsonify, render_template, request, make_response, stream_with_context, url_for
+from pymongo.errors import ConnectionFailure
 
-@app.route('/')
-def index():
-    if professors_collection is None:
-        return "<h1>Database Connection Error</h1><p>Failed to connect to MongoDB. Please ensure the MongoDB server is running.</p>", 500
-    
+from db_client import MongoConnection, config_from_env
+from db_schema import SCRAPED_AT_FORMAT, ensure_indexes
+from response_cache import TTLCache
+from storage import EXPORT_FIELDS, create_storage
+import telemetry
+
+bp = Blueprint('professors', __name__)
+
+
+# -------------------------------------------
+# Storage
+# -------------------------------------------
+# Every view goes through the storage backend (storage.py): MongoDB by
+# default, or STORAGE=memory to serve professors.jsonl (STORAGE_PATH) from
+# an in-process index. The Mongo client is created lazily, once per process
+# (see db_client.py), so importing the app or forking workers never touches
+# the database. Indexes are not created here either: run `python app.py
+# migrate` once per deployment (import_to_mongo.py also builds them on every
+# import).
+def storage():
+    return current_app.extensions['storage']
+
+
+# -------------------------------------------
+# Caches: totals, query results and rendered pages
+# -------------------------------------------
+# Every key includes the dataset version, which import_to_mongo.py bumps
+# (or the memory backend derives from its source file), so an import
+# invalidates all of them at once.
+count_cache = TTLCache(maxsize=512, ttl=60)
+results_cache = TTLCache(maxsize=256, ttl=300)
+page_cache = TTLCache(maxsize=256, ttl=300)
+cache_stats = {"not_modified": 0}
+
+
+def dataset_version():
+    return storage().dataset_version()
+
+
+def facet_index(version):
+    return storage().facet_index(version)
+
+
+def make_etag(version, view_key, theme):
+    raw = json_util.dumps([version, theme, list(view_key)])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+# -------------------------------------------
+# Listing query (shared by the HTML view and the API)
+# -------------------------------------------
+def parse_listing_args(args):
+    """Read the search / filter / sort / page parameters of a listing request."""
+    search_term = args.get('search', '').strip()
+    # Research field filtering
+    research_fields_filter_raw = args.get('fields', '').strip()
+    return {
+        "page": max(args.get('page', 1, type=int) or 1, 1),
+        "search_term": search_term,
+        # Searches default to relevance ranking, plain listings to university
+        "sort_by": args.get('sort_by', 'relevance' if search_term else 'university').strip(),
+        "sort_dir": args.get('sort_dir', 'asc').strip(),
+        "research_fields_filter_raw": research_fields_filter_raw,
+        "research_fields_filter": [f.strip() for f in research_fields_filter_raw.split(',') if f.strip()],
+        "after_token": args.get('after', ''),
+        "before_token": args.get('before', ''),
+    }
+
+
+def query_professors(search_term, research_fields_filter, sort_by, sort_dir, page,
+                     after_token='', before_token='', per_page=20, version=None):
+    """
+    Run the listing query for one page.
+
+    Returns a dict with professors, total_count, total_pages and the
+    prev/next keyset cursors.
+    """
+    return storage().query_page(search_term, research_fields_filter, sort_by, sort_dir, page,
+                                after_token, before_token, per_page=per_page, version=version)
+
+
+# -------------------------------------------
+# Listing links
+# -------------------------------------------
+# Every link on the listing page is the current view with one or two
+# parameters changed. They are built here once per render - one per sort
+# header, page number and distinct research field on the page - instead of
+# by url_for calls inside the template's per-row loops.
+LINK_PARAMS = ("page", "search", "sort_by", "sort_dir", "fields", "theme", "after", "before")
+SORT_COLUMNS = ("name", "university", "major", "h_index")
+
+
+class ListingLinks:
+    """Query-string builder for one listing view."""
+
+    def __init__(self, base, params, theme):
+        self.base = base
+        self.state = {
+            "page": params["page"],
+            "search": params["search_term"],
+            "sort_by": params["sort_by"],
+            "sort_dir": params["sort_dir"],
+            "fields": params["research_fields_filter_raw"],
+            "theme": theme,
+        }
+
+    def url(self, **changes):
+        merged = {**self.state, **changes}
+        query = urlencode([(key, merged[key]) for key in LINK_PARAMS if merged.get(key) not in (None, "")])
+        return f"{self.base}?{query}" if query else self.base
+
+    def build(self, params, results, theme):
+        """Every link target index.html / _results.html interpolates."""
+        page = params["page"]
+        sort_by = params["sort_by"]
+        sort_dir = params["sort_dir"]
+        active = params["research_fields_filter"]
+        total_pages = results["total_pages"]
+
+        def with_fields(fields):
+            return self.url(page=1, fields=",".join(fields))
+
+        sort = {}
+        for field in SORT_COLUMNS:
+            new_dir = 'desc' if sort_by == field and sort_dir == 'asc' else 'asc'
+            icon = ' ▲' if sort_by == field and sort_dir == 'asc' else (' ▼' if sort_by == field and sort_dir == 'desc' else '')
+            sort[field] = (self.url(page=1, sort_by=field, sort_dir=new_dir), icon)
+
+        # One link per distinct field on the page: toggles it in the filter
+        fields = {}
+        for professor in results["professors"]:
+            for field in professor.get("research_fields") or []:
+                if field not in fields:
+                    is_active = field in active
+                    next_fields = [f for f in active if f != field] if is_active else active + [field]
+                    fields[field] = (with_fields(next_fields), is_active)
+
+        return {
+            "theme": self.url(theme='light' if theme == 'dark' else 'dark'),
+            "remove_filters": [(field, with_fields([f for f in active if f != field])) for field in active],
+            "sort": sort,
+            "fields": fields,
+            "prev": self.url(page=page - 1, before=results["prev_cursor"]) if page > 1 else None,
+            "next": self.url(page=page + 1, after=results["next_cursor"]) if page < total_pages else None,
+            "pages": [(number, None if number is None or number == page else self.url(page=number))
+                      for number in page_window(page, total_pages)],
+        }
+
+
+def page_window(page, total_pages):
+    """
+    Page numbers around page, plus the first and last page; None marks an
+    ellipsis. Only the handful of visible pages is looked at, however
+    many pages there are.
+    """
+    window = []
+    candidates = sorted({1, total_pages, *range(page - 2, page + 3)})
+    for i in candidates:
+        if not 1 <= i <= total_pages:
+            continue
+        if i == page or page - 3 < i < page + 3:
+            window.append(i)
+        elif i == 1 and page > 3:
+            window.extend([1, None])
+        elif i == total_pages and page < total_pages - 2:
+            window.extend([None, total_pages])
+    return window
+
+
+# -------------------------------------------
+# Listing page
+# -------------------------------------------
+def render_listing(template):
+    """
+    index() and results_fragment(): the same view, rendered as the full
+    page or as just the filters, table and pagination.
+    """
     # Theme handling
     theme = request.cookies.get('theme', 'dark')
     
@@ -37,92 +196,269 @@ def index():
     if requested_theme in ['light', 'dark']:
         theme = requested_theme
 
-    page = request.args.get('page', 1, type=int)
-    search_term = request.args.get('search', '').strip()
-    sort_by = request.args.get('sort_by', 'university').strip()
-    sort_dir = request.args.get('sort_dir', 'asc').strip()
-    
-    # Research field filtering
-    research_fields_filter_raw = request.args.get('fields', '').strip()
-    research_fields_filter = [f.strip() for f in research_fields_filter_raw.split(',') if f.strip()]
-    
-    per_page = 20
-
-    query = {}
-    if search_term:
-        # Search by name, university, major, or research fields (case-insensitive regex)
-        regex_query = {"$regex": search_term, "$options": "i"}
-        query = {
-            "$or": [
-                {"name": regex_query},
-                {"university": regex_query},
-                {"major": regex_query},
-                {"research_fields": regex_query}
-            ]
-        }
-    
-    # Add research fields filter to query
-    if research_fields_filter:
-        # Match documents where research_fields array contains ALL selected fields
-        query["research_fields"] = {"$all": research_fields_filter}
-        
-    
-    total_count = professors_collection.count_documents(query)
-    total_pages = math.ceil(total_count / per_page)
-    
-    # Determine sorting parameters
-    ALLOWED_SORT_FIELDS = ['name', 'university', 'major', 'h_index']
-    
-    # Set default sort field to 'university' ascending (1) as requested.
-    sort_field = sort_by if sort_by in ALLOWED_SORT_FIELDS else 'university'
-    sort_direction = 1 if sort_dir.lower() == 'asc' else -1
-    
-    if sort_field == 'h_index':
-        # Use aggregation to sort h_index numerically (assuming it's stored as string and needs casting)
-        pipeline = [
-            {"$match": query},
-            {
-                "$addFields": {
-                    # Use $convert to safely cast h_index string to integer for numerical sorting.
-                    # If $h_index is null or missing, $ifNull handles it by returning "0" as input.
-                    # If the input (including empty string "") fails conversion, onError returns 0.
-                    "h_index_numeric": {
-                        "$convert": {
-                            "input": {"$ifNull": ["$h_index", "0"]},
-                            "to": "int",
-                            "onError": 0,
-                            "onNull": 0
-                        }
-                    }
-                }
-            },
-            {"$sort": {"h_index_numeric": sort_direction}},
-            {"$skip": (page - 1) * per_page},
-            {"$limit": per_page}
-        ]
-        professors = list(professors_collection.aggregate(pipeline))
+    params = parse_listing_args(request.args)
+    page = params["page"]
+    search_term = params["search_term"]
+    sort_by = params["sort_by"]
+    sort_dir = params["sort_dir"]
+    research_fields_filter = params["research_fields_filter"]
+    after_token = params["after_token"]
+    before_token = params["before_token"]
+
+    # Normalized view key; the dataset version makes every import a new keyspace
+    version = dataset_version()
+    view_key = (search_term, tuple(research_fields_filter), sort_by, sort_dir.lower(), page,
+                after_token, before_token)
+    etag = make_etag(version, (template,) + view_key, theme)
+
+    # Conditional request for an unchanged view: no database work at all
+    if etag in request.if_none_match:
+        response = make_response('', 304)
+        cache_stats["not_modified"] += 1
     else:
-        # Use standard find for string/default sorting
-        professors = list(professors_collection.find(query)
-                          .sort(sort_field, sort_direction)
-                          .skip((page - 1) * per_page)
-                          .limit(per_page))
-
-    # Render template and set theme cookie
-    response = make_response(render_template('index.html',
-                                             professors=professors,
-                                             page=page,
-                                             total_pages=total_pages,
-                                             search_term=search_term,
-                                             total_count=total_count,
-                                             sort_by=sort_by,
-                                             sort_dir=sort_dir,
-                                             theme=theme,
-                                             research_fields_filter=research_fields_filter,
-                                             research_fields_filter_raw=research_fields_filter_raw))
+        html = page_cache.get((version, theme, template) + view_key)
+        if html is None:
+            results = results_cache.get((version,) + view_key)
+            if results is None:
+                results = query_professors(search_term, research_fields_filter, sort_by, sort_dir, page,
+                                           after_token, before_token, version=version)
+                results_cache.set((version,) + view_key, results)
+
+            with telemetry.span("render", template=template):
+                links = ListingLinks(url_for('.index'), params, theme).build(params, results, theme)
+                html = render_template(template,
+                                       field_counts=facet_index(version).counts.get("research_fields", {}),
+                                       links=links,
+                                       page=page,
+                                       search_term=search_term,
+                                       sort_by=sort_by,
+                                       sort_dir=sort_dir,
+                                       theme=theme,
+                                       research_fields_filter=research_fields_filter,
+                                       **results)
+            page_cache.set((version, theme, template) + view_key, html)
+        response = make_response(html)
+
+    # Set theme cookie; the body depends on it, so caches must key on it too
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Cookie'
     response.set_cookie('theme', theme)
     return response
 
+
+@bp.route('/')
+def index():
+    return render_listing('index.html')
+
+
+@bp.route('/results')
+def results_fragment():
+    """Filters, table and pagination only; static/js/results.js swaps it into the page."""
+    return render_listing('_results.html')
+
+
+# -------------------------------------------
+# JSON / NDJSON / CSV API
+# -------------------------------------------
+API_FIELDS = EXPORT_FIELDS
+API_MAX_PER_PAGE = 100
+
+# professors.csv columns -> document field
+CSV_EXPORT_COLUMNS = [
+    ("No.", "id"),
+    ("Name", "name"),
+    ("University", "university"),
+    ("Major", "major"),
+    ("H-Index", "h_index"),
+    ("Profile URL", "profile_url"),
+    ("Email", "email"),
+    ("Research Fields", "research_fields"),
+]
+
+
+def to_api_record(doc):
+    record = {field: doc.get(field) for field in API_FIELDS}
+    if isinstance(record["scraped_at"], datetime):
+        record["scraped_at"] = record["scraped_at"].strftime(SCRAPED_AT_FORMAT)
+    if "score" in doc:
+        record["score"] = doc["score"]
+    return record
+
+
+def export_cursor(params):
+    """Every match, unpaged, in the listing's sort order."""
+    return storage().export(params["search_term"], params["research_fields_filter"],
+                            params["sort_by"], params["sort_dir"])
+
+
+def stream_ndjson(cursor):
+    for doc in cursor:
+        yield json.dumps(to_api_record(doc), ensure_ascii=False) + "\n"
+
+
+def stream_csv(cursor):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM first, like professors.csv, so Excel detects UTF-8
+    writer.writerow([column for column, _ in CSV_EXPORT_COLUMNS])
+    yield "\ufeff" + buffer.getvalue()
+    for doc in cursor:
+        buffer.seek(0)
+        buffer.truncate()
+        record = to_api_record(doc)
+        writer.writerow([", ".join(record[field] or []) if field == "research_fields" else record[field]
+                         for _, field in CSV_EXPORT_COLUMNS])
+        yield buffer.getvalue()
+
+
+@bp.route('/api/professors')
+def api_professors():
+    """
+    Same search / fields / sort_by / sort_dir / page / after / before
+    semantics as index().
+
+    format=json (default) returns one page; format=ndjson or format=csv
+    streams every match straight from the storage cursor.
+    """
+    params = parse_listing_args(request.args)
+    output_format = request.args.get('format', 'json').lower()
+
+    if output_format == 'ndjson':
+        return Response(stream_with_context(stream_ndjson(export_cursor(params))),
+                        mimetype='application/x-ndjson')
+    if output_format == 'csv':
+        response = Response(stream_with_context(stream_csv(export_cursor(params))),
+                            mimetype='text/csv; charset=utf-8')
+        response.headers['Content-Disposition'] = 'attachment; filename=professors.csv'
+        return response
+
+    per_page = min(max(request.args.get('per_page', 20, type=int) or 20, 1), API_MAX_PER_PAGE)
+    results = query_professors(params["search_term"], params["research_fields_filter"],
+                               params["sort_by"], params["sort_dir"], params["page"],
+                               params["after_token"], params["before_token"],
+                               per_page=per_page, version=dataset_version())
+    return jsonify({
+        "page": params["page"],
+        "per_page": per_page,
+        "total_count": results["total_count"],
+        "total_pages": results["total_pages"],
+        "next_cursor": results["next_cursor"],
+        "prev_cursor": results["prev_cursor"],
+        "professors": [to_api_record(doc) for doc in results["professors"]],
+    })
+
+
+@bp.route('/api/facets')
+def api_facets():
+    """Counts per research field, university and major (?facet=... for one)."""
+    counts = facet_index(dataset_version()).counts
+    facet = request.args.get('facet')
+    if facet:
+        return jsonify({facet: counts.get(facet, {})})
+    return jsonify(counts)
+
+
+@bp.route('/cache/stats')
+def cache_stats_view():
+    return jsonify({
+        "dataset_version": storage().version,
+        "not_modified": cache_stats["not_modified"],
+        "pages": page_cache.stats(),
+        "results": results_cache.stats(),
+        "counts": count_cache.stats(),
+    })
+
+
+@bp.route('/healthz')
+def healthz():
+    """
+    Storage health: DB round-trip latency and connection pool counters
+    (mongo), or the loaded dataset and its last reload (memory).
+    """
+    report = storage().health()
+    return jsonify(report), 200 if report["status"] == "ok" else 503
+
+
+@bp.route('/metrics')
+def metrics():
+    """Prometheus text format: span histograms and counters of this process."""
+    return Response(telemetry.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+# -------------------------------------------
+# Request spans
+# -------------------------------------------
+@bp.before_app_request
+def start_request_span():
+    g.request_started = time.perf_counter()
+
+
+@bp.after_app_request
+def record_request_span(response):
+    started = g.pop('request_started', None)
+    if started is not None and request.endpoint != 'professors.metrics':
+        telemetry.record("request", time.perf_counter() - started,
+                         endpoint=request.endpoint or "unknown", status=response.status_code,
+                         path=request.full_path)
+    return response
+
+
+@bp.app_errorhandler(ConnectionFailure)
+def database_unavailable(e):
+    # Server selection gives up after MONGO_SERVER_SELECTION_TIMEOUT_MS
+    # instead of hanging the worker
+    print(f"Error connecting to MongoDB: {e}")
+    if request.path.startswith('/api/'):
+        return jsonify({"error": "Failed to connect to MongoDB"}), 500
+    return "<h1>Database Connection Error</h1><p>Failed to connect to MongoDB. Please ensure the MongoDB server is running.</p>", 500
+
+
+# -------------------------------------------
+# App factory
+# -------------------------------------------
+def create_app(config=None):
+    """
+    Build the app. Mongo settings come from db_client.DEFAULTS, environment
+    variables of the same name, then config; STORAGE / STORAGE_PATH pick
+    the backend the same way. Serve with e.g.
+
+        gunicorn -w 4 'app:create_app()'
+        STORAGE=memory gunicorn -w 4 'app:create_app()'
+    """
+    flask_app = Flask(__name__)
+    flask_app.config.update(config_from_env(config))
+    # JSON-lines request/count/find/render spans (TRACE_FILE env or config)
+    trace_file = flask_app.config.get('TRACE_FILE', os.environ.get('TRACE_FILE'))
+    if trace_file:
+        telemetry.configure(trace_path=trace_file)
+    for key, default in (('STORAGE', 'mongo'), ('STORAGE_PATH', 'professors.jsonl')):
+        flask_app.config.setdefault(key, os.environ.get(key, default))
+    flask_app.extensions['storage'] = create_storage(flask_app.config, count_cache)
+    flask_app.register_blueprint(bp)
+    return flask_app
+
+
+def migrate(config=None):
+    """Create every index in db_schema.INDEX_PLAN on the live collection."""
+    connection = MongoConnection(config_from_env(config))
+    start = time.perf_counter()
+    ensure_indexes(connection.collection)
+    print(f"Indexes ensured on {connection.config['MONGO_DATABASE']}.{connection.config['MONGO_COLLECTION']} "
+          f"in {time.perf_counter() - start:.2f}s")
+    connection.close()
+
+
+# No module-level instance: importing app must not load a dataset (the
+# memory backend reads its file in create_app). `flask --app app run` finds
+# create_app itself; gunicorn calls it once per worker.
 if __name__ == '__main__':
-    # We rely on the index function to handle DB connection errors gracefully.
-    app.run(debug=True)
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Professor search web app")
+    parser.add_argument("command", nargs="?", choices=["run", "migrate"], default="run",
+                        help="run: development server; migrate: create indexes and exit")
+    args = parser.parse_args()
+    if args.command == "migrate":
+        migrate()
+    else:
+        create_app().run(debug=True)
\ No newline at end of file
@@ -0,0 +1,179 @@
+# benchmarks/bench_app.py
+# Load test of the listing page (/) against a seeded MongoDB.
+#
+# Generates a synthetic dataset (gen_professors.py), imports it into a
+# separate database with import_to_mongo.py, then times every scenario -
+# plain listing, each sort, searches, research-field filters, deep skip
+# pages and deep keyset pages - and reports p50/p95/p99 per scenario.
+#
+# By default requests go through the Flask test client with the response
+# caches cleared before each request, so the numbers are the query + render
+# path. --warm keeps the caches; --url load-tests a running server instead;
+# --storage memory serves the generated file from storage.MemoryStorage.
+#
+#   python benchmarks/bench_app.py --rows 100000
+#   python benchmarks/bench_app.py --rows 1000000 --requests 200 --concurrency 8
+#   python benchmarks/bench_app.py --rows 100000 --storage memory
+import argparse
+import os
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import common
+import gen_professors
+
+BENCH_DB = "bench_university_db"
+BENCH_COLLECTION = "professors"
+
+
+def seed(rows, mongo_uri, db_name=BENCH_DB, seed_value=42):
+    import import_to_mongo
+
+    fd, path = tempfile.mkstemp(prefix="professors-", suffix=".jsonl")
+    os.close(fd)
+    try:
+        start = time.perf_counter()
+        gen_professors.write(path, rows, seed_value)
+        generated = time.perf_counter() - start
+        import_to_mongo.import_data_to_mongodb(path, db_name, BENCH_COLLECTION, mongo_uri=mongo_uri)
+        return {"rows": rows, "generate_seconds": round(generated, 3),
+                "import_seconds": round(time.perf_counter() - start - generated, 3)}
+    finally:
+        os.remove(path)
+
+
+def build_scenarios(flask_app):
+    """Query strings for /, derived from the seeded data."""
+    import app as appmod
+
+    with flask_app.app_context():
+        version = appmod.dataset_version()
+        counts = appmod.facet_index(version).counts.get("research_fields", {})
+        common_fields = sorted(counts, key=counts.get, reverse=True)
+        total = appmod.storage().estimated_count()
+
+        # A cursor ~50 pages deep, for the keyset scenario
+        cursor = None
+        for _ in range(50):
+            page = appmod.query_professors("", [], "university", "asc", 1, after_token=cursor or "")
+            cursor = page["next_cursor"] or cursor
+
+    deep_page = max(1, (total // 20) // 2)
+    scenarios = {
+        "plain": {},
+        "sort_name_asc": {"sort_by": "name", "sort_dir": "asc"},
+        "sort_major_desc": {"sort_by": "major", "sort_dir": "desc"},
+        "sort_h_index_desc": {"sort_by": "h_index", "sort_dir": "desc"},
+        "search_name": {"search": "محمد"},
+        "search_university": {"search": "شریف"},
+        "search_prefix": {"search": "رض"},
+        "search_field": {"search": "learning"},
+        "filter_common_field": {"fields": common_fields[0]},
+        "filter_rare_field": {"fields": common_fields[-1]},
+        "filter_two_fields": {"fields": ",".join(common_fields[:2])},
+        "search_and_filter": {"search": "محمد", "fields": common_fields[0]},
+        "filter_sort_h_index": {"fields": common_fields[0], "sort_by": "h_index", "sort_dir": "desc"},
+        "deep_skip_page": {"page": deep_page},
+        "deep_skip_page_sorted": {"page": deep_page, "sort_by": "h_index", "sort_dir": "desc"},
+        "deep_keyset_page": {"after": cursor or ""},
+    }
+    return scenarios, total
+
+
+def run_scenario(request, params, requests, concurrency):
+    def one(_):
+        start = time.perf_counter()
+        status = request(params)
+        return (time.perf_counter() - start) * 1000, status
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(requests)))
+    summary = common.latency_summary([ms for ms, _ in results])
+    summary["errors"] = sum(1 for _, status in results if status != 200)
+    return summary
+
+
+def test_client_requester(flask_app, warm):
+    import app as appmod
+
+    def request(params):
+        if not warm:
+            appmod.page_cache.clear()
+            appmod.results_cache.clear()
+            appmod.count_cache.clear()
+        with flask_app.test_client() as client:
+            return client.get("/", query_string=params).status_code
+    return request
+
+
+def url_requester(base_url):
+    def request(params):
+        url = base_url.rstrip("/") + "/?" + urllib.parse.urlencode(params)
+        try:
+            with urllib.request.urlopen(url, timeout=30) as response:
+                response.read()
+                return response.status
+        except Exception:
+            return None
+    return request
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test / across search, filter, sort and deep pages")
+    parser.add_argument("--rows", type=int, default=10000, help="Synthetic dataset size to seed")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017/")
+    parser.add_argument("--db", default=BENCH_DB, help="Database to seed and query (dropped/replaced!)")
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse the data already in --db")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--warm", action="store_true", help="Keep the response caches between requests")
+    parser.add_argument("--url", help="Load-test a running server (e.g. http://127.0.0.1:8000) instead")
+    parser.add_argument("--only", nargs="*", help="Run only these scenarios")
+    parser.add_argument("--storage", choices=["mongo", "memory"], default="mongo",
+                        help="memory: serve a generated JSONL from the in-process backend (no MongoDB)")
+    parser.add_argument("-o", "--output", help="Result file (default benchmarks/results/app-<time>.json)")
+    args = parser.parse_args()
+
+    import app as appmod
+
+    config = {"MONGO_URI": args.mongo_uri, "MONGO_DATABASE": args.db, "MONGO_COLLECTION": BENCH_COLLECTION,
+              "STORAGE": args.storage}
+    workdir = None
+    if args.storage == "memory":
+        workdir = tempfile.TemporaryDirectory(prefix="bench-app-")
+        config["STORAGE_PATH"] = os.path.join(workdir.name, "professors.jsonl")
+        start = time.perf_counter()
+        gen_professors.write(config["STORAGE_PATH"], args.rows)
+        seeding = {"rows": args.rows, "generate_seconds": round(time.perf_counter() - start, 3)}
+    else:
+        seeding = None if args.skip_seed else seed(args.rows, args.mongo_uri, args.db)
+    flask_app = appmod.create_app(config)
+    scenarios, total = build_scenarios(flask_app)
+    if args.only:
+        scenarios = {name: params for name, params in scenarios.items() if name in args.only}
+
+    request = url_requester(args.url) if args.url else test_client_requester(flask_app, args.warm)
+    results = {}
+    print(f"{total} documents; {args.requests} requests per scenario, concurrency {args.concurrency}")
+    for name, params in scenarios.items():
+        request(params)  # one untimed request (connection pool, facet load)
+        results[name] = run_scenario(request, params, args.requests, args.concurrency)
+        r = results[name]
+        print(f"  {name:<24} p50 {r['p50_ms']:>8.2f} ms   p95 {r['p95_ms']:>8.2f} ms   "
+              f"p99 {r['p99_ms']:>8.2f} ms   errors {r['errors']}")
+
+    common.write_results("app", {
+        "config": {"rows": total, "requests": args.requests, "concurrency": args.concurrency,
+                   "warm": args.warm, "target": args.url or "test_client", "storage": args.storage},
+        "seeding": seeding,
+        "scenarios": {name: {"params": scenarios[name], **results[name]} for name in results},
+    }, args.output)
+    if workdir is not None:
+        workdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+# benchmarks/bench_enrich.py
+# enrich.py against a local stub of faculty profile pages.
+#
+# The stub serves /~prof<i>/ pages with an ETag and Last-Modified, answers
+# If-None-Match / If-Modified-Since with 304, and counts requests, TCP
+# connections and the peak number of concurrent requests per Host. Records
+# alternate between two host names (127.0.0.1 and localhost), so the
+# per-site limit is visible. Three runs share one cache directory:
+#   cold     empty cache, every page is a 200
+#   warm     nothing changed, every page should be a 304
+#   changed  --changed of the pages get a new version first
+#
+#   python benchmarks/bench_enrich.py --profiles 2000 --latency-ms 30 --per-site 4
+import argparse
+import email.utils
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import common  # noqa: F401  (repo on sys.path)
+import enrich
+from gen_professors import FIELD_WORDS
+
+HOSTS = ("127.0.0.1", "localhost")
+PROFILE_PATH = re.compile(r"^/~prof(\d+)/$")
+
+PAGE_HTML = """<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>Prof. {i} - Faculty of Computer Engineering</title>
+<script>var analytics = "not text";</script></head>
+<body>
+<h1>Professor {i}</h1>
+<p>{rank}, School of Electrical and Computer Engineering</p>
+<p><a href="https://scholar.google.com/citations?user=p{i}">Google Scholar</a>
+   <a href="https://orcid.org/0000-0000-0000-{i:04d}">ORCID</a></p>
+<h2>Research Interests</h2>
+<ul>{interests}</ul>
+<h2>Selected Publications</h2>
+<ol>{publications}</ol>
+<h2>Contact</h2>
+<ul><li>Room {i}</li></ul>
+</body></html>
+"""
+RANKS = ("Professor", "Associate Professor", "Assistant Professor")
+
+
+class ProfileStub:
+    """Serves versioned profile pages on localhost from a background thread."""
+
+    def __init__(self, profiles, latency_ms=0, host="127.0.0.1", port=0):
+        self.profiles = profiles
+        self.latency = latency_ms / 1000
+        self.versions = [1] * profiles
+        self.modified = [time.time() - 86400] * profiles
+        self.stats = Counter()
+        self.active = Counter()
+        self.peak = Counter()
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def url(self, i, host):
+        return f"http://{host}:{self.port}/~prof{i}/"
+
+    def touch(self, indices):
+        with self._lock:
+            for i in indices:
+                self.versions[i] += 1
+                self.modified[i] = time.time()
+
+    def page(self, i):
+        rng = random.Random(i * 1000 + self.versions[i])
+        interests = "".join(f"<li>{' '.join(rng.sample(FIELD_WORDS, 2))}</li>" for _ in range(4))
+        publications = "".join(f"<li>{' '.join(rng.sample(FIELD_WORDS, 5))}, Journal {n}, {2000 + n}</li>"
+                               for n in range(rng.randint(5, 25)))
+        return PAGE_HTML.format(i=i, rank=RANKS[i % len(RANKS)], interests=interests, publications=publications)
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # keep-alive, so connection reuse shows up
+
+            def log_message(self, format, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.stats["connections"] += 1
+
+            def _send(self, status, body=b"", headers=()):
+                self.send_response(status)
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                host = (self.headers.get("Host") or "").split(":")[0]
+                with stub._lock:
+                    stub.stats["requests"] += 1
+                    stub.active[host] += 1
+                    stub.peak[host] = max(stub.peak[host], stub.active[host])
+                try:
+                    if stub.latency:
+                        time.sleep(stub.latency)
+                    match = PROFILE_PATH.match(self.path)
+                    if not match or int(match.group(1)) >= stub.profiles:
+                        stub.stats["404"] += 1
+                        return self._send(404, b"not found", [("Content-Type", "text/plain")])
+                    i = int(match.group(1))
+                    etag = f'"p{i}-v{stub.versions[i]}"'
+                    last_modified = email.utils.formatdate(stub.modified[i], usegmt=True)
+                    headers = [("ETag", etag), ("Last-Modified", last_modified)]
+                    if self.headers.get("If-None-Match") == etag:
+                        stub.stats["304"] += 1
+                        return self._send(304, headers=headers)
+                    body = stub.page(i).encode("utf-8")
+                    stub.stats["200"] += 1
+                    stub.stats["bytes"] += len(body)
+                    self._send(200, body, headers + [("Content-Type", "text/html; charset=utf-8")])
+                finally:
+                    with stub._lock:
+                        stub.active[host] -= 1
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats.clear()
+            self.peak.clear()
+
+
+def write_records(path, stub, rows):
+    """Professors pointing at the stub, plus a record without a URL and a dead link."""
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(rows):
+            f.write(json.dumps({"id": i + 1, "name": f"استاد {i}", "profile_url": stub.url(i, HOSTS[i % len(HOSTS)])},
+                               ensure_ascii=False) + "\n")
+        f.write(json.dumps({"id": rows + 1, "name": "بدون پروفایل", "profile_url": ""}, ensure_ascii=False) + "\n")
+        f.write(json.dumps({"id": rows + 2, "name": "لینک خراب", "profile_url": stub.url(rows + 5, HOSTS[0])},
+                           ensure_ascii=False) + "\n")
+
+
+def check_output(path, rows):
+    """Every record written once, and the stub pages parsed."""
+    seen, parsed = Counter(), 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            seen[record["id"]] += 1
+            profile = record.get("profile") or {}
+            if profile.get("research_interests") and profile.get("publication_count") and profile.get("rank"):
+                parsed += 1
+    assert len(seen) == rows + 2 and max(seen.values()) == 1, "records missing or duplicated"
+    return parsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark enrich.py against a local profile-page stub")
+    parser.add_argument("--profiles", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=int, default=20, help="Simulated server time per request")
+    parser.add_argument("--concurrency", type=int, default=enrich.DEFAULT_CONCURRENCY)
+    parser.add_argument("--per-site", type=int, default=enrich.DEFAULT_PER_SITE)
+    parser.add_argument("--changed", type=float, default=0.1, help="Share of pages changed before the last run")
+    parser.add_argument("-o", "--output", help="Result file (default benchmarks/results/enrich-<time>.json)")
+    args = parser.parse_args()
+
+    stub = ProfileStub(args.profiles, latency_ms=args.latency_ms).start()
+    runs = {}
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench-enrich-") as workdir:
+            source = os.path.join(workdir, "professors.jsonl")
+            output = os.path.join(workdir, "professors.enriched.jsonl")
+            write_records(source, stub, args.profiles)
+            for name in ("cold", "warm", "changed"):
+                if name == "changed":
+                    stub.touch(random.Random(1).sample(range(args.profiles), int(args.profiles * args.changed)))
+                stub.reset_stats()
+                started = time.perf_counter()
+                written, fetcher = enrich.main(source, output, cache_dir=os.path.join(workdir, "cache"),
+                                               concurrency=args.concurrency, per_site=args.per_site)
+                runs[name] = r = {
+                    "seconds": round(time.perf_counter() - started, 3),
+                    "written": written,
+                    "parsed": check_output(output, args.profiles),
+                    "outcomes": dict(fetcher.outcomes),
+                    "server": dict(stub.stats),
+                    "peak_per_host": dict(stub.peak),
+                }
+                print(f"  {name:<8} {r['seconds']:6.2f}s  {r['server']['requests']:>6} requests over {r['server']['connections']:>4} "
+                      f"connections, 200: {r['server'].get('200', 0)}, 304: {r['server'].get('304', 0)}, "
+                      f"peak per host {max(stub.peak.values())}, {r['parsed']} pages parsed")
+    finally:
+        stub.stop()
+
+    common.write_results("enrich", {"config": vars(args), "runs": runs}, args.output)
+
+
+if __name__ == "__main__":
+    main()
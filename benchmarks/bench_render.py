@@ -0,0 +1,104 @@
+# benchmarks/bench_render.py
+# Render cost of the listing page, before and after precomputed links.
+#
+# Serves a synthetic dataset (gen_professors.py) from the in-memory storage
+# backend, runs each scenario's query once, then times only the rendering:
+#   before    benchmarks/templates/index_before.html - the previous
+#             template, which builds every link with url_for inside its
+#             per-row and per-page loops
+#   page      app.ListingLinks + templates/index.html (full page)
+#   fragment  app.ListingLinks + templates/_results.html (what /results
+#             returns for in-page filter / sort / page clicks)
+#
+#   python benchmarks/bench_render.py --rows 100000 --repeat 200
+import argparse
+import os
+import tempfile
+import time
+
+import common
+import gen_professors
+
+BEFORE_TEMPLATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates", "index_before.html")
+
+
+def build_scenarios(appmod, flask_app):
+    with flask_app.app_context():
+        counts = appmod.facet_index(appmod.dataset_version()).counts.get("research_fields", {})
+    common_fields = sorted(counts, key=counts.get, reverse=True)
+    return {
+        "plain": {},
+        "deep_page": {"page": "2000"},
+        "one_filter": {"fields": common_fields[0]},
+        "three_filters": {"fields": ",".join(common_fields[:3])},
+        "search": {"search": "محمد"},
+    }
+
+
+def render_times(appmod, flask_app, query, repeat):
+    with flask_app.test_request_context("/", query_string=query):
+        params = appmod.parse_listing_args(appmod.request.args)
+        version = appmod.dataset_version()
+        results = appmod.query_professors(params["search_term"], params["research_fields_filter"],
+                                          params["sort_by"], params["sort_dir"], params["page"], version=version)
+        context = dict(field_counts=appmod.facet_index(version).counts.get("research_fields", {}),
+                       page=params["page"], search_term=params["search_term"], sort_by=params["sort_by"],
+                       sort_dir=params["sort_dir"], theme="dark",
+                       research_fields_filter=params["research_fields_filter"], **results)
+
+        env = flask_app.jinja_env
+        with open(BEFORE_TEMPLATE, "r", encoding="utf-8") as f:
+            before = env.from_string(f.read())
+        page = env.get_template("index.html")
+        fragment = env.get_template("_results.html")
+
+        def render_before():
+            return before.render(research_fields_filter_raw=params["research_fields_filter_raw"], **context)
+
+        def render_with_links(template):
+            def render():
+                links = appmod.ListingLinks(appmod.url_for(".index"), params, "dark").build(params, results, "dark")
+                return template.render(links=links, **context)
+            return render
+
+        out = {}
+        for name, fn in (("before", render_before), ("page", render_with_links(page)),
+                         ("fragment", render_with_links(fragment))):
+            html = fn()  # warm-up
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                fn()
+                timings.append((time.perf_counter() - start) * 1000)
+            out[name] = {**common.latency_summary(timings), "bytes": len(html.encode("utf-8"))}
+        out["total_pages"] = results["total_pages"]
+        return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark listing-page rendering before/after precomputed links")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=100, help="Renders per scenario and variant")
+    parser.add_argument("-o", "--output", help="Result file (default benchmarks/results/render-<time>.json)")
+    args = parser.parse_args()
+
+    import app as appmod
+
+    with tempfile.TemporaryDirectory(prefix="bench-render-") as workdir:
+        path = os.path.join(workdir, "professors.jsonl")
+        gen_professors.write(path, args.rows)
+        flask_app = appmod.create_app({"STORAGE": "memory", "STORAGE_PATH": path})
+
+        results = {}
+        for name, query in build_scenarios(appmod, flask_app).items():
+            results[name] = r = render_times(appmod, flask_app, query, args.repeat)
+            print(f"  {name:<14} ({r['total_pages']:>5} pages)  before p50 {r['before']['p50_ms']:7.2f} ms   "
+                  f"page p50 {r['page']['p50_ms']:7.2f} ms   fragment p50 {r['fragment']['p50_ms']:7.2f} ms "
+                  f"({r['fragment']['bytes'] / 1024:.0f} of {r['page']['bytes'] / 1024:.0f} KiB)")
+
+    common.write_results("render", {"config": {"rows": args.rows, "repeat": args.repeat},
+                                    "scenarios": results}, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# benchmarks/bench_scraper.py
+# End-to-end scraper benchmark against the local fixture site.
+#
+# Starts benchmarks/fixture_site.py in-process, points scraper.SEARCH_URL at
+# it and runs scraper.main() for each engine in a scratch directory (output,
+# checkpoint and signature files never touch the repo). Reports wall time,
+# cards/sec and the time spent per wait phase (scraper.WAIT_STATS); the
+# remainder is clicks, extraction and writing.
+#
+# Each engine is run twice: a full crawl, then an incremental one that
+# reuses the parsed cards of unchanged majors (major_signatures.json).
+#
+#   python benchmarks/bench_scraper.py --universities 2 --majors 6 --cards 40
+import argparse
+import contextlib
+import json
+import os
+import tempfile
+import time
+
+import common
+import fixture_site
+
+EMPTY_STORAGE_STATE = {"cookies": [], "origins": []}
+
+
+def count_lines(path):
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb") as f:
+        return sum(1 for line in f if line.strip())
+
+
+def run_crawl(scraper, server, data, engine, concurrency, full, log):
+    with scraper._wait_stats_lock:
+        scraper.WAIT_STATS.clear()
+    if os.path.exists(scraper.OUTPUT_JSONL):
+        os.remove(scraper.OUTPUT_JSONL)
+    cards_before = server.stats["cards_served"]
+    requests_before = server.stats["requests"]
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        scraper.main(data.universities, concurrency=concurrency, mode="dom", engine=engine, full=full)
+    seconds = time.perf_counter() - start
+
+    cards = data.total_cards
+    with scraper._wait_stats_lock:
+        phases = {phase: {"waits": s["waits"], "spent_s": round(s["spent"], 3),
+                          "mean_ms": round(s["spent"] / s["waits"] * 1000, 2) if s["waits"] else None,
+                          "fixed_delay_budget_s": round(s["budget"], 3)}
+                  for phase, s in sorted(scraper.WAIT_STATS.items())}
+    waited = sum(p["spent_s"] for p in phases.values())
+    return {
+        "engine": engine,
+        "incremental": not full,
+        "seconds": round(seconds, 3),
+        "cards": cards,
+        "cards_per_sec": round(cards / seconds, 2) if seconds else None,
+        "professors_written": count_lines(scraper.OUTPUT_JSONL),
+        "cards_served": server.stats["cards_served"] - cards_before,
+        "http_requests": server.stats["requests"] - requests_before,
+        "phases": phases,
+        "waiting_s": round(waited, 3),
+        "other_s": round(seconds - waited, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scraper against the local fixture site")
+    parser.add_argument("--universities", type=int, default=2)
+    parser.add_argument("--majors", type=int, default=6, help="Majors per university")
+    parser.add_argument("--cards", type=int, default=30, help="Cards per major")
+    parser.add_argument("--latency-ms", type=int, default=50, help="Simulated server time per XHR")
+    parser.add_argument("--engines", nargs="+", default=["sync", "async"], choices=["sync", "async"])
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("-o", "--output", help="Result file (default benchmarks/results/scraper-<time>.json)")
+    args = parser.parse_args()
+
+    import scraper
+
+    data = fixture_site.FixtureData(args.universities, args.majors, args.cards)
+    server = fixture_site.FixtureServer(data, latency_ms=args.latency_ms).start()
+    scraper.SEARCH_URL = server.url
+    print(f"Fixture: {data.total_cards} cards, {len(data.universities)} universities x {args.majors} majors "
+          f"at {server.url}")
+
+    runs = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="bench-scraper-") as workdir:
+        os.chdir(workdir)
+        try:
+            with open(scraper.SESSION_FILE, "w", encoding="utf-8") as f:
+                json.dump(EMPTY_STORAGE_STATE, f)
+            with open("crawl.log", "w", encoding="utf-8") as log:
+                for engine in args.engines:
+                    for full in (True, False):
+                        if full and os.path.exists("major_signatures.json"):
+                            os.remove("major_signatures.json")
+                        run = run_crawl(scraper, server, data, engine, args.concurrency, full, log)
+                        runs.append(run)
+                        label = "incremental" if run["incremental"] else "full"
+                        print(f"  {engine:<5} {label:<11} {run['seconds']:7.2f}s  {run['cards_per_sec']:8.1f} cards/s  "
+                              f"waiting {run['waiting_s']:.2f}s  other {run['other_s']:.2f}s  "
+                              f"({run['professors_written']} professors written)")
+        finally:
+            os.chdir(cwd)
+            server.stop()
+
+    common.write_results("scraper", {
+        "config": {"universities": args.universities, "majors": args.majors, "cards": args.cards,
+                   "latency_ms": args.latency_ms, "concurrency": args.concurrency},
+        "runs": runs,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# benchmarks/bench_snapshot.py
+# Load and scan cost: professors.jsonl (json.loads per line) vs. the
+# memory-mapped columnar snapshot (snapshot.py).
+#
+# For a synthetic dataset (gen_professors.py) it times
+#   - open:  parse every JSONL line vs. mmap + header
+#   - scan:  mean h_index and per-university counts over all rows
+#   - export: professors.csv straight from the snapshot
+#
+#   python benchmarks/bench_snapshot.py --rows 200000
+import argparse
+import json
+import os
+import tempfile
+import time
+from collections import Counter
+
+import common
+import gen_professors
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, round((time.perf_counter() - start) * 1000, 2)
+
+
+def jsonl_scan(path):
+    with open(path, "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    h_index = [int(r["h_index"] or 0) for r in records]
+    return sum(h_index) / len(h_index), Counter(r["university"] for r in records)
+
+
+def snapshot_scan(snap):
+    h_index = snap["h_index"]
+    universities = snap["university"]
+    counts = Counter(universities.codes)
+    return sum(h_index) / len(h_index), Counter({universities.dictionary[c]: n for c, n in counts.items()})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSONL parsing vs. the mmap snapshot")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("-o", "--output", help="Result file (default benchmarks/results/snapshot-<time>.json)")
+    args = parser.parse_args()
+
+    import snapshot
+
+    with tempfile.TemporaryDirectory(prefix="bench-snapshot-") as workdir:
+        jsonl_path = os.path.join(workdir, "professors.jsonl")
+        snapshot_path = os.path.join(workdir, "professors.snapshot")
+        gen_professors.write(jsonl_path, args.rows)
+
+        rows, build_ms = timed(lambda: snapshot.build_snapshot(jsonl_path, snapshot_path))
+        jsonl_result, jsonl_ms = timed(lambda: jsonl_scan(jsonl_path))
+        snap, open_ms = timed(lambda: snapshot.Snapshot.open(snapshot_path))
+        with snap:
+            snap_result, scan_ms = timed(lambda: snapshot_scan(snap))
+            _, export_ms = timed(lambda: snapshot.export_csv(snap, os.path.join(workdir, "professors.csv")))
+        assert jsonl_result[1] == snap_result[1]
+
+        results = {
+            "rows": rows,
+            "jsonl_mb": round(os.path.getsize(jsonl_path) / 1e6, 2),
+            "snapshot_mb": round(os.path.getsize(snapshot_path) / 1e6, 2),
+            "build_ms": build_ms,
+            "jsonl_parse_and_scan_ms": jsonl_ms,
+            "snapshot_open_ms": open_ms,
+            "snapshot_scan_ms": scan_ms,
+            "csv_export_ms": export_ms,
+        }
+
+    print(f"{rows} rows: JSONL {results['jsonl_mb']} MB, snapshot {results['snapshot_mb']} MB "
+          f"(built in {build_ms:.0f} ms)")
+    print(f"  JSONL parse + scan      {jsonl_ms:10.2f} ms")
+    print(f"  snapshot open           {open_ms:10.2f} ms")
+    print(f"  snapshot scan           {scan_ms:10.2f} ms")
+    print(f"  CSV export (snapshot)   {export_ms:10.2f} ms")
+    common.write_results("snapshot", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
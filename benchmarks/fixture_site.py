@@ -0,0 +1,218 @@
+# benchmarks/fixture_site.py
+# A local stand-in for major.cshub.ir/professor-search with the markup the
+# scraper depends on:
+#   li[title='جستجوی پیشرفته']           advanced search toggle
+#   input[placeholder=UNIVERSITY_PLACEHOLDER] + suggestion list
+#   button 'جستجوی موارد انتخاب شده'      disabled until a university is picked
+#   'نتایج جستجو' results section
+#   div.professor__list / span.professor__list-title   one panel per major
+#   div.professor__details                 one card per professor, with the
+#       'نام استاد:' / 'رشته:' / 'امتیاز علمی:' label spans,
+#       .result-professor__group-value, .result-professor__research-value,
+#       the profile link and a mailto: link
+# Search results and a major's cards are loaded over XHR (with --latency-ms
+# of simulated server time), so the event-driven waits are exercised too.
+#
+#   python benchmarks/fixture_site.py --universities 3 --majors 8 --cards 40
+#   -> http://127.0.0.1:8765/professor-search
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import common  # noqa: F401  (repo on sys.path)
+from gen_professors import FIELD_WORDS, FIRST_NAMES, LAST_SYLLABLES, MAJORS, UNIVERSITY_NAMES
+from scraper import UNIVERSITY_PLACEHOLDER
+
+PAGE_PATH = "/professor-search"
+
+PAGE_HTML = """<!DOCTYPE html>
+<html lang="fa" dir="rtl">
+<head><meta charset="utf-8"><title>جستجوی اساتید</title>
+<style>
+  .professor__body { display: none; }
+  .professor__list.open .professor__body { display: block; }
+  .suggestions div { cursor: pointer; padding: 2px; }
+</style></head>
+<body>
+<ul><li title="جستجوی پیشرفته">جستجوی پیشرفته</li></ul>
+<form id="advanced" style="display:none" onsubmit="return false">
+  <input id="uni" placeholder="__PLACEHOLDER__" autocomplete="off">
+  <div class="suggestions" id="suggestions"></div>
+  <button id="search" type="button" disabled>جستجوی موارد انتخاب شده</button>
+</form>
+<div id="results"></div>
+<script>
+const $ = id => document.getElementById(id);
+let selected = null;
+document.querySelector("li[title='جستجوی پیشرفته']").onclick = () => { $('advanced').style.display = 'block'; };
+$('uni').addEventListener('input', async e => {
+  const q = e.target.value.trim();
+  const names = await (await fetch('/api/universities?q=' + encodeURIComponent(q))).json();
+  $('suggestions').innerHTML = '';
+  for (const name of names) {
+    const item = document.createElement('div');
+    item.textContent = name;
+    item.onclick = () => { selected = name; $('uni').value = name; $('suggestions').innerHTML = ''; $('search').disabled = false; };
+    $('suggestions').appendChild(item);
+  }
+});
+const esc = s => String(s).replace(/[&<>"]/g, c => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'}[c]));
+const card = p => `<div class="professor__details">
+  <div><span>نام استاد:</span><span>${esc(p.name)}</span></div>
+  <div><span>رشته:</span><span>${esc(p.field)}</span></div>
+  <div>${p.majors.map(m => `<span class="result-professor__group-value">${esc(m)}</span>`).join('')}</div>
+  <div><span>امتیاز علمی:</span><span>${p.h_index}</span></div>
+  <div>${p.research_fields.map(f => `<span class="result-professor__research-value">${esc(f)}</span>`).join('')}</div>
+  <a href="${esc(p.profile_url)}">لینک پروفایل</a>
+  ${p.email ? `<a href="mailto:${esc(p.email)}">ایمیل</a>` : ''}
+</div>`;
+$('search').onclick = async () => {
+  if (!selected) return;
+  const majors = await (await fetch('/api/search?university=' + encodeURIComponent(selected))).json();
+  $('results').innerHTML = '<div><h2>نتایج جستجو</h2>' + majors.map(m =>
+    `<div class="professor__list" data-major="${esc(m)}"><span class="professor__list-title">لیست اساتید گرایش ${esc(m)}</span><div class="professor__body"></div></div>`
+  ).join('') + '</div>';
+  for (const panel of document.querySelectorAll('.professor__list')) {
+    panel.onclick = async () => {
+      if (panel.classList.toggle('open')) {
+        const url = '/api/major?university=' + encodeURIComponent(selected) + '&major=' + encodeURIComponent(panel.dataset.major);
+        const cards = await (await fetch(url)).json();
+        if (panel.classList.contains('open')) panel.querySelector('.professor__body').innerHTML = cards.map(card).join('');
+      } else {
+        panel.querySelector('.professor__body').innerHTML = '';
+      }
+    };
+  }
+};
+</script>
+</body></html>
+"""
+
+
+def numbered(names, count):
+    """
+    count names from the pool, numbering repeats as a prefix ("2 X"): the
+    scraper matches titles as substrings, so "X 2" would also match "X".
+    """
+    return [name if i < len(names) else f"{i // len(names) + 1} {name}"
+            for i, name in ((i, names[i % len(names)]) for i in range(count))]
+
+
+class FixtureData:
+    """Deterministic universities -> majors -> professor cards."""
+
+    def __init__(self, universities=2, majors=6, cards=30, seed=7):
+        rng = random.Random(seed)
+        self.universities = [f"دانشگاه {name}" for name in numbered(UNIVERSITY_NAMES, universities)]
+        self.majors = {}
+        self.cards = {}
+        serial = 0
+        for uni in self.universities:
+            uni_majors = numbered(MAJORS, majors)
+            self.majors[uni] = uni_majors
+            for major in uni_majors:
+                rows = []
+                for _ in range(cards):
+                    serial += 1
+                    rows.append({
+                        "name": f"{rng.choice(FIRST_NAMES)} {''.join(rng.choices(LAST_SYLLABLES, k=3))} {serial}",
+                        "field": "مهندسی کامپیوتر",
+                        "majors": [major],
+                        "h_index": rng.randint(0, 60),
+                        "research_fields": list(dict.fromkeys(rng.sample(FIELD_WORDS, rng.randint(1, 4)))),
+                        "profile_url": f"https://scimet.example.ir/fa/as/{serial}",
+                        "email": f"p{serial}@example.ac.ir" if rng.random() < 0.7 else "",
+                    })
+                self.cards[(uni, major)] = rows
+
+    @property
+    def total_cards(self):
+        return sum(len(rows) for rows in self.cards.values())
+
+
+class FixtureServer:
+    """Serves a FixtureData on localhost from a background thread."""
+
+    def __init__(self, data, host="127.0.0.1", port=0, latency_ms=0):
+        self.data = data
+        self.latency = latency_ms / 1000
+        self.stats = {"requests": 0, "cards_served": 0}
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}{PAGE_PATH}"
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, body, content_type):
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                parsed = urllib.parse.urlsplit(self.path)
+                query = dict(urllib.parse.parse_qsl(parsed.query))
+                with server._lock:
+                    server.stats["requests"] += 1
+                if parsed.path == PAGE_PATH:
+                    return self._send(PAGE_HTML.replace("__PLACEHOLDER__", UNIVERSITY_PLACEHOLDER), "text/html")
+                if server.latency:
+                    time.sleep(server.latency)
+                if parsed.path == "/api/universities":
+                    q = query.get("q", "")
+                    return self._send(json.dumps([u for u in server.data.universities if q and q in u],
+                                                 ensure_ascii=False), "application/json")
+                if parsed.path == "/api/search":
+                    majors = server.data.majors.get(query.get("university"), [])
+                    return self._send(json.dumps(majors, ensure_ascii=False), "application/json")
+                if parsed.path == "/api/major":
+                    rows = server.data.cards.get((query.get("university"), query.get("major")), [])
+                    with server._lock:
+                        server.stats["cards_served"] += len(rows)
+                    return self._send(json.dumps(rows, ensure_ascii=False), "application/json")
+                self.send_error(404)
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a local copy of the professor-search markup")
+    parser.add_argument("--universities", type=int, default=2)
+    parser.add_argument("--majors", type=int, default=6, help="Majors per university")
+    parser.add_argument("--cards", type=int, default=30, help="Professor cards per major")
+    parser.add_argument("--latency-ms", type=int, default=0, help="Simulated server time per XHR")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    data = FixtureData(args.universities, args.majors, args.cards)
+    server = FixtureServer(data, port=args.port, latency_ms=args.latency_ms)
+    print(f"Serving {data.total_cards} cards for {len(data.universities)} universities at {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,281 @@
+# browser_profile.py
+# Lean browser profile for the crawl: what Chromium is allowed to download,
+# how many bytes each crawl phase actually pulls, and a warm browser that
+# outlives a single run.
+#
+# Only documents, scripts, stylesheets and XHR/fetch are needed to render
+# the cards; images, fonts, media and analytics/chat trackers are aborted
+# before they hit the network. allow= patterns switch any of that back on.
+#
+# Warm browser (kept running between crawls, reused over CDP):
+#   python browser_profile.py start [--port 9222] [--headed]
+#   python browser_profile.py status
+#   python browser_profile.py stop
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import threading
+import time
+import urllib.parse
+import urllib.request
+import weakref
+
+import telemetry
+
+BLOCKED_RESOURCE_TYPES = ("image", "font", "media")
+TRACKER_DOMAINS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googlesyndication.com",
+    "hotjar.com", "clarity.ms", "mc.yandex.ru", "facebook.net", "sentry.io",
+    "najva.com", "goftino.com", "raychat.io", "yektanet.com",
+)
+
+# Chromium switches that cut background work on crawl hosts
+LEAN_ARGS = [
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--mute-audio",
+    "--no-first-run",
+]
+
+WARM_BROWSER_FILE = "warm_browser.json"
+WARM_PROFILE_DIR = ".warm_browser_profile"
+
+
+# -------------------------------------------
+# Request filter
+# -------------------------------------------
+class ResourceBlocker:
+    """
+    context.route handler that aborts images, fonts, media and tracker
+    requests. allow is a list of resource types ("font") or URL substrings
+    ("cdn.cshub.ir") that are always let through.
+    """
+
+    def __init__(self, block_types=BLOCKED_RESOURCE_TYPES, tracker_domains=TRACKER_DOMAINS, allow=()):
+        self.block_types = set(block_types)
+        self.tracker_domains = tuple(tracker_domains)
+        self.allow = tuple(allow)
+        self.blocked = {}
+        self._lock = threading.Lock()
+
+    def reason(self, request):
+        """Why request should be aborted ("image", "tracker", ...), or None."""
+        url = request.url
+        if any(pattern == request.resource_type or pattern in url for pattern in self.allow):
+            return None
+        if request.resource_type in self.block_types:
+            return request.resource_type
+        host = urllib.parse.urlsplit(url).hostname or ""
+        if any(host == domain or host.endswith("." + domain) for domain in self.tracker_domains):
+            return "tracker"
+        return None
+
+    def _count(self, reason):
+        with self._lock:
+            self.blocked[reason] = self.blocked.get(reason, 0) + 1
+        telemetry.increment("requests_blocked", kind=reason)
+
+    def handle(self, route):
+        reason = self.reason(route.request)
+        if reason:
+            self._count(reason)
+            route.abort("blockedbyclient")
+        else:
+            route.fallback()
+
+    async def handle_async(self, route):
+        reason = self.reason(route.request)
+        if reason:
+            self._count(reason)
+            await route.abort("blockedbyclient")
+        else:
+            await route.fallback()
+
+    def apply(self, context):
+        context.route("**/*", self.handle)
+
+    async def apply_async(self, context):
+        await context.route("**/*", self.handle_async)
+
+
+# -------------------------------------------
+# Bytes and time per crawl phase
+# -------------------------------------------
+class TransferStats:
+    """
+    Requests, bytes received and wall time per phase. Callers mark phase
+    changes per page with set_phase(); every finished request is charged to
+    the phase its page was in.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.phases = {}
+        self._page_phase = weakref.WeakKeyDictionary()  # page -> (phase, since)
+
+    def _entry(self, phase):
+        return self.phases.setdefault(phase, {"requests": 0, "bytes": 0, "seconds": 0.0, "loads": 0,
+                                              "load_seconds": 0.0})
+
+    def phase_of(self, page):
+        current = self._page_phase.get(page)
+        return current[0] if current else "other"
+
+    def set_phase(self, page, phase):
+        """Enter phase on page (None ends the current one)."""
+        now = time.perf_counter()
+        with self._lock:
+            current = self._page_phase.pop(page, None)
+            if current:
+                self._entry(current[0])["seconds"] += now - current[1]
+            if phase:
+                self._page_phase[page] = (phase, now)
+
+    def add_load(self, phase, seconds):
+        """A navigation (page.goto) that took seconds."""
+        with self._lock:
+            entry = self._entry(phase)
+            entry["loads"] += 1
+            entry["load_seconds"] += seconds
+
+    def _add(self, phase, sizes):
+        received = sizes.get("responseBodySize", 0) + sizes.get("responseHeadersSize", 0)
+        with self._lock:
+            entry = self._entry(phase)
+            entry["requests"] += 1
+            entry["bytes"] += max(received, 0)
+        telemetry.increment("bytes_received", max(received, 0), phase=phase)
+
+    def attach(self, page):
+        def finished(request):
+            try:
+                self._add(self.phase_of(page), request.sizes())
+            except Exception:
+                pass
+        page.on("requestfinished", finished)
+
+    def attach_async(self, page):
+        async def finished(request):
+            try:
+                self._add(self.phase_of(page), await request.sizes())
+            except Exception:
+                pass
+        page.on("requestfinished", finished)
+
+    def report(self, blocker=None):
+        with self._lock:
+            rows = sorted(self.phases.items())
+        print("  → Transfer per phase:")
+        for phase, s in rows:
+            load = f"  {s['loads']} loads, {s['load_seconds'] / s['loads']:.2f}s avg" if s["loads"] else ""
+            print(f"     {phase:<10} {s['requests']:>6} requests  {s['bytes'] / 1024:10.1f} KiB  "
+                  f"{s['seconds']:8.1f}s{load}")
+        if blocker is not None and blocker.blocked:
+            blocked = ", ".join(f"{kind} {count}" for kind, count in sorted(blocker.blocked.items()))
+            print(f"  → Blocked requests: {blocked}")
+
+
+# -------------------------------------------
+# Warm browser
+# -------------------------------------------
+def cdp_endpoint(port):
+    """http://127.0.0.1:port if a browser answers CDP there, else None."""
+    url = f"http://127.0.0.1:{port}"
+    try:
+        with urllib.request.urlopen(f"{url}/json/version", timeout=1) as response:
+            json.load(response)
+        return url
+    except Exception:
+        return None
+
+
+def wait_for_cdp(port, timeout=15):
+    """cdp_endpoint(port) once the browser answers there, or None after timeout seconds."""
+    deadline = time.monotonic() + timeout
+    while True:
+        url = cdp_endpoint(port)
+        if url or time.monotonic() >= deadline:
+            return url
+        time.sleep(0.2)
+
+
+def free_port():
+    """A port nothing on 127.0.0.1 is listening on right now."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def launch_options(headless=True, port=None):
+    args = list(LEAN_ARGS)
+    if port:
+        args.append(f"--remote-debugging-port={port}")
+    return {"headless": headless, "args": args}
+
+
+def start_warm_browser(port, headless=True, profile_dir=WARM_PROFILE_DIR, state_file=WARM_BROWSER_FILE):
+    """
+    Start Playwright's Chromium as a detached process listening for CDP on
+    port, so it outlives this process and later crawls attach to it.
+    """
+    existing = cdp_endpoint(port)
+    if existing:
+        print(f"Warm browser already running at {existing}")
+        return existing
+
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as p:
+        executable = p.chromium.executable_path
+    command = [executable, f"--remote-debugging-port={port}", f"--user-data-dir={os.path.abspath(profile_dir)}",
+               *LEAN_ARGS]
+    if headless:
+        command.append("--headless=new")
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                               start_new_session=True)
+
+    url = wait_for_cdp(port)
+    if url is None:
+        process.terminate()
+        raise RuntimeError(f"Chromium did not open a CDP endpoint on port {port}")
+    with open(state_file, "w", encoding="utf-8") as f:
+        json.dump({"pid": process.pid, "cdp_url": url, "headless": headless}, f)
+    print(f"Warm browser (pid {process.pid}) listening at {url}")
+    return url
+
+
+def stop_warm_browser(state_file=WARM_BROWSER_FILE):
+    if not os.path.exists(state_file):
+        print("No warm browser recorded")
+        return False
+    with open(state_file, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    try:
+        os.kill(state["pid"], signal.SIGTERM)
+        print(f"Stopped warm browser (pid {state['pid']})")
+    except ProcessLookupError:
+        print("Warm browser was not running")
+    os.remove(state_file)
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the warm Chromium reused by scraper.py")
+    parser.add_argument("command", choices=["start", "stop", "status"])
+    parser.add_argument("--port", type=int, default=9222)
+    parser.add_argument("--headed", action="store_true", help="Show the browser window")
+    args = parser.parse_args()
+
+    if args.command == "start":
+        start_warm_browser(args.port, headless=not args.headed)
+    elif args.command == "stop":
+        stop_warm_browser()
+    else:
+        url = cdp_endpoint(args.port)
+        print(f"Warm browser at {url}" if url else f"No browser on port {args.port}")
@@ -0,0 +1,170 @@
+import json
+import os
+import threading
+
+from jsonl_io import JsonlWriter, atomic_write_json, iter_jsonl
+
+STATE_FILE = "scrape_resume_state.json"
+JOURNAL_JSONL = "professors.partial.jsonl"
+SIGNATURES_FILE = "major_signatures.json"
+
+
+class CrawlCheckpoint:
+    """
+    Crash-safe progress for a crawl.
+
+    - The journal (professors.partial.jsonl) receives the current state of
+      every professor touched by a major as soon as that major finishes.
+    - The state file (scrape_resume_state.json) lists completed
+      (university, major) pairs and completed universities. It is only
+      updated after the journal lines it vouches for are fsynced.
+
+    A resumed run skips completed universities and majors, and rebuilds a
+    university's merge map by replaying its journal lines (last wins).
+
+    signatures, if given, is the MajorSignatures cache the crawl consults
+    for unchanged majors; it is saved with every completed university.
+
+    Appending a university to the output file is bracketed by
+    begin_output() and complete_university(). If the run dies in between,
+    the state still holds the output size from before that append, and a
+    resumed run truncates the file back to it before the university is
+    written again.
+    """
+
+    def __init__(self, state_path=STATE_FILE, journal_path=JOURNAL_JSONL, resume=False, signatures=None):
+        self.state_path = state_path
+        self.journal_path = journal_path
+        self.signatures = signatures
+        self._lock = threading.Lock()
+
+        state = {}
+        if resume and os.path.exists(state_path):
+            state = load_state(state_path)
+        elif os.path.exists(journal_path):
+            # Fresh run: forget the previous crawl's journal
+            os.remove(journal_path)
+
+        self.completed = {tuple(pair) for pair in state.get("completed", [])}
+        self.completed_universities = set(state.get("completed_universities", []))
+        self.pending_output = state.get("pending_output")
+        if self.pending_output:
+            self._rollback_output(**self.pending_output)
+            self.pending_output = None
+        self._journal = JsonlWriter(journal_path)
+        self._save()
+
+    def is_university_done(self, uni):
+        return uni in self.completed_universities
+
+    def is_major_done(self, uni, major):
+        return (uni, major) in self.completed
+
+    def replay(self, uni):
+        """Rebuild the merge map of a partially crawled university from the journal."""
+        professors = {}
+        for line in iter_jsonl(self.journal_path):
+            if line.get("university") == uni:
+                professors[line["key"]] = line["record"]
+        return professors
+
+    def complete_major(self, uni, major, professors, keys):
+        """Journal the professors in `keys`, fsync, then mark the major done."""
+        for key in keys:
+            self._journal.write({"university": uni, "major": major, "key": key, "record": professors[key]})
+        self._journal.sync()
+        with self._lock:
+            self.completed.add((uni, major))
+            self._save()
+
+    def begin_output(self, uni, path):
+        """
+        Record the size of the output file before uni is appended to it.
+        The caller holds the output lock until complete_university(), so the
+        pending append is always the tail of the file.
+        """
+        offset = os.path.getsize(path) if os.path.exists(path) else 0
+        with self._lock:
+            self.pending_output = {"university": uni, "path": path, "offset": offset}
+            self._save()
+
+    def complete_university(self, uni):
+        if self.signatures is not None:
+            self.signatures.save()
+        with self._lock:
+            self.completed_universities.add(uni)
+            self.pending_output = None
+            self._save()
+
+    @staticmethod
+    def _rollback_output(university, path, offset):
+        """Drop the lines an interrupted append left in the output file."""
+        if os.path.exists(path) and os.path.getsize(path) > offset:
+            with open(path, "r+b") as f:
+                f.truncate(offset)
+                os.fsync(f.fileno())
+            print(f"  → Removed the unfinished output of {university} from {path} (back to {offset} bytes)")
+
+    def _save(self):
+        atomic_write_json(self.state_path, {
+            "completed": sorted(list(pair) for pair in self.completed),
+            "completed_universities": sorted(self.completed_universities),
+            "pending_output": self.pending_output,
+        })
+
+    def close(self):
+        if self.signatures is not None:
+            self.signatures.save()
+        self._journal.close()
+
+
+class MajorSignatures:
+    """
+    Card signatures (card count + hash of the cards' text) of every major
+    from previous crawls, with the cards parsed from them. A major whose
+    signature is unchanged reuses its parsed cards instead of being parsed
+    again. Unlike the checkpoint, this file survives across runs.
+    """
+
+    def __init__(self, path=SIGNATURES_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        if path and os.path.exists(path):
+            self._entries = load_state(path)
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, uni, major, signature):
+        """Cached cards for (uni, major) if signature matches, else None."""
+        with self._lock:
+            entry = self._entries.get(uni, {}).get(major)
+            if signature and entry and entry["signature"] == signature:
+                self.hits += 1
+                return [tuple(card) for card in entry["cards"]]
+            self.misses += 1
+            return None
+
+    def store(self, uni, major, signature, cards):
+        """
+        Remember cards under signature. An empty parse is only stored when
+        the signature says there were no cards: a failed extraction must
+        not be replayed as "unchanged" on later runs.
+        """
+        if not signature:
+            return
+        if not cards and not signature.startswith("0:"):
+            return
+        with self._lock:
+            self._entries.setdefault(uni, {})[major] = {"signature": signature, "cards": [list(c) for c in cards]}
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            atomic_write_json(self.path, self._entries)
+
+
+def load_state(path=STATE_FILE):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
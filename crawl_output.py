@@ -0,0 +1,126 @@
+# crawl_output.py
+# Merging parsed professor cards into one map per university and appending
+# them to professors.jsonl. Shared by scraper.py, scraper_async.py and
+# work_queue.py; it does not import playwright, so exporting a work queue
+# needs no browser stack.
+import json
+import os
+import threading
+import time
+
+import dedup
+import telemetry
+from jsonl_io import read_last_id
+
+OUTPUT_JSONL = "professors.jsonl"
+
+# Serializes ID allocation and appends to the output file across workers
+output_lock = threading.Lock()
+
+
+# -------------------------------------------
+# Utility: clean major titles
+# -------------------------------------------
+def clean_major(title):
+    return title.replace("لیست اساتید گرایش", "").strip()
+
+
+# -------------------------------------------
+# Merge one parsed card into the shared professor map
+# -------------------------------------------
+def professor_key(uni, card):
+    """
+    Merge key of a card within a crawl: normalized name + university
+    (dedup.name_key). The same professor may show up with an email under
+    one major and without it under another, so keying on email would split
+    them; email/URL identity across crawls is dedup.resolve()'s job.
+    """
+    return dedup.name_key(card[0], uni)
+
+
+def merge_professor(all_professors, lock, uni, cleaned, card):
+    """
+    Merge a parsed professor card into all_professors, keyed by
+    professor_key(). Returns the key if the professor is new, else None.
+
+    The map is shared by every worker, so the lookup and the update
+    happen under the same lock.
+    """
+    name, majors_from_card, h_index, profile_url, email, fields = card
+    key = professor_key(uni, card)
+    current_major = majors_from_card.strip() or cleaned
+
+    with lock:
+        if key in all_professors:
+            # ادغام: اضافه کردن گرایش جدید و ادغام فیلدهای تحقیقاتی (بدون تکرار)
+            prof_data = all_professors[key]
+            if current_major:
+                dedup.extend_unique(prof_data['major_list'], [current_major])
+            dedup.extend_unique(prof_data['research_fields'], fields)
+            return None
+
+        # افزودن پروفسور جدید
+        all_professors[key] = {
+            "name": name.strip(),
+            "university": uni,
+            "major_list": [current_major] if current_major else [], # Store as list for merging
+            "h_index": h_index,
+            "profile_url": profile_url,
+            "email": email,
+            "research_fields": list(dict.fromkeys(fields)),
+        }
+        return key
+
+
+# -------------------------------------------
+# FINAL WRITE TO JSONL FILE
+# -------------------------------------------
+def write_professors(all_professors, path=OUTPUT_JSONL):
+    """Append all_professors to path with fresh IDs; returns how many were written."""
+    with telemetry.span("write_professors", professors=len(all_professors)):
+        with output_lock:
+            return write_professors_locked(all_professors, path)
+
+
+def write_professors_locked(all_professors, path=OUTPUT_JSONL):
+    """write_professors() for a caller that already holds output_lock."""
+    # Only the last line is parsed (tail seek), so this stays O(1) in the file size
+    professor_count = read_last_id(path)
+    if professor_count:
+        print(f"  → Continuing IDs after last ID in {path}: {professor_count}")
+
+    # Now professor_count is the last ID + 1 (or 0 if file is new/empty/error)
+    with open(path, "a", encoding="utf-8") as f: # Use "a" to append to the file
+        for key, prof_data in all_professors.items():
+            professor_count += 1
+
+            # Join major list back into a string as a single 'major' entry
+            # NOTE: The original JSONL example showed a single string for major,
+            # but the request mentioned "محمد علی اخائی" who is in "شبکه های کامپیوتری, هوش مصنوعی"
+            # so I will keep the original request's output structure and join the list of majors.
+            # If the user wants an array for majors, they will need to clarify.
+            # For now, I will join them into a string as in the original CSV logic, but I will
+            # rename the field to "majors" for clarity since it will contain multiple.
+            majors_joined = ", ".join(prof_data['major_list'])
+
+            data = {
+                "id": professor_count,
+                "name": prof_data['name'],
+                "university": prof_data['university'],
+                "major": majors_joined, # Keep as string to match original structure (unless clarified)
+                "h_index": prof_data['h_index'],
+                "profile_url": prof_data['profile_url'],
+                "email": prof_data['email'],
+                "research_fields": prof_data['research_fields'],
+                "scraped_at": time.strftime("%Y-%m-%d %H:%M:%S")
+            }
+            data["content_hash"] = dedup.content_hash(data)
+
+            json_line = json.dumps(data, ensure_ascii=False)
+            f.write(json_line + "\n")
+
+        f.flush()
+        os.fsync(f.fileno())
+
+    print(f"=== Finished writing: {len(all_professors)} professors saved to {path} (last ID {professor_count}) ===")
+    return len(all_professors)
@@ -0,0 +1,390 @@
+# cshub_api.py
+# Read professor data straight from the site's JSON (XHR) responses instead
+# of the rendered cards.
+#
+#   1. Capture: attach ResponseCapture to a page while the normal search flow
+#      runs; every JSON response is parsed into professor cards and the
+#      request that produced it is recorded to CAPTURE_FILE.
+#   2. Replay: re-send the recorded requests over plain HTTP with the cookies
+#      from cshub_session.json - no browser at all.
+#   3. Serve: play CAPTURE_FILE back from a local stub server, so replay and
+#      parsing can be exercised offline against recorded fixtures. Requests
+#      are matched on method, path, query and body, so every university
+#      only gets its own recording, e.g.
+#        python cshub_api.py replay --capture-file benchmarks/fixtures/cshub_api_two_universities.json \
+#            "دانشگاه تهران" "دانشگاه صنعتی شریف"
+import argparse
+import http.server
+import json
+import re
+import threading
+import urllib.parse
+import urllib.request
+
+CAPTURE_FILE = "captured_requests.json"
+SESSION_FILE = "cshub_session.json"
+
+# Only responses whose URL matches this are considered search payloads
+API_URL_PATTERN = re.compile(r"cshub\.ir/.*(api|professor)", re.IGNORECASE)
+
+# Request headers worth replaying (cookies come from the session file)
+REPLAY_HEADERS = ("accept", "content-type", "authorization", "x-requested-with")
+
+# JSON keys the backend may use for each card field, in order of preference
+# ("title" is left out: menus and links carry one too)
+NAME_KEYS = ("name", "fullName", "full_name", "professorName", "professor_name")
+MAJOR_KEYS = ("majors", "groups", "orientations", "major", "group", "orientation", "field")
+H_INDEX_KEYS = ("hIndex", "h_index", "hindex", "score", "scientificScore")
+PROFILE_KEYS = ("profileUrl", "profile_url", "link", "url", "homepage", "website")
+EMAIL_KEYS = ("email", "mail", "emailAddress")
+RESEARCH_KEYS = ("researchFields", "research_fields", "researches", "interests", "tags")
+UNIVERSITY_KEYS = ("university", "universityName", "university_name", "uni")
+
+
+# -------------------------------------------
+# Payload parsing
+# -------------------------------------------
+def _first(record, keys):
+    for key in keys:
+        if key in record and record[key] not in (None, "", []):
+            return record[key]
+    return None
+
+
+def _as_text(value):
+    """Flatten a scalar or a {"name"/"title": ...} object into text."""
+    if isinstance(value, dict):
+        value = _first(value, ("name", "title", "value", "fa", "label"))
+    return str(value).strip() if value is not None else ""
+
+
+def _as_text_list(value):
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        value = [value]
+    return [t for t in (_as_text(v) for v in value) if t]
+
+
+def _looks_like_professor(record):
+    # A name plus a link is any menu entry; it takes a professor-specific
+    # field as well
+    if _first(record, NAME_KEYS) is None:
+        return False
+    return any(_first(record, keys) is not None
+               for keys in (EMAIL_KEYS, H_INDEX_KEYS, RESEARCH_KEYS, MAJOR_KEYS))
+
+
+def _iter_professor_records(payload):
+    if isinstance(payload, list):
+        for item in payload:
+            yield from _iter_professor_records(item)
+    elif isinstance(payload, dict):
+        if _looks_like_professor(payload):
+            yield payload
+            return
+        for value in payload.values():
+            yield from _iter_professor_records(value)
+
+
+def parse_api_payload(payload):
+    """
+    Turn one JSON search payload into professor cards.
+
+    Returns a list of (university, card) pairs where card has the same
+    (name, majors, h_index, profile_url, email, fields) shape as
+    scraper.parse_professor. university is "" when the payload does not
+    say, so the caller can fill in the university it searched for.
+    """
+    results = []
+    for record in _iter_professor_records(payload):
+        name = _as_text(_first(record, NAME_KEYS))
+        if not name:
+            continue
+        majors = ", ".join(_as_text_list(_first(record, MAJOR_KEYS)))
+        h_index = "".join(c for c in _as_text(_first(record, H_INDEX_KEYS)) if c.isdigit())
+        profile_url = _as_text(_first(record, PROFILE_KEYS))
+        email = _as_text(_first(record, EMAIL_KEYS))
+        if email.startswith("mailto:"):
+            email = email.replace("mailto:", "").strip()
+        fields = list(dict.fromkeys(f for f in _as_text_list(_first(record, RESEARCH_KEYS)) if len(f) < 100))
+        university = _as_text(_first(record, UNIVERSITY_KEYS))
+        results.append((university, (name, majors, h_index, profile_url, email, fields)))
+    return results
+
+
+# -------------------------------------------
+# Capture: listen to responses during the browser flow
+# -------------------------------------------
+class ResponseCapture:
+    """
+    Collect JSON search responses from a Playwright page.
+
+    Usage:
+        capture = ResponseCapture(page)
+        capture.university = uni
+        ... run the normal search flow ...
+        cards = capture.drain()
+
+    The university being searched is stored with each exchange so replay
+    can swap it for another one.
+    """
+
+    def __init__(self, page, url_pattern=API_URL_PATTERN):
+        self.url_pattern = url_pattern
+        self.university = ""
+        self.exchanges = []   # recorded request/response pairs
+        self._pending = []    # parsed cards not yet drained
+        self._lock = threading.Lock()
+        page.on("response", self._on_response)
+
+    def _on_response(self, response):
+        if not self.url_pattern.search(response.url):
+            return
+        if "json" not in (response.headers.get("content-type") or ""):
+            return
+        try:
+            payload = response.json()
+        except Exception:
+            return
+
+        cards = parse_api_payload(payload)
+        if not cards:
+            return
+
+        request = response.request
+        exchange = {
+            "university": self.university,
+            "method": request.method,
+            "url": request.url,
+            "headers": {k: v for k, v in request.headers.items() if k.lower() in REPLAY_HEADERS},
+            "post_data": request.post_data,
+            "status": response.status,
+            "body": payload,
+        }
+        with self._lock:
+            self.exchanges.append(exchange)
+            self._pending.extend(cards)
+
+    def drain(self):
+        """Return and forget the cards captured since the last drain()."""
+        with self._lock:
+            cards, self._pending = self._pending, []
+        return cards
+
+
+def save_exchanges(exchanges, path=CAPTURE_FILE):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(exchanges, f, ensure_ascii=False, indent=2)
+    print(f"  → Saved {len(exchanges)} captured API exchanges to {path}")
+
+
+def load_exchanges(path=CAPTURE_FILE):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# -------------------------------------------
+# Replay: pure HTTP, no browser
+# -------------------------------------------
+def session_cookie_header(url, session_file=SESSION_FILE):
+    """Build a Cookie header for url from a Playwright storage_state file."""
+    with open(session_file, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    host = urllib.parse.urlsplit(url).hostname or ""
+    pairs = []
+    for cookie in state.get("cookies", []):
+        domain = cookie.get("domain", "").lstrip(".")
+        if host == domain or host.endswith("." + domain):
+            pairs.append(f"{cookie['name']}={cookie['value']}")
+    return "; ".join(pairs)
+
+
+def _rebase(url, base_url):
+    """Point a recorded URL at another origin (e.g. a local stub server)."""
+    if not base_url:
+        return url
+    parts = urllib.parse.urlsplit(url)
+    base = urllib.parse.urlsplit(base_url)
+    return urllib.parse.urlunsplit((base.scheme, base.netloc, parts.path, parts.query, parts.fragment))
+
+
+def _swap_university(text, template, university):
+    """Replace template with university in text: raw, %-encoded and +-encoded, in one pass."""
+    variants = {template: university,
+                urllib.parse.quote_plus(template): urllib.parse.quote_plus(university),
+                urllib.parse.quote(template): urllib.parse.quote(university)}
+    pattern = re.compile("|".join(re.escape(v) for v in sorted(variants, key=len, reverse=True)))
+    return pattern.sub(lambda m: variants[m.group(0)], text)
+
+
+def replay_request(exchange, university=None):
+    """
+    (method, url, body) of a recorded exchange. If university is given, the
+    university the exchange was recorded for is swapped for it in the
+    URL/body, so one recorded search can be replayed for every university.
+    """
+    url = exchange["url"]
+    template_university = exchange.get("university")
+    body = exchange.get("post_data")
+    if university and template_university and university != template_university:
+        url = _swap_university(url, template_university, university)
+        if body:
+            body = _swap_university(body, template_university, university)
+    return exchange.get("method", "GET"), url, body
+
+
+def replay_exchange(exchange, university=None, base_url=None,
+                    session_file=SESSION_FILE, timeout=30):
+    """Re-send one recorded request (see replay_request) and return its JSON payload."""
+    method, url, body = replay_request(exchange, university)
+
+    headers = dict(exchange.get("headers") or {})
+    if session_file:
+        cookie = session_cookie_header(exchange["url"], session_file)
+        if cookie:
+            headers["Cookie"] = cookie
+
+    request = urllib.request.Request(
+        _rebase(url, base_url),
+        data=body.encode("utf-8") if body else None,
+        headers=headers,
+        method=method,
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as resp:
+        return json.loads(resp.read().decode("utf-8"))
+
+
+def crawl_http(universities, exchanges, base_url=None, session_file=SESSION_FILE):
+    """
+    Replay every recorded exchange for each university. Exchanges recorded
+    for different universities become the same request once the university
+    is swapped in; each distinct request is sent once.
+
+    Yields (university, card) pairs in parse_professor card shape.
+    """
+    for uni in universities:
+        print(f"\n=== [http] Starting university: {uni} ===")
+        found = 0
+        sent = set()
+        for exchange in exchanges:
+            request = replay_request(exchange, uni)
+            if request in sent:
+                continue
+            sent.add(request)
+            try:
+                payload = replay_exchange(exchange, uni, base_url=base_url,
+                                          session_file=session_file)
+            except Exception as e:
+                print(f"  → Replay failed for {exchange['url']}: {e}")
+                continue
+            for card_uni, card in parse_api_payload(payload):
+                found += 1
+                yield card_uni or uni, card
+        print(f"  → {found} professor records from API replay.")
+
+
+# -------------------------------------------
+# Stub server: serve recorded fixtures locally
+# -------------------------------------------
+def _normalize_body(body):
+    """Request body as a comparable key: canonical JSON, sorted form fields, or the raw text."""
+    if not body:
+        return ""
+    try:
+        return json.dumps(json.loads(body), sort_keys=True, ensure_ascii=False)
+    except ValueError:
+        pass
+    if "=" in body:
+        return tuple(sorted(urllib.parse.parse_qsl(body, keep_blank_values=True)))
+    return body
+
+
+def stub_route(method, url, body=None):
+    """
+    Key a request is served under: method, path, the decoded query pairs
+    and the body. Percent- vs +-encoding and parameter order don't matter,
+    so a replay for another university only hits that university's
+    recording.
+    """
+    parts = urllib.parse.urlsplit(url)
+    query = tuple(sorted(urllib.parse.parse_qsl(parts.query, keep_blank_values=True)))
+    return method.upper(), parts.path, query, _normalize_body(body)
+
+
+def make_stub_handler(exchanges):
+    """Request handler answering each recorded request (see stub_route) with its body."""
+    routes = {}
+    for exchange in exchanges:
+        key = stub_route(exchange.get("method", "GET"), exchange["url"], exchange.get("post_data"))
+        routes[key] = exchange
+
+    class StubHandler(http.server.BaseHTTPRequestHandler):
+        def _serve(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length).decode("utf-8", "replace") if length else None
+            exchange = routes.get(stub_route(self.command, self.path, body))
+            if exchange is None:
+                self.send_error(404)
+                return
+            body = json.dumps(exchange["body"], ensure_ascii=False).encode("utf-8")
+            self.send_response(exchange.get("status", 200))
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_GET = _serve
+        do_POST = _serve
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def serve_fixtures(exchanges, host="127.0.0.1", port=8765):
+    """Start a stub server in a background thread; returns the server."""
+    server = http.server.ThreadingHTTPServer((host, port), make_stub_handler(exchanges))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay or serve captured cshub.ir API responses")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve = sub.add_parser("serve", help="Serve recorded responses from a local stub server")
+    serve.add_argument("--capture-file", default=CAPTURE_FILE)
+    serve.add_argument("--port", type=int, default=8765)
+
+    parse = sub.add_parser("parse", help="Parse recorded response bodies and print the cards")
+    parse.add_argument("--capture-file", default=CAPTURE_FILE)
+
+    replay = sub.add_parser("replay", help="Replay the recordings for each university against a local stub "
+                                           "and print the cards, e.g. benchmarks/fixtures/cshub_api_two_universities.json")
+    replay.add_argument("--capture-file", default=CAPTURE_FILE)
+    replay.add_argument("universities", nargs="+")
+
+    args = parser.parse_args()
+    exchanges = load_exchanges(args.capture_file)
+
+    if args.command == "replay":
+        server = serve_fixtures(exchanges, port=0)
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            for uni, card in crawl_http(args.universities, exchanges, base_url=base_url, session_file=None):
+                print(json.dumps({"university": uni, "card": card}, ensure_ascii=False))
+        finally:
+            server.shutdown()
+    elif args.command == "serve":
+        server = serve_fixtures(exchanges, port=args.port)
+        print(f"Serving {len(exchanges)} recorded exchanges on http://127.0.0.1:{args.port} (Ctrl+C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+    else:
+        for exchange in exchanges:
+            for uni, card in parse_api_payload(exchange["body"]):
+                print(json.dumps({"university": uni, "card": card}, ensure_ascii=False))
@@ -0,0 +1,189 @@
+# db_client.py
+# Lazily created, per-process MongoClient for app.py.
+#
+# MongoClient is not fork-safe: a client created before gunicorn forks its
+# workers would share sockets between processes. Nothing connects at import
+# time; the first request in each process builds its own client, and a
+# client inherited across a fork is discarded rather than reused.
+import os
+import threading
+import time
+
+from pymongo import MongoClient, monitoring
+
+DEFAULTS = {
+    "MONGO_URI": "mongodb://localhost:27017/",
+    "MONGO_DATABASE": "university_db",
+    "MONGO_COLLECTION": "professors",
+    "MONGO_MAX_POOL_SIZE": 20,
+    "MONGO_MIN_POOL_SIZE": 0,
+    "MONGO_SERVER_SELECTION_TIMEOUT_MS": 2000,
+    "MONGO_CONNECT_TIMEOUT_MS": 2000,
+    "MONGO_SOCKET_TIMEOUT_MS": 10000,
+    "MONGO_WAIT_QUEUE_TIMEOUT_MS": 1000,
+}
+
+
+def config_from_env(overrides=None):
+    """DEFAULTS, overridden by environment variables, then by overrides."""
+    config = {}
+    for key, default in DEFAULTS.items():
+        value = os.environ.get(key)
+        config[key] = type(default)(value) if value is not None else default
+    config.update(overrides or {})
+    return config
+
+
+# -------------------------------------------
+# Connection pool statistics
+# -------------------------------------------
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Counts pool events so /healthz can show saturation."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.open = 0
+            self.checked_out = 0
+            self.peak_checked_out = 0
+            self.created = 0
+            self.closed = 0
+            self.checkout_failures = 0
+            self.pools_cleared = 0
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "open": self.open,
+                "checked_out": self.checked_out,
+                "peak_checked_out": self.peak_checked_out,
+                "created": self.created,
+                "closed": self.closed,
+                "checkout_failures": self.checkout_failures,
+                "pools_cleared": self.pools_cleared,
+            }
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+            self.created += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open -= 1
+            self.closed += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pools_cleared += 1
+
+    # Events that need no bookkeeping
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+
+# -------------------------------------------
+# Per-process client
+# -------------------------------------------
+class MongoConnection:
+    """
+    Holds the client for one process. client is built on first use, and
+    rebuilt if the current pid differs from the one that built it.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.pool_stats = PoolStats()
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None or self._pid != os.getpid():
+            with self._lock:
+                if self._client is None or self._pid != os.getpid():
+                    # The parent's client (if any) is left alone: closing it
+                    # here would close the parent's sockets.
+                    self.pool_stats.reset()
+                    self._client = self._new_client()
+                    self._pid = os.getpid()
+        return self._client
+
+    def _new_client(self):
+        c = self.config
+        return MongoClient(
+            c["MONGO_URI"],
+            maxPoolSize=c["MONGO_MAX_POOL_SIZE"],
+            minPoolSize=c["MONGO_MIN_POOL_SIZE"],
+            serverSelectionTimeoutMS=c["MONGO_SERVER_SELECTION_TIMEOUT_MS"],
+            connectTimeoutMS=c["MONGO_CONNECT_TIMEOUT_MS"],
+            socketTimeoutMS=c["MONGO_SOCKET_TIMEOUT_MS"],
+            waitQueueTimeoutMS=c["MONGO_WAIT_QUEUE_TIMEOUT_MS"],
+            event_listeners=[self.pool_stats],
+            # Don't block on the first connection in the constructor
+            connect=False,
+        )
+
+    @property
+    def db(self):
+        return self.client[self.config["MONGO_DATABASE"]]
+
+    @property
+    def collection(self):
+        return self.db[self.config["MONGO_COLLECTION"]]
+
+    def ping(self):
+        """Round-trip latency of a ping command, in milliseconds."""
+        start = time.perf_counter()
+        self.client.admin.command("ping")
+        return (time.perf_counter() - start) * 1000
+
+    def health(self):
+        report = {
+            "pid": os.getpid(),
+            "max_pool_size": self.config["MONGO_MAX_POOL_SIZE"],
+            "server_selection_timeout_ms": self.config["MONGO_SERVER_SELECTION_TIMEOUT_MS"],
+        }
+        try:
+            report["db_latency_ms"] = round(self.ping(), 3)
+            report["status"] = "ok"
+        except Exception as e:
+            report["status"] = "error"
+            report["error"] = str(e)
+        report["pool"] = self.pool_stats.snapshot()
+        return report
+
+    def close(self):
+        if self._client is not None and self._pid == os.getpid():
+            self._client.close()
+        self._client = None
+        self._pid = None
@@ -0,0 +1,136 @@
+# db_schema.py
+# Typed document schema for the professors collection and the index plan
+# that backs every query shape app.index() issues.
+from datetime import datetime
+
+from pymongo import ASCENDING, TEXT, ReturnDocument
+
+from dedup import content_hash, split_majors
+from search_text import build_search_fields
+
+SCRAPED_AT_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Columns the listing can be sorted by -> document field holding the sort key
+SORT_FIELDS = {
+    "name": "name",
+    "university": "university",
+    # majors is an array; the joined display string is the scalar sort key
+    # (MongoDB cannot put two arrays - majors and research_fields - in one
+    # compound index)
+    "major": "major",
+    "h_index": "h_index",
+}
+
+# Relevance weights of the normalized search fields (see search_text.py)
+TEXT_INDEX_WEIGHTS = {
+    "search.name": 10,
+    "search.fields": 5,
+    "search.major": 3,
+    "search.university": 2,
+    "search.prefixes": 1,
+}
+
+
+def _index_plan():
+    plan = [
+        ([("identity", ASCENDING)], {"unique": True}),
+        # id $in lookups for facet-intersected filters (facets.py). Unique:
+        # the facet postings count ids, so a duplicate id would make the
+        # facet total and the matched documents disagree (renumber the file
+        # with fix_ids.py; the import fails before the swap otherwise)
+        ([("id", ASCENDING)], {"unique": True}),
+        # default_language "none": no stemming or stop words, which would
+        # otherwise apply English rules to Persian text
+        ([(f, TEXT) for f in TEXT_INDEX_WEIGHTS],
+         {"weights": TEXT_INDEX_WEIGHTS, "default_language": "none", "name": "search_text"}),
+    ]
+    for field in SORT_FIELDS.values():
+        # Plain listing sorted by field (either direction walks the index)
+        plan.append(([(field, ASCENDING), ("_id", ASCENDING)], {}))
+        # fields=... filter ($all on research_fields) + the same sort
+        plan.append(([("research_fields", ASCENDING), (field, ASCENDING), ("_id", ASCENDING)], {}))
+    return plan
+
+
+INDEX_PLAN = _index_plan()
+
+
+def ensure_indexes(collection):
+    """Create every index in INDEX_PLAN (no-op for the ones that exist)."""
+    for keys, options in INDEX_PLAN:
+        collection.create_index(keys, **options)
+
+
+# -------------------------------------------
+# Type normalization at ingest
+# -------------------------------------------
+def _to_int(value, default=0):
+    if isinstance(value, bool):
+        return default
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value)
+    digits = "".join(c for c in str(value or "") if c.isdigit())
+    return int(digits) if digits else default
+
+
+def _to_datetime(value):
+    if isinstance(value, datetime) or value is None:
+        return value
+    try:
+        return datetime.strptime(str(value).strip(), SCRAPED_AT_FORMAT)
+    except ValueError:
+        return None
+
+
+def coerce_types(record):
+    """
+    The typed fields of the stored schema (see normalize_record), without
+    the derived search/content_hash fields.
+    """
+    record["id"] = _to_int(record.get("id"))
+    record["h_index"] = _to_int(record.get("h_index"))
+    record["majors"] = split_majors(record.get("majors") or record.get("major"))
+    record["major"] = ", ".join(record["majors"])
+    record["research_fields"] = list(dict.fromkeys(record.get("research_fields") or []))
+    record["scraped_at"] = _to_datetime(record.get("scraped_at"))
+    return record
+
+
+def normalize_record(record):
+    """
+    Coerce a scraped/exported record into the stored schema:
+      id, h_index  -> int
+      majors       -> list of majors (major stays as the joined display string)
+      scraped_at   -> datetime
+      search       -> normalized text for the search index
+      content_hash -> dedup.content_hash (delta imports compare it)
+    """
+    coerce_types(record)
+    record["search"] = build_search_fields(record)
+    record["content_hash"] = content_hash(record)
+    return record
+
+
+# -------------------------------------------
+# Dataset version (bumped by every import, used for cache invalidation)
+# -------------------------------------------
+META_COLLECTION = "meta"
+DATASET_DOC_ID = "dataset"
+
+
+def bump_dataset_version(db):
+    """Increment and return the dataset version after a successful import."""
+    doc = db[META_COLLECTION].find_one_and_update(
+        {"_id": DATASET_DOC_ID},
+        {"$inc": {"version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return doc["version"]
+
+
+def get_dataset_version(db):
+    doc = db[META_COLLECTION].find_one({"_id": DATASET_DOC_ID}, {"version": 1})
+    return doc["version"] if doc else 0
@@ -0,0 +1,370 @@
+# dedup.py
+# Identity resolution for professor records.
+#
+# Records are linked in three passes, all through a union-find:
+#   1. same email or same profile URL (exact keys, always the same person)
+#   2. same normalized name at the same university
+#   3. similar names at the same university, compared only inside blocks
+#      of records that share a name token or its consonant skeleton -
+#      never all pairs
+# Two groups holding different emails (or different profile URLs) are
+# never linked by name, so namesakes stay separate.
+#
+# Usage:
+#   python dedup.py professors.jsonl                       # report only
+#   python dedup.py professors.jsonl new.jsonl -o merged.jsonl
+#   python dedup.py professors.jsonl --in-place
+import argparse
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+
+from jsonl_io import iter_jsonl
+from search_text import tokenize
+
+# Honorifics that are not part of the name
+NAME_TITLES = {"دکتر", "مهندس", "پروفسور", "استاد", "dr", "prof", "professor", "eng"}
+
+# Minimum SequenceMatcher ratio between two compact names
+FUZZY_THRESHOLD = 0.88
+# A token shared by more records than this (a common first name) is too
+# unselective to block on; such blocks are compared in a sorted window instead
+MAX_BLOCK = 200
+WINDOW = 10
+
+MAJOR_SEP_RE = re.compile(r"[,،]")
+
+
+# -------------------------------------------
+# Normalized keys
+# -------------------------------------------
+def normalize_email(value):
+    return (value or "").strip().lower()
+
+
+def normalize_url(value):
+    url = (value or "").strip().lower().rstrip("/")
+    return re.sub(r"^https?://(www\.)?", "", url)
+
+
+def name_tokens(name):
+    return [t for t in tokenize(name) if t not in NAME_TITLES]
+
+
+# Vowel letters and hamza carriers whose spelling varies ("رضایی" /
+# "رضائی", "rezaei" / "rezaie"); dropped from the loose blocking key
+SKELETON_DROP = dict.fromkeys(map(ord, "اآأإءئؤوىيیaeiouy"))
+
+
+def name_skeleton(token):
+    """Consonant skeleton of a name token, so spelling variants share a block."""
+    return token.translate(SKELETON_DROP)
+
+
+def compact_name(name):
+    """
+    Normalized name without separators, so "محمدعلی", "محمد علی" and
+    "محمد‌علی" (ZWNJ) give the same key.
+    """
+    return "".join(name_tokens(name))
+
+
+def university_key(value):
+    return " ".join(tokenize(value))
+
+
+def identity_key(record):
+    """
+    Stable identity for one record: email, then profile URL, then
+    normalized name + university.
+    """
+    email = normalize_email(record.get("email"))
+    if email:
+        return f"email:{email}"
+    url = normalize_url(record.get("profile_url"))
+    if url:
+        return f"url:{url}"
+    return name_key(record.get("name"), record.get("university"))
+
+
+def name_key(name, university):
+    """Normalized name + university; the last resort of identity_key."""
+    return f"name:{compact_name(name)}|{university_key(university)}"
+
+
+def content_hash(record):
+    """
+    Hash of a record's normalized content: everything but id and
+    scraped_at, with majors and research fields order-insensitive. Equal
+    hashes mean nothing a reader can see has changed.
+    """
+    content = [
+        " ".join(tokenize(record.get("name"))),
+        university_key(record.get("university")),
+        sorted(split_majors(record.get("majors") or record.get("major"))),
+        _to_int(record.get("h_index")) or 0,
+        normalize_url(record.get("profile_url")),
+        normalize_email(record.get("email")),
+        sorted(set(record.get("research_fields") or [])),
+    ]
+    raw = json.dumps(content, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def split_majors(value):
+    if isinstance(value, list):
+        return [m.strip() for m in value if m and m.strip()]
+    return [m.strip() for m in MAJOR_SEP_RE.split(value or "") if m.strip()]
+
+
+def extend_unique(target, values, seen=None):
+    """Append the values not already in target, keeping order; returns target."""
+    seen = set(target) if seen is None else seen
+    for value in values:
+        if value not in seen:
+            seen.add(value)
+            target.append(value)
+    return target
+
+
+# -------------------------------------------
+# Union-find with per-group email/URL sets
+# -------------------------------------------
+class UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+        self.rank = [0] * size
+        self.emails = [set() for _ in range(size)]
+        self.urls = [set() for _ in range(size)]
+
+    def find(self, i):
+        root = i
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[i] != root:
+            self.parent[i], i = root, self.parent[i]
+        return root
+
+    def compatible(self, a, b):
+        """False if the groups of a and b hold different emails or different URLs."""
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return True
+        for keys in (self.emails, self.urls):
+            if keys[ra] and keys[rb] and keys[ra].isdisjoint(keys[rb]):
+                return False
+        return True
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return False
+        if self.rank[ra] < self.rank[rb]:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        if self.rank[ra] == self.rank[rb]:
+            self.rank[ra] += 1
+        self.emails[ra] |= self.emails[rb]
+        self.urls[ra] |= self.urls[rb]
+        self.emails[rb] = self.urls[rb] = None
+        return True
+
+
+def names_match(a, b, threshold=FUZZY_THRESHOLD):
+    if a == b:
+        return True
+    if not a or not b or min(len(a), len(b)) / max(len(a), len(b)) < threshold:
+        return False
+    matcher = SequenceMatcher(None, a, b, autojunk=False)
+    return matcher.quick_ratio() >= threshold and matcher.ratio() >= threshold
+
+
+# -------------------------------------------
+# Resolution
+# -------------------------------------------
+def resolve(records, threshold=FUZZY_THRESHOLD):
+    """
+    Group records that describe the same professor.
+
+    Returns (groups, stats): groups is a list of lists of indexes into
+    records, in order of first appearance.
+    """
+    n = len(records)
+    uf = UnionFind(n)
+    stats = Counter(records=n)
+
+    emails = [normalize_email(r.get("email")) for r in records]
+    urls = [normalize_url(r.get("profile_url")) for r in records]
+    for i in range(n):
+        if emails[i]:
+            uf.emails[i].add(emails[i])
+        if urls[i]:
+            uf.urls[i].add(urls[i])
+
+    # Pass 1: exact keys
+    for reason, keys in (("email", emails), ("url", urls)):
+        first = {}
+        for i, key in enumerate(keys):
+            if not key:
+                continue
+            if key in first:
+                stats[f"linked_{reason}"] += uf.union(first[key], i)
+            else:
+                first[key] = i
+
+    # Pass 2: same normalized name at the same university
+    unis = [university_key(r.get("university")) for r in records]
+    names = [compact_name(r.get("name")) for r in records]
+    same_name = defaultdict(list)
+    for i in range(n):
+        if not names[i]:
+            continue
+        # Every earlier record with this name, not only the first: the
+        # first may be a namesake whose email rules it out
+        group = same_name[(unis[i], names[i])]
+        linked = False
+        for j in group:
+            if uf.find(i) == uf.find(j):
+                linked = True
+            elif uf.compatible(i, j):
+                stats["linked_name"] += uf.union(i, j)
+                linked = True
+        if group and not linked:
+            stats["namesakes_kept_apart"] += 1
+        group.append(i)
+
+    # Pass 3: similar names, blocked on (university, name token) and on
+    # (university, token skeleton) so spelling variants meet
+    blocks = defaultdict(list)
+    for i, record in enumerate(records):
+        keys = set()
+        for token in name_tokens(record.get("name")):
+            if len(token) > 1:
+                keys.add(token)
+                skeleton = name_skeleton(token)
+                if len(skeleton) > 1:
+                    keys.add("~" + skeleton)
+        for key in keys:
+            blocks[(unis[i], key)].append(i)
+
+    compared = set()
+    for members in blocks.values():
+        if len(members) <= MAX_BLOCK:
+            pairs = ((a, b) for k, a in enumerate(members) for b in members[k + 1:])
+        else:
+            # Too common to compare all pairs: neighbours in name order
+            ordered = sorted(members, key=names.__getitem__)
+            pairs = ((a, b) for k, a in enumerate(ordered) for b in ordered[k + 1:k + 1 + WINDOW])
+        for a, b in pairs:
+            if uf.find(a) == uf.find(b) or (a, b) in compared:
+                continue
+            compared.add((a, b))
+            stats["fuzzy_comparisons"] += 1
+            if names_match(names[a], names[b], threshold) and uf.compatible(a, b):
+                stats["linked_fuzzy"] += uf.union(a, b)
+
+    groups = defaultdict(list)
+    for i in range(n):
+        groups[uf.find(i)].append(i)
+    stats["groups"] = len(groups)
+    return list(groups.values()), stats
+
+
+def _to_int(value):
+    digits = "".join(c for c in str(value or "") if c.isdigit())
+    return int(digits) if digits else None
+
+
+def merge_records(records):
+    """Fold the records of one group into a single record."""
+    if len(records) == 1:
+        return dict(records[0])
+
+    ids = [_to_int(r.get("id")) for r in records]
+    ordered = [r for _, r in sorted(zip(ids, records), key=lambda pair: (pair[0] is None, pair[0] or 0))]
+    merged = dict(ordered[0])
+
+    name_counts = Counter((r.get("name") or "").strip() for r in ordered if (r.get("name") or "").strip())
+    if name_counts:
+        merged["name"] = max(name_counts, key=lambda name: (name_counts[name], len(name)))
+    for field in ("university", "email", "profile_url"):
+        merged[field] = next((r[field] for r in ordered if r.get(field)), merged.get(field, ""))
+
+    majors, fields = [], []
+    majors_seen, fields_seen = set(), set()
+    for r in ordered:
+        extend_unique(majors, split_majors(r.get("majors") or r.get("major")), majors_seen)
+        extend_unique(fields, r.get("research_fields") or [], fields_seen)
+    merged["major"] = ", ".join(majors)
+    if "majors" in merged:
+        merged["majors"] = majors
+    merged["research_fields"] = fields
+
+    # Highest h-index, in the type it was recorded with
+    merged["h_index"] = max((r.get("h_index") for r in ordered),
+                            key=lambda value: _to_int(value) or 0)
+    stamps = [r["scraped_at"] for r in ordered if r.get("scraped_at")]
+    if stamps:
+        merged["scraped_at"] = max(stamps)
+    return merged
+
+
+def dedup_records(records, threshold=FUZZY_THRESHOLD):
+    """Returns (merged records sorted by id, stats)."""
+    groups, stats = resolve(records, threshold)
+    merged = [merge_records([records[i] for i in group]) for group in groups]
+    merged.sort(key=lambda r: _to_int(r.get("id")) or 0)
+    return merged, stats
+
+
+# -------------------------------------------
+# CLI
+# -------------------------------------------
+def write_jsonl(records, path):
+    """Write records to path through a temp file and an atomic rename."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".dedup-", suffix=".jsonl", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge duplicate professor records across JSONL files")
+    parser.add_argument("inputs", nargs="+", help="JSONL files, e.g. professors.jsonl plus a new crawl")
+    parser.add_argument("-o", "--output", help="Write the merged records here")
+    parser.add_argument("--in-place", action="store_true", help="Overwrite the first input")
+    parser.add_argument("--threshold", type=float, default=FUZZY_THRESHOLD,
+                        help="Name similarity (0-1) needed for a fuzzy match")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    records = [record for path in args.inputs for record in iter_jsonl(path)]
+    merged, stats = dedup_records(records, args.threshold)
+    elapsed = time.perf_counter() - start
+
+    print(f"{stats['records']} records -> {len(merged)} professors in {elapsed:.2f}s")
+    for key in ("linked_email", "linked_url", "linked_name", "linked_fuzzy",
+                "namesakes_kept_apart", "fuzzy_comparisons"):
+        print(f"  {key}: {stats[key]}")
+
+    output = args.inputs[0] if args.in_place else args.output
+    if output:
+        write_jsonl(merged, output)
+        print(f"Wrote {len(merged)} records to {output}")
+
+
+if __name__ == "__main__":
+    main()
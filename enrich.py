@@ -0,0 +1,436 @@
+# enrich.py
+# Fetch every professor's profile_url and add what the page says: page
+# title, academic rank, research interests, publications and scholar links
+# (under a "profile" key).
+#
+# professors.jsonl is read as a stream and each enriched record is appended
+# to the output as soon as its page is done, so the output follows
+# completion order, not input order.
+#
+# - One aiohttp session; its connector keeps a keep-alive pool per host
+#   (limit_per_host) under a global cap, and a semaphore per site
+#   (ece.ut.ac.ir and ut.ac.ir are one site) bounds the pages in flight
+#   against any one university.
+# - ProfileCache (profile_cache/) keeps the body, ETag and Last-Modified of
+#   every page. Re-runs send If-None-Match / If-Modified-Since and re-parse
+#   the cached body on 304; when a fetch fails the cached copy is used and
+#   marked stale.
+#
+#   pip install aiohttp
+#   python enrich.py professors.jsonl -o professors.enriched.jsonl --per-site 4
+#   python benchmarks/bench_enrich.py     # cold/warm runs against a local stub
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+import urllib.parse
+from collections import Counter
+from html.parser import HTMLParser
+
+import aiohttp
+
+import telemetry
+from jsonl_io import JsonlWriter, iter_jsonl
+
+OUTPUT_JSONL = "professors.enriched.jsonl"
+CACHE_DIR = "profile_cache"
+DEFAULT_CONCURRENCY = 32 # requests in flight overall
+DEFAULT_PER_SITE = 4
+DEFAULT_TIMEOUT = 20
+MAX_BODY_BYTES = 2 * 1024 * 1024
+MAX_PUBLICATIONS = 50
+MAX_INTERESTS = 30
+USER_AGENT = "Mozilla/5.0 (compatible; professor-profile-enrich)"
+
+# Second-level labels under which universities register (ut.ac.ir, not ac.ir)
+SHARED_SECOND_LEVEL = {"ac", "co", "org", "gov", "sch", "net", "edu"}
+
+
+# -------------------------------------------
+# Profile page parser
+# -------------------------------------------
+RESEARCH_HEADING = re.compile(
+    r"research\s+(interests?|areas?|topics)|areas\s+of\s+interest|interests"
+    r"|(علایق|علائق|زمینه|حوزه)(‌|\s)*(های|ها)?\s*(پژوهشی|تحقیقاتی)", re.IGNORECASE)
+PUBLICATION_HEADING = re.compile(r"publications?|papers|articles|مقالات|انتشارات", re.IGNORECASE)
+
+# Checked in order: "Associate Professor" must win over "Professor"
+RANKS = (
+    ("Associate Professor", re.compile(r"associate\s+professor|دانشیار", re.IGNORECASE)),
+    ("Assistant Professor", re.compile(r"assistant\s+professor|استادیار", re.IGNORECASE)),
+    ("Professor", re.compile(r"\b(full\s+)?professor\b|استاد\s*تمام", re.IGNORECASE)),
+    ("Lecturer", re.compile(r"\blecturer\b|مربی", re.IGNORECASE)),
+)
+# Only the top of the page is searched for the rank, where the header is
+RANK_TEXT_CHARS = 3000
+
+PROFILE_LINKS = {
+    "google_scholar": "scholar.google.",
+    "orcid": "orcid.org/",
+    "scopus": "scopus.com/",
+    "researchgate": "researchgate.net/",
+    "dblp": "dblp.org/",
+}
+
+
+def clean_text(parts):
+    return " ".join(" ".join(parts).split())
+
+
+class ProfileParser(HTMLParser):
+    """
+    One pass over a profile page. List items are assigned to the section
+    of the last heading (h1-h6) above them: research interests,
+    publications, or none.
+    """
+
+    HEADINGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+
+    def __init__(self, base_url=""):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.title = ""
+        self.heading = ""
+        self.sections = {"research_interests": [], "publications": []}
+        self.links = {}
+        self.top_text = []
+        self._chars = 0
+        self._section = None
+        self._tag = None # title or heading being read
+        self._buf = []
+        self._item = None # text of the open <li>
+        self._skip = 0 # inside <script>/<style>
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style"):
+            self._skip += 1
+        elif tag == "title" or tag in self.HEADINGS:
+            self._tag, self._buf = tag, []
+        elif tag == "li":
+            self._close_item()
+            if self._section:
+                self._item = []
+        elif tag == "a":
+            href = dict(attrs).get("href") or ""
+            for name, needle in PROFILE_LINKS.items():
+                if needle in href and name not in self.links:
+                    self.links[name] = urllib.parse.urljoin(self.base_url, href)
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style"):
+            self._skip = max(0, self._skip - 1)
+        elif tag == self._tag:
+            text = clean_text(self._buf)
+            if tag == "title":
+                self.title = text
+            else:
+                if tag == "h1" and not self.heading:
+                    self.heading = text
+                self._close_item()
+                self._section = classify_heading(text)
+            self._tag = None
+        elif tag == "li":
+            self._close_item()
+        elif tag in ("ul", "ol") and self._item is not None:
+            self._close_item()
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        if self._tag:
+            self._buf.append(data)
+        if self._item is not None:
+            self._item.append(data)
+        if self._chars < RANK_TEXT_CHARS:
+            self.top_text.append(data)
+            self._chars += len(data)
+
+    def _close_item(self):
+        if self._item is not None:
+            text = clean_text(self._item)
+            if text:
+                self.sections[self._section].append(text)
+            self._item = None
+
+    def close(self):
+        super().close()
+        self._close_item()
+
+
+def classify_heading(text):
+    if RESEARCH_HEADING.search(text):
+        return "research_interests"
+    if PUBLICATION_HEADING.search(text):
+        return "publications"
+    return None
+
+
+def find_rank(text):
+    for rank, pattern in RANKS:
+        if pattern.search(text):
+            return rank
+    return None
+
+
+def parse_profile(html, base_url=""):
+    """The fields enrich() adds to a record, from one profile page."""
+    parser = ProfileParser(base_url)
+    parser.feed(html)
+    parser.close()
+    publications = list(dict.fromkeys(parser.sections["publications"]))
+    return {
+        "title": parser.title,
+        "heading": parser.heading,
+        "rank": find_rank(" ".join([parser.title, parser.heading, clean_text(parser.top_text)])),
+        "research_interests": list(dict.fromkeys(parser.sections["research_interests"]))[:MAX_INTERESTS],
+        "publication_count": len(publications),
+        "publications": publications[:MAX_PUBLICATIONS],
+        "links": parser.links,
+    }
+
+
+# -------------------------------------------
+# On-disk HTTP cache
+# -------------------------------------------
+class ProfileCache:
+    """
+    One JSON file per URL (profile_cache/ab/abcdef....json) holding the
+    last 200 body and its ETag / Last-Modified validators.
+    """
+
+    def __init__(self, directory=CACHE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, url):
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest[:2], f"{digest}.json")
+
+    def get(self, url):
+        try:
+            with open(self.path(url), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def put(self, url, etag, last_modified, body):
+        path = self.path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # No fsync: a lost entry only costs one unconditional fetch next run
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"url": url, "etag": etag, "last_modified": last_modified,
+                       "stored_at": time.strftime("%Y-%m-%d %H:%M:%S"), "body": body}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def validators(entry):
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+
+# -------------------------------------------
+# Fetching
+# -------------------------------------------
+async def read_body(resp, limit=MAX_BODY_BYTES):
+    """
+    Read the whole body, up to limit bytes. Returns (bytes, complete);
+    complete is False if the body was cut off at limit.
+    """
+    chunks, size = [], 0
+    async for chunk in resp.content.iter_chunked(64 * 1024):
+        if size + len(chunk) > limit:
+            chunks.append(chunk[:limit - size])
+            return b"".join(chunks), False
+        chunks.append(chunk)
+        size += len(chunk)
+    return b"".join(chunks), True
+
+
+def site_of(url):
+    """Registrable part of the host: ece.ut.ac.ir -> ut.ac.ir, www.sharif.edu -> sharif.edu."""
+    host = (urllib.parse.urlsplit(url).hostname or "").lower()
+    labels = host.split(".")
+    if host.replace(".", "").isdigit() or len(labels) <= 2:
+        return host
+    keep = 3 if labels[-2] in SHARED_SECOND_LEVEL else 2
+    return ".".join(labels[-keep:])
+
+
+class ProfileFetcher:
+    """
+    Conditional GETs through one ClientSession, at most per_site requests
+    in flight per site_of(url). Concurrent requests for one URL share a
+    single fetch.
+    """
+
+    def __init__(self, session, cache, per_site=DEFAULT_PER_SITE):
+        self.session = session
+        self.cache = cache
+        self.per_site = per_site
+        self.sites = {}
+        self.inflight = {}
+        self.outcomes = Counter()
+        self.bytes_received = 0
+
+    def _site_slot(self, url):
+        site = site_of(url)
+        slot = self.sites.get(site)
+        if slot is None:
+            slot = self.sites[site] = asyncio.Semaphore(self.per_site)
+        return slot
+
+    async def profile(self, url):
+        """The "profile" dict for url: fetch outcome plus parse_profile() of the page."""
+        future = self.inflight.get(url)
+        if future is None:
+            future = self.inflight[url] = asyncio.ensure_future(self._profile(url))
+            future.add_done_callback(lambda _: self.inflight.pop(url, None))
+        return dict(await asyncio.shield(future))
+
+    async def _profile(self, url):
+        outcome, body, error = await self.fetch(url)
+        profile = {"status": outcome, "checked_at": time.strftime("%Y-%m-%d %H:%M:%S")}
+        if error:
+            profile["error"] = error
+        if body:
+            profile.update(parse_profile(body, url))
+        # Counted once the profile is built; run() counts the ones that raise
+        self.outcomes[outcome] += 1
+        return profile
+
+    async def fetch(self, url):
+        """
+        Returns (outcome, body, error); outcome is fetched, not_modified,
+        truncated (over MAX_BODY_BYTES, not cached), stale (failed, cached
+        body used), not_html, http_<status> or error.
+        """
+        entry = self.cache.get(url)
+        with telemetry.span("profile_fetch") as span_labels:
+            async with self._site_slot(url):
+                try:
+                    async with self.session.get(url, headers=self.cache.validators(entry)) as resp:
+                        if resp.status == 304 and entry:
+                            outcome, body, error = "not_modified", entry["body"], None
+                        elif resp.status == 200:
+                            if resp.content_type not in ("text/html", "application/xhtml+xml"):
+                                outcome, body, error = "not_html", None, resp.content_type
+                            else:
+                                raw, complete = await read_body(resp)
+                                self.bytes_received += len(raw)
+                                body = raw.decode(resp.charset or "utf-8", errors="replace")
+                                if complete:
+                                    await asyncio.to_thread(self.cache.put, url, resp.headers.get("ETag"),
+                                                            resp.headers.get("Last-Modified"), body)
+                                    outcome, error = "fetched", None
+                                else:
+                                    # Parsed as far as it goes, but never cached as the page
+                                    outcome, error = "truncated", f"body over {MAX_BODY_BYTES} bytes"
+                        else:
+                            outcome, body, error = f"http_{resp.status}", None, resp.reason
+                except (aiohttp.ClientError, asyncio.TimeoutError, UnicodeError, ValueError) as e:
+                    outcome, body, error = "error", None, str(e) or type(e).__name__
+            if body is None and entry and outcome not in ("not_html", "http_404", "http_410"):
+                # Keep serving what we had rather than dropping the profile
+                outcome, body = "stale", entry["body"]
+            span_labels["outcome"] = outcome
+        return outcome, body, error
+
+
+# -------------------------------------------
+# Pipeline
+# -------------------------------------------
+async def enrich(source, output=OUTPUT_JSONL, cache_dir=CACHE_DIR, concurrency=DEFAULT_CONCURRENCY,
+                 per_site=DEFAULT_PER_SITE, timeout=DEFAULT_TIMEOUT, limit=None):
+    """
+    Stream source, fetch profile pages and append each enriched record to
+    output as soon as it is ready. At most 2 x concurrency records are held
+    in memory at a time. Returns (records written, ProfileFetcher).
+    """
+    cache = ProfileCache(cache_dir)
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=per_site, ttl_dns_cache=300)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    window = asyncio.Semaphore(concurrency * 2)
+    written = 0
+
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout,
+                                     headers={"User-Agent": USER_AGENT}) as session:
+        fetcher = ProfileFetcher(session, cache, per_site)
+        with JsonlWriter(output) as writer:
+            async def run(record):
+                nonlocal written
+                try:
+                    try:
+                        record["profile"] = await fetcher.profile(record["profile_url"])
+                    except Exception as e:
+                        # A bad page or a failed cache write costs this record,
+                        # not the run. writer.write() below is deliberately not
+                        # covered: if the output file can't be written, nothing
+                        # more can be recorded and the run should stop.
+                        fetcher.outcomes["error"] += 1
+                        record["profile"] = {"status": "error", "checked_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                                             "error": f"{type(e).__name__}: {e}"}
+                    writer.write(record)
+                    written += 1
+                finally:
+                    window.release()
+
+            tasks = set()
+            for n, record in enumerate(iter_jsonl(source)):
+                if limit is not None and n >= limit:
+                    break
+                if not (record.get("profile_url") or "").startswith(("http://", "https://")):
+                    fetcher.outcomes["no_url"] += 1
+                    writer.write(record)
+                    written += 1
+                    continue
+                await window.acquire()
+                task = asyncio.create_task(run(record))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+    return written, fetcher
+
+
+def report(written, fetcher, output, elapsed):
+    print(f"=== Enriched {written} records in {elapsed:.1f}s ({written / max(elapsed, 1e-9):.1f}/s) → {output} ===")
+    print("  → Outcomes: " + ", ".join(f"{name} {count}" for name, count in fetcher.outcomes.most_common()))
+    requests = sum(count for name, count in fetcher.outcomes.items() if name != "no_url")
+    if requests:
+        print(f"  → {fetcher.outcomes['not_modified']}/{requests} answered 304 from {fetcher.cache.directory}; "
+              f"{fetcher.bytes_received / 1024:.0f} KiB downloaded over {len(fetcher.sites)} sites")
+
+
+def main(source="professors.jsonl", output=OUTPUT_JSONL, **options):
+    # The output only ever holds one run
+    if os.path.exists(output):
+        os.remove(output)
+    started = time.perf_counter()
+    written, fetcher = asyncio.run(enrich(source, output, **options))
+    report(written, fetcher, output, time.perf_counter() - started)
+    return written, fetcher
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add profile-page details to professors.jsonl")
+    parser.add_argument("source", nargs="?", default="professors.jsonl")
+    parser.add_argument("-o", "--output", default=OUTPUT_JSONL)
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="ETag/Last-Modified cache of fetched pages")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Requests in flight overall")
+    parser.add_argument("--per-site", type=int, default=DEFAULT_PER_SITE,
+                        help="Requests in flight (and pooled connections) per site")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="Seconds per page")
+    parser.add_argument("--limit", type=int, help="Only the first N records")
+    parser.add_argument("--trace-file", help="Append JSON-lines timing spans here")
+    args = parser.parse_args()
+    telemetry.configure(trace_path=args.trace_file)
+    main(args.source, args.output, cache_dir=args.cache_dir, concurrency=args.concurrency,
+         per_site=args.per_site, timeout=args.timeout, limit=args.limit)
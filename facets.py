@@ -0,0 +1,119 @@
+# facets.py
+# Facet index materialized at import time: a sorted postings list of
+# professor ids per research field, and counts per university and major.
+# app.py loads it once per dataset version and answers chip counts and
+# conjunctive fields= filters from memory.
+from array import array
+from bisect import bisect_left
+
+FACETS_COLLECTION = "facets"
+
+# Facets with postings lists (id lists) vs. plain counts
+POSTING_FACETS = ("research_fields",)
+COUNT_FACETS = {"university": "university", "major": "majors"}
+
+
+def build_facets(collection):
+    """Scan the (staging) collection once and build every facet."""
+    projection = {"id": 1, "university": 1, "majors": 1, "research_fields": 1, "_id": 0}
+    return collect_facets(collection.find({}, projection).batch_size(5000))
+
+
+def collect_facets(docs):
+    """Facet postings and counts over an iterable of professor documents."""
+    postings = {facet: {} for facet in POSTING_FACETS}
+    counts = {facet: {} for facet in COUNT_FACETS}
+
+    for doc in docs:
+        doc_id = doc.get("id")
+        for facet in POSTING_FACETS:
+            for value in set(doc.get(facet) or []):
+                postings[facet].setdefault(value, []).append(doc_id)
+        for facet, field in COUNT_FACETS.items():
+            values = doc.get(field)
+            for value in set(values if isinstance(values, list) else [values]):
+                if value:
+                    counts[facet][value] = counts[facet].get(value, 0) + 1
+
+    for facet_postings in postings.values():
+        for ids in facet_postings.values():
+            ids.sort()
+    return postings, counts
+
+
+def write_facets(db, postings, counts, name=FACETS_COLLECTION):
+    """
+    Store one document per facet value in a staging collection and swap it
+    in, like the professors import.
+    """
+    staging = db[f"{name}_staging"]
+    staging.drop()
+    docs = []
+    for facet, values in postings.items():
+        docs.extend({"facet": facet, "value": value, "count": len(ids), "ids": ids}
+                    for value, ids in values.items())
+    for facet, values in counts.items():
+        docs.extend({"facet": facet, "value": value, "count": count}
+                    for value, count in values.items())
+    if docs:
+        staging.insert_many(docs, ordered=False)
+        staging.rename(name, dropTarget=True)
+    else:
+        # Nothing to rename (an empty staging collection does not exist);
+        # drop the live one so the previous import's facets don't linger
+        db[name].drop()
+    return len(docs)
+
+
+class FacetIndex:
+    """In-memory view of the facets collection."""
+
+    def __init__(self, postings, counts):
+        self.postings = postings  # facet -> value -> array of sorted ids
+        self.counts = counts      # facet -> value -> count
+
+    @classmethod
+    def load(cls, db, name=FACETS_COLLECTION):
+        postings = {facet: {} for facet in POSTING_FACETS}
+        counts = {facet: {} for facet in list(POSTING_FACETS) + list(COUNT_FACETS)}
+        for doc in db[name].find({}, {"_id": 0}):
+            counts.setdefault(doc["facet"], {})[doc["value"]] = doc["count"]
+            if "ids" in doc:
+                postings.setdefault(doc["facet"], {})[doc["value"]] = array("q", doc["ids"])
+        return cls(postings, counts)
+
+    def __bool__(self):
+        return any(self.counts.values())
+
+    def count(self, facet, value):
+        return self.counts.get(facet, {}).get(value, 0)
+
+    def match_all(self, facet, values):
+        """Sorted ids having every one of values (conjunctive filter)."""
+        lists = [self.postings.get(facet, {}).get(v, array("q")) for v in values]
+        return intersect_sorted(lists)
+
+
+def intersect_sorted(lists):
+    """
+    Intersect sorted id lists, smallest first. Each candidate is located in
+    the longer lists by binary search, so the cost is driven by the rarest
+    value rather than the most common one.
+    """
+    if not lists:
+        return []
+    lists = sorted(lists, key=len)
+    result = list(lists[0])
+    for other in lists[1:]:
+        if not result:
+            break
+        kept = []
+        lo = 0
+        for value in result:
+            lo = bisect_left(other, value, lo)
+            if lo == len(other):
+                break
+            if other[lo] == value:
+                kept.append(value)
+        result = kept
+    return result
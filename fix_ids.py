@@ -1,7 +1,46 @@
+import argparse
 import json
+import os
+import tempfile
+import time
 
-def fix_ids():
-    with open('professors.jsonl', 'r', encoding='utf-8') as f:
+from jsonl_io import read_last_id
+
+def fix_ids(path='professors.jsonl'):
+    """
+    Renumber every record in path to 1..N.
+
+    Streams line by line into a temp file in the same directory and swaps it
+    in with an atomic rename, so memory stays constant and a crash never
+    leaves a half-written file behind.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.fix_ids-', suffix='.jsonl', dir=directory)
+    count = 0
+    try:
+        with open(path, 'r', encoding='utf-8') as src, os.fdopen(fd, 'w', encoding='utf-8') as dst:
+            for line in src:
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                count += 1
+                data['id'] = count
+                dst.write(json.dumps(data, ensure_ascii=False) + '\n')
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return count
+
+
+# -------------------------------------------
+# Benchmark: old O(file) paths vs. streaming/tail-seek
+# -------------------------------------------
+def _fix_ids_readlines(path):
+    """The previous implementation, kept only as the benchmark baseline."""
+    with open(path, 'r', encoding='utf-8') as f:
         lines = f.readlines()
 
     fixed_lines = []
@@ -10,9 +49,62 @@ def fix_ids():
         data['id'] = i
         fixed_lines.append(json.dumps(data, ensure_ascii=False))
 
-    with open('professors.jsonl', 'w', encoding='utf-8') as f:
+    with open(path, 'w', encoding='utf-8') as f:
         for line in fixed_lines:
             f.write(line + '\n')
 
+
+def _last_id_readlines(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    last_line = next(line for line in reversed(lines) if line.strip())
+    return int(json.loads(last_line).get('id', 0))
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:
+        return float('nan')
+
+
+def write_synthetic(path, rows, template='professors.jsonl'):
+    """Write `rows` records by cycling through the template file's records."""
+    with open(template, 'r', encoding='utf-8') as f:
+        samples = [json.loads(line) for line in f if line.strip()]
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(rows):
+            data = dict(samples[i % len(samples)])
+            data['id'] = rows - i  # scrambled, so renumbering has work to do
+            f.write(json.dumps(data, ensure_ascii=False) + '\n')
+
+
+def benchmark(rows):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'professors.jsonl')
+        write_synthetic(path, rows)
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"Synthetic file: {rows} rows, {size_mb:.1f} MB")
+
+        for label, fn in (("last id: tail seek", read_last_id),
+                          ("renumber: streaming", fix_ids),
+                          ("last id: readlines", _last_id_readlines),
+                          ("renumber: readlines", _fix_ids_readlines)):
+            start = time.perf_counter()
+            fn(path)
+            elapsed = time.perf_counter() - start
+            # ru_maxrss is a high-water mark, so run the streaming paths first
+            print(f"  {label:<22} {elapsed * 1000:10.1f} ms   peak RSS {_peak_rss_mb():8.1f} MB")
+
+
 if __name__ == '__main__':
-    fix_ids()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Renumber professors.jsonl IDs to 1..N")
+    parser.add_argument('path', nargs='?', default='professors.jsonl')
+    parser.add_argument('--benchmark', type=int, metavar='ROWS',
+                        help="Instead of fixing, benchmark on a synthetic file with ROWS records")
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark(args.benchmark)
+    else:
+        print(f"Renumbered {fix_ids(args.path)} records in {args.path}")
@@ -1,32 +1,290 @@
+import argparse
+import csv
 import json
-from pymongo import MongoClient
+import os
+import re
+import time
+from collections import Counter
 
-def import_data_to_mongodb(file_path, db_name, collection_name):
+from pymongo import DeleteOne, InsertOne, MongoClient, ReplaceOne, UpdateOne
+
+from db_schema import bump_dataset_version, ensure_indexes, normalize_record
+from dedup import dedup_records, identity_key
+from facets import build_facets, write_facets
+from jsonl_io import iter_jsonl
+
+MONGO_URI = 'mongodb://localhost:27017/'
+BATCH_SIZE = 1000
+CHANGELOG_JSONL = 'import_changes.jsonl'
+
+# professors.csv header -> record field
+CSV_COLUMNS = {
+    "No.": "id",
+    "Name": "name",
+    "University": "university",
+    "Major": "major",
+    "H-Index": "h_index",
+    "Profile URL": "profile_url",
+    "Email": "email",
+    "Research Fields": "research_fields",
+}
+
+
+# -------------------------------------------
+# Input readers - each yields plain record dicts, one at a time
+# -------------------------------------------
+def _split_fields(value):
+    return [f.strip() for f in re.split(r"[,;،]", value or "") if f.strip()]
+
+
+def _cell_text(value):
+    """xlrd returns numbers as floats; 14.0 -> "14"."""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def iter_csv_records(file_path):
+    with open(file_path, 'r', encoding='utf-8-sig', newline='') as f:
+        for row in csv.DictReader(f):
+            record = {CSV_COLUMNS.get(k, k): (v or "").strip() for k, v in row.items() if k}
+            record["research_fields"] = _split_fields(record.get("research_fields"))
+            yield record
+
+
+def iter_xls_records(file_path):
+    """Read the Compass-style export (university_db.professors.xls)."""
+    try:
+        import xlrd
+    except ImportError:
+        raise SystemExit("Reading .xls files requires xlrd: pip install xlrd")
+
+    book = xlrd.open_workbook(file_path, on_demand=True)
+    sheet = book.sheet_by_index(0)
+    header = [_cell_text(h) for h in sheet.row_values(0)]
+    for r in range(1, sheet.nrows):
+        record = {"research_fields": []}
+        for column, value in zip(header, sheet.row_values(r)):
+            text = _cell_text(value)
+            column = CSV_COLUMNS.get(column, column)
+            if column == "research_fields":
+                record["research_fields"].extend(_split_fields(text))
+            elif column.startswith("research_fields["):
+                # Flattened array columns: research_fields[0], research_fields[1], ...
+                if text:
+                    record["research_fields"].append(text)
+            else:
+                record[column] = text
+        yield record
+    book.release_resources()
+
+
+def iter_records(file_path):
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == ".csv":
+        return iter_csv_records(file_path)
+    if ext == ".xls":
+        return iter_xls_records(file_path)
+    if ext == ".snapshot":
+        import snapshot
+        return snapshot.iter_records(file_path)
+    return iter_jsonl(file_path)
+
+
+# -------------------------------------------
+# Identity
+# -------------------------------------------
+def record_identity(record):
+    """
+    Stable identity used as the upsert key: email, then profile URL, then
+    normalized name + university (dedup.identity_key). Re-importing the
+    same professor always hits the same document.
+    """
+    return identity_key(record)
+
+
+# -------------------------------------------
+# Import
+# -------------------------------------------
+def _flush(collection, ops):
+    if ops:
+        collection.bulk_write(ops, ordered=False)
+    return []
+
+
+def import_data_to_mongodb(file_path, db_name, collection_name, batch_size=BATCH_SIZE, mongo_uri=MONGO_URI,
+                          dedup=False):
     """
-    Imports data from a JSONL file to a MongoDB collection.
+    Imports data from a JSONL, CSV, XLS or snapshot file to a MongoDB collection.
+
+    The file is streamed into a staging collection with batched, idempotent
+    upserts keyed on record_identity(); every record is coerced to the typed
+    schema (db_schema.normalize_record) on the way in. Indexes are built on the staging
+    collection, which then replaces the live one with a single
+    renameCollection(dropTarget=True), so readers never see an empty or
+    half-loaded collection.
 
     Args:
-        file_path (str): The path to the JSONL file.
+        file_path (str): The path to the .jsonl, .csv, .xls or .snapshot file.
         db_name (str): The name of the MongoDB database.
         collection_name (str): The name of the collection to import data into.
+        batch_size (int): Upserts sent per bulk_write round trip.
+        dedup (bool): Merge duplicate professors (dedup.py) before loading.
+            Without it, records sharing an identity overwrite each other.
+    """
+    client = MongoClient(mongo_uri)
+    db = client[db_name]
+    staging = db[f"{collection_name}_staging"]
+
+    # Leftovers from an interrupted import
+    staging.drop()
+    staging.create_index("identity", unique=True)
+
+    start = time.perf_counter()
+    count = 0
+    ops = []
+    records = iter_records(file_path)
+    if dedup:
+        records, stats = dedup_records(list(records))
+        print(f"  → Dedup: {stats['records']} records -> {len(records)} professors")
+    for record in records:
+        record.pop("_id", None)
+        record = normalize_record(record)
+        record["identity"] = record_identity(record)
+        ops.append(UpdateOne({"identity": record["identity"]}, {"$set": record}, upsert=True))
+        count += 1
+        if len(ops) >= batch_size:
+            ops = _flush(staging, ops)
+    ops = _flush(staging, ops)
+    load_seconds = time.perf_counter() - start
+
+    ensure_indexes(staging)
+
+    # Facet postings/counts for the filter chips, from the final documents
+    postings, counts = build_facets(staging)
+
+    staging.rename(collection_name, dropTarget=True)
+    # Facets go live only after the data they describe (a failed rename
+    # leaves both on the previous import); app.py reloads them when the
+    # version bump below tells it the dataset changed
+    facet_docs = write_facets(db, postings, counts)
+    # Invalidates app.py's response cache and ETags
+    version = bump_dataset_version(db)
+    total_seconds = time.perf_counter() - start
+
+    rate = count / load_seconds if load_seconds else float("inf")
+    print(f"Successfully imported {count} records from '{file_path}' to the '{collection_name}' collection "
+          f"in the '{db_name}' database ({rate:.0f} docs/sec load, {total_seconds:.2f}s total, {facet_docs} facet values, dataset version {version}).")
+    client.close()
+    return count
+
+# -------------------------------------------
+# Delta import
+# -------------------------------------------
+def import_delta_to_mongodb(file_path, db_name, collection_name, batch_size=BATCH_SIZE, mongo_uri=MONGO_URI,
+                            dedup=False, changelog_path=CHANGELOG_JSONL):
+    """
+    Apply file_path to the live collection as a delta instead of reloading it.
+
+    Each incoming record is matched to the stored document with the same
+    record_identity() and compared by content_hash:
+      - no stored document      -> insert
+      - different content_hash  -> replace
+      - same content_hash       -> untouched (no write at all)
+      - stored but not in file  -> delete (tombstone)
+    so the writes are proportional to what changed. file_path must be a
+    full snapshot: a professor missing from it is deleted.
+
+    Every write is appended to changelog_path as one JSON line, tagged with
+    the dataset version it produced. Facets and the dataset version are
+    only rebuilt / bumped when something changed.
     """
-    client = MongoClient('mongodb://localhost:27017/')
+    client = MongoClient(mongo_uri)
     db = client[db_name]
-    collection = db[collection_name]
+    live = db[collection_name]
+    ensure_indexes(live)
+
+    start = time.perf_counter()
+    # identity -> (_id, content_hash, id) of every stored document
+    stored = {doc["identity"]: (doc["_id"], doc.get("content_hash"), doc.get("id"))
+              for doc in live.find({}, {"identity": 1, "content_hash": 1, "id": 1})}
+
+    counts = Counter()
+    changes = []
+    seen = {}  # identity -> content_hash written (or kept) for it
+    ops = []
+    records = iter_records(file_path)
+    if dedup:
+        records, stats = dedup_records(list(records))
+        print(f"  → Dedup: {stats['records']} records -> {len(records)} professors")
+    for record in records:
+        record.pop("_id", None)
+        record = normalize_record(record)
+        identity = record["identity"] = record_identity(record)
+        new_hash = record["content_hash"]
+        old = stored.get(identity)
+        # A repeated identity in the file behaves like the full import: last wins
+        old_hash = seen[identity] if identity in seen else (old[1] if old else None)
+        seen[identity] = new_hash
+        counts["records"] += 1
 
-    # Clear existing data in the collection to avoid duplicates on re-run
-    collection.delete_many({})
+        if old is None and old_hash is None:
+            ops.append(InsertOne(record))
+            op = "insert"
+        elif old_hash != new_hash:
+            ops.append(ReplaceOne({"identity": identity}, record))
+            op = "update"
+        else:
+            counts["unchanged"] += 1
+            continue
+        counts[op] += 1
+        changes.append({"op": op, "identity": identity, "id": record["id"],
+                        "content_hash": new_hash, "previous_hash": old_hash})
+        if len(ops) >= batch_size:
+            ops = _flush(live, ops)
 
-    with open(file_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            try:
-                data = json.loads(line)
-                collection.insert_one(data)
-            except json.JSONDecodeError:
-                print(f"Skipping invalid JSON line: {line.strip()}")
+    for identity, (_id, old_hash, old_id) in stored.items():
+        if identity not in seen:
+            ops.append(DeleteOne({"_id": _id}))
+            counts["delete"] += 1
+            changes.append({"op": "delete", "identity": identity, "id": old_id,
+                            "content_hash": None, "previous_hash": old_hash})
+            if len(ops) >= batch_size:
+                ops = _flush(live, ops)
+    ops = _flush(live, ops)
 
-    print(f"Successfully imported data from '{file_path}' to the '{collection_name}' collection in the '{db_name}' database.")
+    version = None
+    if changes:
+        postings, counts_by_facet = build_facets(live)
+        write_facets(db, postings, counts_by_facet)
+        version = bump_dataset_version(db)
+        with open(changelog_path, "a", encoding="utf-8") as f:
+            for change in changes:
+                f.write(json.dumps({"version": version, **change}, ensure_ascii=False) + "\n")
+
+    total_seconds = time.perf_counter() - start
+    print(f"Delta import of '{file_path}' into '{db_name}.{collection_name}': {counts['records']} records, "
+          f"{counts['insert']} inserted, {counts['update']} updated, {counts['delete']} deleted, "
+          f"{counts['unchanged']} unchanged in {total_seconds:.2f}s"
+          + (f" (dataset version {version}, changes logged to {changelog_path})." if version else " - nothing to do."))
     client.close()
+    return counts
+
 
 if __name__ == "__main__":
-    import_data_to_mongodb('professors.jsonl', 'university_db', 'professors')
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Import professors into MongoDB (.jsonl, .csv, .xls or .snapshot)")
+    parser.add_argument("file_path", nargs="?", default="professors.jsonl")
+    parser.add_argument("--db", default="university_db")
+    parser.add_argument("--collection", default="professors")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--dedup", action="store_true",
+                        help="Merge duplicate professors (email / profile URL / similar names) before loading")
+    parser.add_argument("--delta", action="store_true",
+                        help="Only insert/update/delete what changed in the live collection (by content hash)")
+    parser.add_argument("--changelog", default=CHANGELOG_JSONL, help="--delta: where to append the change log")
+    args = parser.parse_args()
+    if args.delta:
+        import_delta_to_mongodb(args.file_path, args.db, args.collection, args.batch_size,
+                                dedup=args.dedup, changelog_path=args.changelog)
+    else:
+        import_data_to_mongodb(args.file_path, args.db, args.collection, args.batch_size, dedup=args.dedup)
@@ -0,0 +1,129 @@
+import json
+import os
+import threading
+import time
+
+
+def iter_jsonl(path):
+    """
+    Stream records from a JSONL file one line at a time.
+
+    A torn final line (the process died mid-write) is skipped rather than
+    raising, so a crashed crawl can always be read back.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                print(f"  → Skipping invalid JSON line in {path}: {line[:80]}")
+
+
+def iter_lines_reversed(path, chunk_size=65536):
+    """Yield the raw lines of a file from last to first, reading backwards in chunks."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        remainder = b""
+        while pos > 0:
+            step = min(chunk_size, pos)
+            pos -= step
+            f.seek(pos)
+            lines = (f.read(step) + remainder).split(b"\n")
+            # The first piece may be the tail of an earlier line; keep it for the next chunk
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                yield line
+        yield remainder
+
+
+def read_last_record(path):
+    """
+    Parse only the last valid line of a JSONL file by seeking backwards from
+    the end - O(line length), not O(file). A torn final line is skipped.
+    Returns None for a missing or empty file.
+    """
+    if not os.path.exists(path):
+        return None
+    for line in iter_lines_reversed(path):
+        if not line.strip():
+            continue
+        try:
+            return json.loads(line.decode("utf-8"))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            continue
+    return None
+
+
+def read_last_id(path):
+    """ID of the last record in path, or 0 if there is none."""
+    record = read_last_record(path)
+    try:
+        return int(record.get("id", 0)) if record else 0
+    except (TypeError, ValueError):
+        return 0
+
+
+def atomic_write_json(path, data):
+    """Write data to path via a temp file + rename, so readers never see half a file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class JsonlWriter:
+    """
+    Thread-safe, append-only JSONL writer with batched fsync.
+
+    write() only buffers through the OS; the data is forced to disk every
+    `fsync_every` records or `fsync_interval` seconds, or whenever sync()
+    is called (e.g. at a checkpoint boundary).
+    """
+
+    def __init__(self, path, fsync_every=100, fsync_interval=2.0):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._f = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._f.write(line)
+            self._unsynced += 1
+            if (self._unsynced >= self.fsync_every
+                    or time.monotonic() - self._last_sync >= self.fsync_interval):
+                self._sync_locked()
+
+    def sync(self):
+        with self._lock:
+            self._sync_locked()
+
+    def _sync_locked(self):
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if not self._f.closed:
+                self._sync_locked()
+                self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
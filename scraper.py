@@ -1,35 +1,204 @@
 from playwright._impl._errors import TimeoutError
 from playwright.sync_api import sync_playwright
-import json
+import argparse
+import asyncio
+import itertools
+import queue
+import threading
 import time
-import os
+
+import browser_profile
+import crawl_output
+import cshub_api
+import telemetry
+from checkpoint import CrawlCheckpoint, MajorSignatures
+# Card merging lives in crawl_output (no playwright import); re-exported here
+from crawl_output import clean_major, merge_professor, professor_key
 
 OUTPUT_JSONL = "professors.jsonl"
+SESSION_FILE = "cshub_session.json"
+SEARCH_URL = "https://major.cshub.ir/professor-search"
+
+UNIVERSITIES = ["دانشگاه تهران"]
+
+# Worker pool: one Chromium process, one BrowserContext per worker
+DEFAULT_CONCURRENCY = 4
+# Where a warm browser (browser_profile.py start) listens; a browser the
+# crawl launches itself gets a free port instead
+CDP_PORT = 9222
+
+ADVANCED_SEARCH_SELECTOR = "li[title='جستجوی پیشرفته']"
+UNIVERSITY_PLACEHOLDER = "نام دانشگاه مورد نظر را وارد کنید"
+SEARCH_BUTTON_SELECTOR = "button:has-text('جستجوی موارد انتخاب شده')"
+RESULTS_TITLE_SELECTOR = "div:has-text('نتایج جستجو')"
+MAJOR_PANEL_SELECTOR = "div.professor__list"
+MAJOR_TITLE_SELECTOR = "span.professor__list-title"
+CARD_SELECTOR = "div.professor__details"
+
+# Fixed delays (ms) the old flow paid per phase. The event-driven waits below
+# use them as the baseline when reporting how much idle time was saved.
+WAIT_BUDGETS_MS = {
+    "page_ready": 1500,
+    "advanced_search": 3000,
+    "suggestions": 4000,
+    "selection": 1000,
+    "button_enabled": 300,
+    "results_xhr": 1700,
+    "majors_rendered": 500,
+    "cards_loaded": 2000,
+    "panel_closed": 1300,
+}
+# Ceiling for any single event-driven wait
+WAIT_CEILING_MS = 10000
+# A card list counts as stable once its size has not changed for this long
+STABLE_QUIET_MS = 250
+
+WAIT_STATS = {} # phase -> {"waits": n, "budget": s, "spent": s}
+_wait_stats_lock = threading.Lock()
+
+# Lean profile: requests aborted per context, and bytes/time per phase
+# (see browser_profile.py). main() reconfigures the blocker from the CLI.
+RESOURCE_BLOCKER = browser_profile.ResourceBlocker()
+TRANSFER_STATS = browser_profile.TransferStats()
+
+# JSON-lines timing spans (telemetry.py) of the last crawl
+TRACE_JSONL = "scrape_traces.jsonl"
+
+# Serializes ID allocation and appends to OUTPUT_JSONL across workers
+_output_lock = crawl_output.output_lock
 
 # -------------------------------------------
-# Utility: clean major titles
+# Utility: click an element containing text
 # -------------------------------------------
-def clean_major(title):
-    return title.replace("لیست اساتید گرایش", "").strip()
+def click_by_text(page, text):
+    page.locator(f"text={text}").first.click()
 
 
 # -------------------------------------------
-# Utility: click an element containing text
+# Utility: event-driven waits with savings accounting
 # -------------------------------------------
-def click_by_text(page, text):
-    page.locator(f"text={text}").first.click()
+def timed_wait(phase, wait_fn):
+    """
+    Run wait_fn and record how long it took against the fixed delay the
+    phase used to pay. A timeout is not an error: the ceiling simply
+    becomes the time spent, and the crawl carries on as before.
+    """
+    start = time.monotonic()
+    try:
+        wait_fn()
+    except TimeoutError:
+        pass
+    record_wait(phase, time.monotonic() - start)
+
+
+def record_wait(phase, spent):
+    with _wait_stats_lock:
+        stats = WAIT_STATS.setdefault(phase, {"waits": 0, "budget": 0.0, "spent": 0.0})
+        stats["waits"] += 1
+        stats["budget"] += WAIT_BUDGETS_MS[phase] / 1000
+        stats["spent"] += spent
+
+
+def report_wait_savings():
+    with _wait_stats_lock:
+        rows = sorted(WAIT_STATS.items())
+    total_saved = 0.0
+    print("  → Wait time per phase (fixed delay → event-driven):")
+    for phase, stats in rows:
+        saved = stats["budget"] - stats["spent"]
+        total_saved += saved
+        print(f"     {phase:<16} {stats['waits']:>4} waits  "
+              f"{stats['budget']:7.1f}s → {stats['spent']:7.1f}s  saved {saved:7.1f}s")
+    print(f"  → Total idle time saved: {total_saved:.1f}s")
+
+
+def report_spans():
+    print("  → Time per span:")
+    for name, stats in sorted(telemetry.TRACER.summary().items(), key=lambda item: -item[1]["seconds"]):
+        print(f"     {name:<18} {stats['count']:>6}x  {stats['seconds']:8.2f}s")
+
+
+def report_signature_hits(checkpoint):
+    signatures = checkpoint.signatures
+    if signatures is not None and signatures.hits + signatures.misses:
+        print(f"  → Unchanged majors reused from {signatures.path}: "
+              f"{signatures.hits}/{signatures.hits + signatures.misses}")
+
+
+def is_xhr(response):
+    return response.request.resource_type in ("xhr", "fetch")
+
+
+def wait_for_xhr(phase, page, trigger, timeout=WAIT_CEILING_MS):
+    """
+    Run trigger() and wait for the XHR/fetch response it causes; returns
+    trigger's result. The "networkidle" load state is no use here: the page
+    reached it long before, so it returns at once. The time from trigger()
+    to the response (or the timeout) is recorded against phase.
+    """
+    result = start = None
+    try:
+        with page.expect_response(is_xhr, timeout=timeout):
+            result = trigger()
+            start = time.monotonic()
+    except TimeoutError:
+        if start is None:
+            raise
+    record_wait(phase, time.monotonic() - start)
+    return result
+
+
+def wait_for_button_enabled(page, selector=SEARCH_BUTTON_SELECTOR, timeout=WAIT_CEILING_MS):
+    page.locator(f"{selector}:not([disabled])").first.wait_for(state="visible", timeout=timeout)
+
+
+# The state is tagged with a per-call nonce: a leftover timestamp from the
+# previous wait (e.g. the last major had the same card count) must not end
+# this one on its first poll.
+COUNT_STABLE_JS = """
+    ([sel, quietMs, expectZero, nonce]) => {
+        const n = [...document.querySelectorAll(sel)].filter(e => e.offsetParent !== null).length;
+        if (expectZero) return n === 0;
+        const key = '__stable_' + sel;
+        const now = performance.now();
+        const s = window[key];
+        if (!s || s.nonce !== nonce || s.n !== n) { window[key] = {nonce: nonce, n: n, t: now}; return false; }
+        return n > 0 && now - s.t >= quietMs;
+    }
+"""
+_stable_nonces = itertools.count()
+
+
+def count_stable_arg(selector, expect_zero=False):
+    """COUNT_STABLE_JS argument for one wait, with a fresh nonce."""
+    return [selector, STABLE_QUIET_MS, expect_zero, next(_stable_nonces)]
+
+
+def wait_for_count_stable(page, selector, expect_zero=False, timeout=WAIT_CEILING_MS):
+    """
+    Wait until the number of visible elements matching selector stops
+    changing for STABLE_QUIET_MS. With expect_zero the wait ends as soon as
+    none are visible (used when a panel collapses).
+    """
+    page.wait_for_function(COUNT_STABLE_JS, arg=count_stable_arg(selector, expect_zero),
+                           polling=100, timeout=timeout)
 
 
 # -------------------------------------------
 # Utility: select dropdowns that accept typing
 # -------------------------------------------
 def fill_dropdown(page, placeholder, value):
+    with telemetry.span("fill_dropdown") as span_labels:
+        span_labels["outcome"] = _fill_dropdown(page, placeholder, value)
+
+
+def _fill_dropdown(page, placeholder, value):
     box = page.locator(f"input[placeholder='{placeholder}']")
     box.click()
-    box.fill(value)
-    
-    # The menu needs a space press to show suggestions/register the input.
-    time.sleep(4.0)
+
+    # Typing fires the autocomplete request; wait for its response instead
+    # of a fixed sleep. The menu then needs a space press to show suggestions.
+    wait_for_xhr("suggestions", page, lambda: box.fill(value), timeout=4000)
     page.keyboard.press("Space")
     
     # Wait for the suggestion (which contains the university name text) to appear, then click it.
@@ -37,14 +206,18 @@ def fill_dropdown(page, placeholder, value):
     suggestion_locator = page.locator(f"text={value}").first
     
     # Wait for the suggestion to be visible and then click it.
+    outcome = "ok"
     try:
         suggestion_locator.wait_for(state="visible", timeout=3000)
         suggestion_locator.click()
     except TimeoutError:
         # If the click fails, we print a warning and let the script continue.
         print(f"Warning: Timeout or element not found for university suggestion: {value}")
+        outcome = "no_suggestion"
 
-    time.sleep(1.0) # Delay after selection
+    # Selecting a university enables the search button
+    timed_wait("selection", lambda: wait_for_button_enabled(page, timeout=3000))
+    return outcome
 
 
 # -------------------------------------------
@@ -133,313 +306,708 @@ def parse_professor(p):
 
 
 # -------------------------------------------
-# MAIN
+# Bulk card extraction - one round trip per major
 # -------------------------------------------
-def main():
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False)
-        context = browser.new_context(storage_state="cshub_session.json")
-        page = context.new_page()
+# Mirrors parse_professor field by field, but runs inside the page over
+# every card at once. `needles` are the major titles a card must mention.
+EXTRACT_CARDS_JS = """
+(cards, needles) => {
+    const text = el => (el ? el.innerText : '').trim();
+    const firstInOrder = els => els.filter(Boolean).sort((a, b) =>
+        a.compareDocumentPosition(b) & Node.DOCUMENT_POSITION_FOLLOWING ? -1 : 1)[0];
+    const afterLabel = (card, label) => [...card.querySelectorAll('span')]
+        .filter(s => s.textContent.includes(label))
+        .map(s => s.nextElementSibling)
+        .filter(s => s && s.tagName === 'SPAN');
+
+    return cards
+        .filter(c => c.offsetParent !== null)
+        .filter(c => needles.some(n => c.innerText.includes(n)))
+        .map(c => {
+            let name = text(firstInOrder([
+                ...afterLabel(c, 'نام استاد:'),
+                ...c.querySelectorAll('.professor-name, h3, h2'),
+            ]));
+            name = name.replace('نام استاد:', '').trim();
+
+            let majors = [...c.querySelectorAll('.result-professor__group-value')]
+                .map(text).filter(Boolean).join(', ');
+            if (!majors) {
+                majors = text(afterLabel(c, 'رشته:')[0]).replace('رشته:', '').trim();
+            }
+
+            const hIndex = (text(afterLabel(c, 'امتیاز علمی:')[0]).match(/\\p{Nd}/gu) || []).join('');
+
+            const link = firstInOrder([
+                ...c.querySelectorAll('a[href*="/fa/as"], a[href*="/as/"]'),
+                ...[...c.querySelectorAll('a')].filter(a => a.textContent.includes('لینک')),
+            ]);
+            const profileUrl = ((link && link.getAttribute('href')) || '').trim();
+
+            const mail = c.querySelector('a[href^="mailto:"]');
+            const mailHref = (mail && mail.getAttribute('href')) || '';
+            const email = mailHref.startsWith('mailto:') ? mailHref.replace('mailto:', '').trim() : '';
+
+            const fields = [...new Set([...c.querySelectorAll('.result-professor__research-value')]
+                .map(text).filter(t => t && t.length < 100))];
+
+            return [name, majors, hIndex, profileUrl, email, fields];
+        });
+}
+"""
+
+
+# Card count + FNV-1a hash of the visible cards' text and links, so an
+# unchanged major is recognised without parsing a single card
+CARDS_SIGNATURE_JS = """
+(cards, needles) => {
+    const visible = cards
+        .filter(c => c.offsetParent !== null)
+        .filter(c => needles.some(n => c.innerText.includes(n)));
+    let hash = 0x811c9dc5;
+    for (const c of visible) {
+        const links = [...c.querySelectorAll('a')].map(a => a.getAttribute('href') || '').join('|');
+        const s = c.innerText + '|' + links + '\\n';
+        for (let i = 0; i < s.length; i++) {
+            hash ^= s.charCodeAt(i);
+            hash = Math.imul(hash, 0x01000193) >>> 0;
+        }
+    }
+    return visible.length + ':' + hash.toString(16);
+}
+"""
+
+
+def card_signature(page, needles):
+    """Signature of the cards currently shown, or None if it can't be read."""
+    try:
+        return page.locator(CARD_SELECTOR).evaluate_all(CARDS_SIGNATURE_JS, needles)
+    except Exception:
+        return None
 
-        page.goto("https://major.cshub.ir/professor-search")
-        page.wait_for_timeout(1500)
 
-        # Click advanced search
-        page.locator("li[title='جستجوی پیشرفته']").click()
-        page.wait_for_timeout(3000)
+def extract_cards(page, needles):
+    """
+    Extract every visible card that mentions one of `needles` with a single
+    evaluate_all call. Returns a list of parse_professor-style tuples, or
+    None when the bulk path cannot be trusted (see trusted_bulk_rows).
+    """
+    try:
+        rows = page.locator(CARD_SELECTOR).evaluate_all(EXTRACT_CARDS_JS, needles)
+    except Exception as e:
+        print(f" → Bulk extraction error: {e}")
+        return None
+    # Only an empty result needs the extra round trip
+    visible_cards = page.locator(f"{CARD_SELECTOR}:visible").count() if not rows else 0
+    return trusted_bulk_rows(rows, visible_cards)
 
-        universities = ["دانشگاه تهران"]
-        all_professors = {} # Dictionary to store unique professors, keyed by name
 
-        for uni in universities:
-            print(f"\n=== Starting university: {uni} ===")
+def trusted_bulk_rows(rows, visible_cards):
+    """
+    EXTRACT_CARDS_JS rows as tuples, or None when they can't be trusted:
+    cards came back without a single name, or none came back although
+    visible_cards cards are on the page. Both usually mean a markup or
+    selector change, which must not read as a major with 0 professors.
+    """
+    if rows and not any(row[0] for row in rows):
+        return None
+    if not rows and visible_cards:
+        return None
+    return [tuple(row) for row in rows]
+
+
+def parse_cards_per_locator(page, cleaned, major_title):
+    """Per-locator fallback: the original card lookup plus parse_professor."""
+    cards = page.locator(CARD_SELECTOR).filter(has_text=cleaned).all()
+
+    if not cards:
+        # اگر فیلتر دقیق کار نکرد، همه کارت‌های visible را بگیریم و دستی چک کنیم
+        print(" → Filter by text failed, using fallback with manual check...")
+        all_visible_cards = page.locator(f"{CARD_SELECTOR}:visible").all()
+        cards = []
+        for card in all_visible_cards:
+            try:
+                card_text = card.inner_text()
+                if cleaned in card_text or major_title in card_text:
+                    cards.append(card)
+            except:
+                continue
 
-            # ---- Fill dropdowns ----
-            fill_dropdown(page, "نام دانشگاه مورد نظر را وارد کنید", uni)
+    parsed = []
+    for idx, pcard in enumerate(cards):
+        try:
+            # مطمئن شویم کارت هنوز attached است
+            if not pcard.is_visible():
+                continue
+            with telemetry.span("parse_professor", major=cleaned):
+                parsed.append(parse_professor(pcard))
+        except Exception as e:
+            print(f"   Error parsing card {idx+1}: {e}")
+    return parsed
 
-            # Blur dropdowns to allow the search button to be clickable
-            page.locator("body").click(position={"x": 10, "y": 10})
-            page.wait_for_timeout(300)
 
-            # --- CLICK THE BLUE SEARCH BUTTON ---
-            print("  → Locating the search button…")
-            button_selector = "button:has-text('جستجوی موارد انتخاب شده')"
+# -------------------------------------------
+# Open the advanced search form on a page
+# -------------------------------------------
+def open_advanced_search(page):
+    TRANSFER_STATS.set_phase(page, "page_load")
+    with telemetry.span("page_load"):
+        start = time.perf_counter()
+        page.goto(SEARCH_URL)
+        TRANSFER_STATS.add_load("page_load", time.perf_counter() - start)
+    advanced = page.locator(ADVANCED_SEARCH_SELECTOR)
+    timed_wait("page_ready", lambda: advanced.wait_for(state="visible", timeout=WAIT_CEILING_MS))
 
-            # Wait for it to be visible
-            page.wait_for_selector(button_selector, state="visible", timeout=15000)
-            btn = page.locator(button_selector)
+    # Click advanced search
+    advanced.click()
+    university_box = page.locator(f"input[placeholder='{UNIVERSITY_PLACEHOLDER}']")
+    timed_wait("advanced_search", lambda: university_box.wait_for(state="visible", timeout=WAIT_CEILING_MS))
 
-            print("  → Found button. Forcing scroll…")
+
+# -------------------------------------------
+# Click the blue search button (with fallbacks)
+# -------------------------------------------
+# Angular often marks the button disabled; re-enable it in the DOM
+FORCE_ENABLE_JS = """
+    sel => {
+        const b = document.querySelector(sel);
+        if (b) { b.disabled = false; b.removeAttribute('disabled'); b.setAttribute('aria-disabled', 'false'); }
+    }
+"""
+
+# Last resort: dispatch the mouse events directly
+DOM_CLICK_JS = """
+    sel => {
+        const b = document.querySelector(sel);
+        if (b) {
+            b.dispatchEvent(new MouseEvent('mousedown', { bubbles: true }));
+            b.dispatchEvent(new MouseEvent('mouseup',   { bubbles: true }));
+            b.dispatchEvent(new MouseEvent('click',     { bubbles: true }));
+        }
+    }
+"""
+
+
+def click_search_button(page):
+    print("  → Locating the search button…")
+    button_selector = SEARCH_BUTTON_SELECTOR
+
+    # Wait for it to be visible
+    page.wait_for_selector(button_selector, state="visible", timeout=15000)
+    btn = page.locator(button_selector)
+
+    print("  → Found button. Forcing scroll…")
+    try:
+        handle = btn.element_handle()
+        if handle:
+            page.evaluate("el => el.scrollIntoView({block: 'center'})", handle)
+        else:
+            btn.scroll_into_view_if_needed()
+    except Exception:
+        try:
+            btn.scroll_into_view_if_needed()
+        except Exception:
+            pass
+
+    # Try normal click
+    clicked = False
+    with telemetry.span("search_click", strategy="normal") as span_labels:
+        try:
+            btn.click(timeout=4000)
+            print("  → Normal click succeeded.")
+            clicked = True
+        except Exception as e:
+            print("  → Normal click failed:", e)
+        span_labels["outcome"] = "ok" if clicked else "failed"
+
+    if not clicked:
+        with telemetry.span("search_click", strategy="forced") as span_labels:
+            # Force-enabled (Angular often marks button disabled)
+            print("  → Attempting to force-enable...")
             try:
-                handle = btn.element_handle()
-                if handle:
-                    page.evaluate("el => el.scrollIntoView({block: 'center'})", handle)
-                else:
-                    btn.scroll_into_view_if_needed()
+                page.evaluate(FORCE_ENABLE_JS, button_selector)
             except Exception:
-                try:
-                    btn.scroll_into_view_if_needed()
-                except Exception:
-                    pass
+                pass
+
+            try:
+                wait_for_button_enabled(page, timeout=1000)
+            except TimeoutError:
+                pass
 
-            # Try normal click
-            clicked = False
+            # Try forced click
             try:
-                btn.click(timeout=4000)
-                print("  → Normal click succeeded.")
+                print("  → Trying forced click()…")
+                btn.click(force=True, timeout=4000)
+                print("  → Forced click succeeded.")
                 clicked = True
-            except Exception as e:
-                print("  → Normal click failed:", e)
-
-            if not clicked:
-                # Force-enabled (Angular often marks button disabled)
-                print("  → Attempting to force-enable...")
-                try:
-                    page.evaluate("""
-                        sel => {
-                            const b = document.querySelector(sel);
-                            if (b) { b.disabled = false; b.removeAttribute('disabled'); b.setAttribute('aria-disabled', 'false'); }
-                        }
-                    """, button_selector)
-                except Exception:
-                    pass
-
-                page.wait_for_timeout(200)
-
-                # Try forced click
-                try:
-                    print("  → Trying forced click()…")
-                    btn.click(force=True, timeout=4000)
-                    print("  → Forced click succeeded.")
-                    clicked = True
-                except Exception as e2:
-                    print("  → Forced click failed:", e2)
-
-            if not clicked:
-                # Final fallback: direct DOM dispatch
-                try:
-                    print("  → Trying DOM click injection…")
-                    page.evaluate("""
-                        sel => {
-                            const b = document.querySelector(sel);
-                            if (b) {
-                                b.dispatchEvent(new MouseEvent('mousedown', { bubbles: true }));
-                                b.dispatchEvent(new MouseEvent('mouseup',   { bubbles: true }));
-                                b.dispatchEvent(new MouseEvent('click',     { bubbles: true }));
-                            }
-                        }
-                    """, button_selector)
-                    print("  → DOM event click dispatched.")
-                    clicked = True
-                except Exception as e3:
-                    print("  → DOM click injection failed:", e3)
-
-            page.wait_for_timeout(1200)
-
-            # Scroll down to view results
-            print("  → Scrolling down to view results...")
+            except Exception as e2:
+                print("  → Forced click failed:", e2)
+            span_labels["outcome"] = "ok" if clicked else "failed"
+
+    if not clicked:
+        with telemetry.span("search_click", strategy="dom") as span_labels:
+            # Final fallback: direct DOM dispatch
             try:
-                page.mouse.wheel(0, 500)
-            except Exception:
-                pass
-            page.wait_for_timeout(500)
+                print("  → Trying DOM click injection…")
+                page.evaluate(DOM_CLICK_JS, button_selector)
+                print("  → DOM event click dispatched.")
+                clicked = True
+            except Exception as e3:
+                print("  → DOM click injection failed:", e3)
+            span_labels["outcome"] = "ok" if clicked else "failed"
+
+    return clicked
+
 
-            # Wait for the results container
-            RESULTS_TITLE_SELECTOR = "div:has-text('نتایج جستجو')"
+def merge_api_cards(all_professors, lock, uni, api_cards):
+    """Merge (university, card) pairs from cshub_api into all_professors."""
+    for card_uni, card in api_cards:
+        if card[0].strip():
+            merge_professor(all_professors, lock, card_uni or uni, card[1], card)
+
+
+# -------------------------------------------
+# Search, list majors, scrape one major
+# -------------------------------------------
+def submit_search(page, uni):
+    """Pick uni in the advanced search and run it; returns once the results XHR is done."""
+    TRANSFER_STATS.set_phase(page, "search")
+    # ---- Fill dropdowns ----
+    fill_dropdown(page, UNIVERSITY_PLACEHOLDER, uni)
+
+    # Blur dropdowns to allow the search button to be clickable
+    page.locator("body").click(position={"x": 10, "y": 10})
+    timed_wait("button_enabled", lambda: wait_for_button_enabled(page, timeout=3000))
+
+    # --- CLICK THE BLUE SEARCH BUTTON ---
+    # and wait for the results XHR rather than a fixed delay
+    wait_for_xhr("results_xhr", page, lambda: click_search_button(page))
+
+
+def list_majors(page, uni):
+    """Major group titles of the submitted search, in page order; None if no results appeared."""
+    # Scroll down to view results
+    print("  → Scrolling down to view results...")
+    try:
+        page.mouse.wheel(0, 500)
+    except Exception:
+        pass
+
+    # Wait for the results container
+    try:
+        page.wait_for_selector(RESULTS_TITLE_SELECTOR, state="visible", timeout=60000)
+    except TimeoutError:
+        print(f"  → No results section found or timeout for university: {uni}")
+        return None
+
+    timed_wait("majors_rendered", lambda: wait_for_count_stable(page, MAJOR_TITLE_SELECTOR, timeout=5000))
+
+    results_section = page.locator(RESULTS_TITLE_SELECTOR).first
+
+    # Find major expansion panels
+    major_candidates = results_section.locator(MAJOR_PANEL_SELECTOR)
+
+    major_texts = []
+    for el in major_candidates.all():
+        t = ""
+        try:
+            title_span = el.locator(MAJOR_TITLE_SELECTOR).first
+            t = title_span.inner_text().strip()
+        except Exception:
+            continue
+        if t:
+            major_texts.append(t)
+
+    # Dedupe while preserving order
+    seen = set()
+    major_texts_unique = []
+    for t in major_texts:
+        if t not in seen:
+            seen.add(t)
+            major_texts_unique.append(t)
+
+    print(f"  → Found {len(major_texts_unique)} major groups.")
+    TRANSFER_STATS.set_phase(page, "majors")
+    return major_texts_unique
+
+
+def scrape_major(page, uni, major_title, signatures=None):
+    """
+    Expand one major panel of the listed results, parse its cards and
+    collapse it again. Returns the parsed cards, or None if the panel could
+    not be found or opened.
+    """
+    cleaned = clean_major(major_title)
+    results_section = page.locator(RESULTS_TITLE_SELECTOR).first
+
+    # پیدا کردن دکمه‌ی باز کردن گرایش
+    major_panel = results_section.locator(f"{MAJOR_PANEL_SELECTOR}:has-text('{major_title}')").first
+    if major_panel.count() == 0:
+        print(f" → Warning: couldn't locate major panel for '{major_title}'. Skipping.")
+        return None
+
+    # اسکرول و کلیک برای باز کردن
+    major_panel.scroll_into_view_if_needed()
+
+    with telemetry.span("panel_expand", major=cleaned) as span_labels:
+        try:
+            major_panel.click(timeout=8000)
+            print(f" → Expanded major: {cleaned}")
+        except Exception as e:
+            print(f" → Failed to click major panel: {e}")
+            span_labels["outcome"] = "failed"
+            return None
+
+        # صبر برای انیمیشن و لود کارت‌ها: تا وقتی تعداد کارت‌ها ثابت شود
+        timed_wait("cards_loaded", lambda: wait_for_count_stable(page, CARD_SELECTOR))
+    if page.locator(f"{CARD_SELECTOR}:visible").count() == 0:
+        print(f" → No professor cards appeared for {cleaned}")
+        # همچنان سعی می‌کنیم ادامه دهیم و گرایش را ببندیم
+
+    # اگر کارت‌ها از خزش قبلی تغییری نکرده‌اند، همان نتیجه‌ی پارس‌شده را استفاده کنیم
+    with telemetry.span("cards_locate", major=cleaned) as span_labels:
+        signature = card_signature(page, [cleaned, major_title]) if signatures is not None else None
+        parsed_cards = signatures.lookup(uni, cleaned, signature) if signatures is not None else None
+        if parsed_cards is not None:
+            print(f" → Cards unchanged since the last crawl ({signature}); reusing parsed cards.")
+            span_labels["outcome"] = "unchanged"
+        else:
+            # همه کارت‌های visible را در یک رفت‌وبرگشت استخراج کنیم
+            parsed_cards = extract_cards(page, [cleaned, major_title])
+            span_labels["outcome"] = "bulk"
+            if parsed_cards is None:
+                print(" → Bulk extraction failed, falling back to per-card parser...")
+                parsed_cards = parse_cards_per_locator(page, cleaned, major_title)
+                span_labels["outcome"] = "per_locator"
+            if signatures is not None:
+                signatures.store(uni, cleaned, signature, parsed_cards)
+        span_labels["cards"] = len(parsed_cards)
+
+    print(f" → Found {len(parsed_cards)} professor cards for '{cleaned}'.")
+
+    # گرایش را ببندیم تا صفحه شلوغ نشود و کارت‌های بعدی تداخل نکنند
+    # فاصله بین گرایش‌ها: تا وقتی کارت‌های این گرایش پنهان شوند
+    try:
+        major_panel.click(timeout=5000)
+        timed_wait("panel_closed", lambda: wait_for_count_stable(page, CARD_SELECTOR, expect_zero=True, timeout=3000))
+    except:
+        pass
+    return parsed_cards
+
+
+# -------------------------------------------
+# Scrape every major of one university
+# -------------------------------------------
+def scrape_university(page, uni, all_professors, lock, capture=None, checkpoint=None):
+    """
+    Run the dropdown → search → major-expansion flow for one university.
+
+    With a cshub_api.ResponseCapture attached to the page, the professors
+    are read from the search XHR payloads and the DOM expansion is skipped;
+    if the payloads yield nothing the DOM flow runs as usual.
+
+    With a CrawlCheckpoint, majors it already lists are skipped and every
+    finished major is journaled before moving on.
+    """
+    if capture is not None:
+        capture.university = uni
+        capture.drain()
+
+    submit_search(page, uni)
+
+    if capture is not None:
+        api_cards = capture.drain()
+        if api_cards:
+            print(f"  → {len(api_cards)} professor records from API responses; skipping DOM expansion.")
+            merge_api_cards(all_professors, lock, uni, api_cards)
+            return
+        print("  → No API payloads captured, falling back to DOM scraping.")
+
+    major_texts_unique = list_majors(page, uni)
+    if major_texts_unique is None:
+        return
+
+    # Process each major
+    for major_title in major_texts_unique:
+        cleaned = clean_major(major_title)
+        if checkpoint is not None and checkpoint.is_major_done(uni, cleaned):
+            print(f" -> Skipping completed major: {cleaned}")
+            continue
+        print(f" -> Opening major: {cleaned}")
+
+        signatures = checkpoint.signatures if checkpoint is not None else None
+        parsed_cards = scrape_major(page, uni, major_title, signatures)
+        if parsed_cards is None:
+            continue
+
+        touched = set()
+        for idx, card in enumerate(parsed_cards):
             try:
-                page.wait_for_selector(RESULTS_TITLE_SELECTOR, state="visible", timeout=60000)
-            except TimeoutError:
-                print(f"  → No results section found or timeout for university: {uni}")
+                name = card[0]
+
+                # اگر نام داشت، داده‌ها را ذخیره یا ادغام کن
+                if name and name.strip():
+                    touched.add(professor_key(uni, card))
+                    if merge_professor(all_professors, lock, uni, cleaned, card):
+                        print(f"   [NEW] Found: {name}")
+                    else:
+                        print(f"   [MERGED] {name} with major: {card[1].strip() or cleaned}")
+                else:
+                    print(f"   Skipped card {idx+1}: no name")
+
+            except Exception as e:
+                print(f"   Error processing card {idx+1}: {e}")
                 continue
 
-            page.wait_for_timeout(500)
-
-            results_section = page.locator(RESULTS_TITLE_SELECTOR).first
-
-            # Find major expansion panels
-            major_candidates = results_section.locator("div.professor__list")
-
-            major_texts = []
-            for el in major_candidates.all():
-                t = ""
-                try:
-                    title_span = el.locator("span.professor__list-title").first
-                    t = title_span.inner_text().strip()
-                except Exception:
-                    continue
-                if t:
-                    major_texts.append(t)
-
-            # Dedupe while preserving order
-            seen = set()
-            major_texts_unique = []
-            for t in major_texts:
-                if t not in seen:
-                    seen.add(t)
-                    major_texts_unique.append(t)
-
-            print(f"  → Found {len(major_texts_unique)} major groups.")
-
-            # Process each major
-            for major_title in major_texts_unique:
-                cleaned = clean_major(major_title)
-                print(f" -> Opening major: {cleaned}")
-
-                # پیدا کردن دکمه‌ی باز کردن گرایش
-                major_panel = results_section.locator(f"div.professor__list:has-text('{major_title}')").first
-                if major_panel.count() == 0:
-                    print(f" → Warning: couldn't locate major panel for '{major_title}'. Skipping.")
-                    continue
-
-                # اسکرول و کلیک برای باز کردن
-                major_panel.scroll_into_view_if_needed()
-                page.wait_for_timeout(500)
-
-                try:
-                    major_panel.click(timeout=8000)
-                    print(f" → Expanded major: {cleaned}")
-                    page.wait_for_timeout(1500)  # صبر برای انیمیشن و لود کارت‌ها
-                except Exception as e:
-                    print(f" → Failed to click major panel: {e}")
-                    continue
-
-                # صبر کنیم تا حداقل یک کارت ظاهر شود
-                try:
-                    page.wait_for_selector("div.professor__details", state="visible", timeout=10000)
-                except TimeoutError:
-                    print(f" → No professor cards appeared for {cleaned}")
-                    # همچنان سعی می‌کنیم ادامه دهیم و گرایش را ببندیم
-                    pass
- 
-                # حالا تمام کارت‌های visible را بگیریم
-                cards = page.locator("div.professor__details").filter(has_text=cleaned).all()
-                
-                if not cards:
-                    # اگر فیلتر دقیق کار نکرد، همه کارت‌های visible را بگیریم و دستی چک کنیم
-                    print(" → Filter by text failed, using fallback with manual check...")
-                    all_visible_cards = page.locator("div.professor__details:visible").all()
-                    cards = []
-                    for card in all_visible_cards:
-                        try:
-                            card_text = card.inner_text()
-                            if cleaned in card_text or major_title in card_text:
-                                cards.append(card)
-                        except:
-                            continue
-
-                total = len(cards)
-                print(f" → Found {total} professor cards for '{cleaned}'.")
-
-                for idx, pcard in enumerate(cards):
-                    try:
-                        # مطمئن شویم کارت هنوز attached است
-                        if not pcard.is_visible():
-                            continue
-
-                        name, majors_from_card, h_index, profile_url, email, fields = parse_professor(pcard)
-
-                        # اگر نام داشت، داده‌ها را ذخیره یا ادغام کن
-                        if name and name.strip():
-                            key = name.strip()  # Use name as a simple key for merging
-                            current_major = majors_from_card.strip() or cleaned
-                            
-                            if key in all_professors:
-                                # ادغام: اضافه کردن گرایش جدید و ادغام فیلدهای تحقیقاتی
-                                prof_data = all_professors[key]
-                                if current_major not in prof_data['major_list']:
-                                    prof_data['major_list'].append(current_major)
-                                
-                                # ادغام فیلدهای تحقیقاتی و حذف تکراری
-                                prof_data['research_fields'].extend(fields)
-                                prof_data['research_fields'] = list(dict.fromkeys(prof_data['research_fields']))
-                                all_professors[key] = prof_data
-                                
-                                print(f"   [MERGED] {name} with major: {current_major}")
-                            else:
-                                # افزودن پروفسور جدید
-                                all_professors[key] = {
-                                    "name": key,
-                                    "university": uni,
-                                    "major_list": [current_major], # Store as list for merging
-                                    "h_index": h_index,
-                                    "profile_url": profile_url,
-                                    "email": email,
-                                    "research_fields": fields,
-                                }
-                                print(f"   [NEW] Found: {name}")
-                        else:
-                            print(f"   Skipped card {idx+1}: no name")
-
-                    except Exception as e:
-                        print(f"   Error processing card {idx+1}: {e}")
-                        continue
-
-                # گرایش را ببندیم تا صفحه شلوغ نشود و کارت‌های بعدی تداخل نکنند
-                try:
-                    major_panel.click(timeout=5000)
-                    page.wait_for_timeout(500)
-                except:
-                    pass
-
-                page.wait_for_timeout(800)  # فاصله بین گرایش‌ها
-
-        print(f"\n=== Finished scraping: {len(all_professors)} unique professors found ===")
-        
-        # FINAL WRITE TO JSONL FILE
-        professor_count = 0
-        
-        # Logic to find the last ID if the file exists and is not empty
-        if os.path.exists(OUTPUT_JSONL) and os.path.getsize(OUTPUT_JSONL) > 0:
-            print(f"  → Found existing {OUTPUT_JSONL}. Reading last ID for offset...")
+        # ذخیره امن: گرایش تمام شد، قبل از رفتن به گرایش بعدی روی دیسک ثبت شود
+        if checkpoint is not None:
+            checkpoint.complete_major(uni, cleaned, all_professors, touched)
+
+
+# -------------------------------------------
+# Worker: one isolated BrowserContext on the shared browser
+# -------------------------------------------
+def crawl_university(page, uni, checkpoint, lock, capture=None):
+    """
+    Crawl one university into its own merge map and append it to
+    OUTPUT_JSONL. Returns the number of professors written.
+
+    Memory is bounded by one university: the map is rebuilt from the
+    checkpoint journal on resume and dropped once written.
+    """
+    if checkpoint.is_university_done(uni):
+        print(f"  → Skipping completed university: {uni}")
+        return 0
+
+    professors = checkpoint.replay(uni)
+    if professors:
+        print(f"  → Resuming {uni}: {len(professors)} professors restored from {checkpoint.journal_path}")
+
+    with telemetry.bind(university=uni), telemetry.span("university", engine="sync"):
+        open_advanced_search(page)
+        scrape_university(page, uni, professors, lock, capture, checkpoint)
+        TRANSFER_STATS.set_phase(page, None)
+        return finish_university(uni, professors, checkpoint)
+
+
+def finish_university(uni, professors, checkpoint):
+    # The append and its checkpoint bracket share the output lock, so a
+    # crash can only leave the last university half-recorded, and a resumed
+    # run truncates it away (CrawlCheckpoint.begin_output)
+    with _output_lock:
+        checkpoint.begin_output(uni, OUTPUT_JSONL)
+        with telemetry.span("write_professors", professors=len(professors)):
+            written = crawl_output.write_professors_locked(professors, OUTPUT_JSONL)
+        checkpoint.complete_university(uni)
+    return written
+
+
+def run_worker(worker_id, cdp_url, work_queue, checkpoint, lock, totals, captures=None):
+    """
+    Claim universities from work_queue until it is empty.
+
+    Playwright's sync API is bound to the thread that created it, so each
+    worker starts its own driver and attaches to the shared Chromium over
+    CDP instead of reusing the main thread's Browser object.
+
+    When captures is a list, the worker records API responses and appends
+    its ResponseCapture to it.
+    """
+    with sync_playwright() as p:
+        browser = p.chromium.connect_over_cdp(cdp_url)
+        context = browser.new_context(storage_state=SESSION_FILE)
+        if RESOURCE_BLOCKER is not None:
+            RESOURCE_BLOCKER.apply(context)
+        page = context.new_page()
+        TRANSFER_STATS.attach(page)
+
+        capture = None
+        if captures is not None:
+            capture = cshub_api.ResponseCapture(page)
+            with lock:
+                captures.append(capture)
+
+        while True:
             try:
-                with open(OUTPUT_JSONL, "r", encoding="utf-8") as f_read:
-                    # Read all lines
-                    lines = f_read.readlines()
-                    if lines:
-                        # Get the last non-empty line
-                        last_line = next(line for line in reversed(lines) if line.strip())
-                        # Parse the last line's JSON to get the 'id'
-                        last_data = json.loads(last_line)
-                        professor_count = int(last_data.get('id', 0))
-                        print(f"  → Initializing professor_count with last ID: {professor_count}")
-                    else:
-                        print(f"  → {OUTPUT_JSONL} is empty.")
+                uni = work_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            print(f"\n=== [worker {worker_id}] Starting university: {uni} ===")
+            try:
+                totals.append(crawl_university(page, uni, checkpoint, lock, capture))
             except Exception as e:
-                print(f"  → Warning: Could not read last ID from {OUTPUT_JSONL}. Resetting count. Error: {e}")
-                professor_count = 0
-
-        # Now professor_count is the last ID + 1 (or 0 if file is new/empty/error)
-        with open(OUTPUT_JSONL, "a", encoding="utf-8") as f: # Use "a" to append to the file
-            for key, prof_data in all_professors.items():
-                professor_count += 1
-                
-                # Join major list back into a string as a single 'major' entry
-                # NOTE: The original JSONL example showed a single string for major,
-                # but the request mentioned "محمد علی اخائی" who is in "شبکه های کامپیوتری, هوش مصنوعی"
-                # so I will keep the original request's output structure and join the list of majors.
-                # If the user wants an array for majors, they will need to clarify.
-                # For now, I will join them into a string as in the original CSV logic, but I will
-                # rename the field to "majors" for clarity since it will contain multiple.
-                majors_joined = ", ".join(prof_data['major_list'])
-                
-                data = {
-                    "id": professor_count,
-                    "name": prof_data['name'],
-                    "university": prof_data['university'],
-                    "major": majors_joined, # Keep as string to match original structure (unless clarified)
-                    "h_index": prof_data['h_index'],
-                    "profile_url": prof_data['profile_url'],
-                    "email": prof_data['email'],
-                    "research_fields": prof_data['research_fields'],
-                    "scraped_at": time.strftime("%Y-%m-%d %H:%M:%S")
-                }
-                
-                json_line = json.dumps(data, ensure_ascii=False)
-                f.write(json_line + "\n")
-
-        print(f"=== Finished writing: {professor_count} professors saved to {OUTPUT_JSONL} ===")
-        browser.close()
+                print(f"  → [worker {worker_id}] University {uni} failed: {e}")
+            finally:
+                work_queue.task_done()
+
+        context.close()
+
+
+# -------------------------------------------
+# FINAL WRITE TO JSONL FILE
+# -------------------------------------------
+def write_professors(all_professors):
+    """Append all_professors to OUTPUT_JSONL with fresh IDs; returns how many were written."""
+    return crawl_output.write_professors(all_professors, OUTPUT_JSONL)
+
+
+# -------------------------------------------
+# MAIN
+# -------------------------------------------
+def crawl_http(universities, checkpoint, lock, capture_file, base_url=None):
+    """Pure-HTTP mode: replay recorded API requests, no browser rendering."""
+    exchanges = cshub_api.load_exchanges(capture_file)
+    print(f"=== Replaying {len(exchanges)} recorded API requests for {len(universities)} universities ===")
+    total = 0
+    for uni in universities:
+        if checkpoint.is_university_done(uni):
+            print(f"  → Skipping completed university: {uni}")
+            continue
+        professors = {}
+        for card_uni, card in cshub_api.crawl_http([uni], exchanges, base_url=base_url, session_file=SESSION_FILE):
+            if card[0].strip():
+                merge_professor(professors, lock, card_uni, card[1], card)
+        total += finish_university(uni, professors, checkpoint)
+    return total
+
+
+def main(universities=None, concurrency=DEFAULT_CONCURRENCY, mode="dom",
+         capture_file=cshub_api.CAPTURE_FILE, base_url=None, resume=False, engine="async",
+         major_concurrency=None, rate=None, full=False, headless=True, cdp_url=None, allow=(), block=True):
+    """
+    mode:
+      dom  - expand every major panel and parse the rendered cards
+      api  - same browser flow, but read professors from the search XHR
+             responses and record them to capture_file
+      http - replay capture_file over plain HTTP (optionally against
+             base_url, e.g. a local cshub_api stub server)
+
+    engine (dom mode only):
+      async - scraper_async: asyncio tasks with per-host rate limiting
+      sync  - one thread per worker over a shared CDP browser
+
+    Each university is appended to OUTPUT_JSONL as soon as it finishes, and
+    every finished major is checkpointed; resume=True picks up where a
+    crashed run stopped. Majors whose cards are unchanged since the last
+    crawl reuse their parsed cards (MajorSignatures) unless full=True.
+
+    The browser runs headless with images, fonts, media and trackers
+    blocked (block=False or allow= patterns relax that). A warm browser
+    already listening on CDP_PORT (browser_profile.py start), or cdp_url,
+    is reused instead of launching a new one.
+    """
+    global RESOURCE_BLOCKER
+    RESOURCE_BLOCKER = browser_profile.ResourceBlocker(allow=allow) if block else None
+    universities = universities or UNIVERSITIES
+    concurrency = max(1, min(concurrency, len(universities)))
+
+    lock = threading.Lock()
+    checkpoint = CrawlCheckpoint(resume=resume, signatures=None if full else MajorSignatures())
+
+    if mode == "http":
+        total = crawl_http(universities, checkpoint, lock, capture_file, base_url)
+        print(f"\n=== Finished scraping: {total} unique professors found ===")
+        checkpoint.close()
+        return
+
+    warm_url = cdp_url or browser_profile.cdp_endpoint(CDP_PORT)
+    if warm_url:
+        print(f"=== Reusing warm browser at {warm_url} ===")
+
+    if mode == "dom" and engine == "async":
+        import scraper_async
+
+        total = asyncio.run(scraper_async.crawl(
+            universities, checkpoint, university_concurrency=concurrency,
+            major_concurrency=major_concurrency or scraper_async.DEFAULT_MAJOR_CONCURRENCY,
+            rate=rate or scraper_async.DEFAULT_RATE, headless=headless, cdp_url=warm_url,
+        ))
+        print(f"\n=== Finished scraping: {total} unique professors found ===")
+        report_wait_savings()
+        report_signature_hits(checkpoint)
+        TRANSFER_STATS.report(RESOURCE_BLOCKER)
+        checkpoint.close()
+        return
+
+    captures = [] if mode == "api" else None
+
+    work_queue = queue.Queue()
+    for uni in universities:
+        work_queue.put(uni)
+
+    with sync_playwright() as p:
+        # One Chromium process; every worker attaches to it over CDP and
+        # opens its own isolated BrowserContext. A warm browser is left
+        # running when the crawl ends.
+        browser = None
+        cdp_url = warm_url
+        if cdp_url is None:
+            # Not CDP_PORT: that is where a warm browser listens, and any
+            # other process may hold it. Ask the launched browser itself.
+            port = browser_profile.free_port()
+            browser = p.chromium.launch(**browser_profile.launch_options(headless, port))
+            cdp_url = browser_profile.wait_for_cdp(port)
+            if cdp_url is None:
+                browser.close()
+                raise RuntimeError(f"Chromium did not open a CDP endpoint on port {port}")
+
+        print(f"=== Crawling {len(universities)} universities with {concurrency} workers ===")
+        totals = [] # professors written per university
+        workers = [
+            threading.Thread(target=run_worker, args=(i + 1, cdp_url, work_queue, checkpoint, lock, totals, captures))
+            for i in range(concurrency)
+        ]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+
+        print(f"\n=== Finished scraping: {sum(totals)} unique professors found ===")
+        report_wait_savings()
+        report_signature_hits(checkpoint)
+        TRANSFER_STATS.report(RESOURCE_BLOCKER)
+
+        if captures:
+            cshub_api.save_exchanges([e for c in captures for e in c.exchanges], capture_file)
+
+        checkpoint.close()
+        if browser is not None:
+            browser.close()
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Scrape professor lists from major.cshub.ir")
+    parser.add_argument("universities", nargs="*", help="University names (default: UNIVERSITIES)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Number of parallel browser contexts")
+    parser.add_argument("--mode", choices=["dom", "api", "http"], default="dom",
+                        help="dom: parse rendered cards; api: read search XHR payloads; "
+                             "http: replay recorded API requests without a browser")
+    parser.add_argument("--capture-file", default=cshub_api.CAPTURE_FILE,
+                        help="Where api mode records, and http mode replays, API exchanges")
+    parser.add_argument("--base-url", help="Replay against this origin instead (e.g. a local stub server)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip universities/majors completed by a previous run (see scrape_resume_state.json)")
+    parser.add_argument("--engine", choices=["async", "sync"], default="async",
+                        help="dom mode engine: asyncio tasks (async) or one thread per worker (sync)")
+    parser.add_argument("--major-concurrency", type=int,
+                        help="async engine: pages per university expanding majors in parallel")
+    parser.add_argument("--rate", type=float, help="async engine: max requests/second per host")
+    parser.add_argument("--full", action="store_true",
+                        help="Parse every major again, even if its cards are unchanged since the last crawl")
+    parser.add_argument("--headed", action="store_true", help="Show the browser window")
+    parser.add_argument("--browser-cdp", help="Attach to this browser (CDP URL) instead of launching one")
+    parser.add_argument("--allow", action="append", default=[],
+                        help="Resource type or URL substring to let through the blocker (repeatable)")
+    parser.add_argument("--no-block", action="store_true", help="Load images, fonts, media and trackers too")
+    parser.add_argument("--trace-file", default=TRACE_JSONL, help="Append JSON-lines timing spans here ('' to disable)")
+    parser.add_argument("--metrics-file", help="Write Prometheus metrics here at the end (textfile collector)")
+    args = parser.parse_args()
+    telemetry.configure(trace_path=args.trace_file or None)
+    main(args.universities, args.concurrency, args.mode, args.capture_file, args.base_url, args.resume,
+         args.engine, args.major_concurrency, args.rate, args.full, headless=not args.headed,
+         cdp_url=args.browser_cdp, allow=args.allow, block=not args.no_block)
+    report_spans()
+    if args.metrics_file:
+        telemetry.TRACER.write_prometheus(args.metrics_file)
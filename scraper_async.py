@@ -0,0 +1,449 @@
+# scraper_async.py
+# asyncio engine for the crawl, on playwright.async_api.
+#
+# Universities run as tasks bounded by a semaphore (one BrowserContext each);
+# inside a university, majors run as tasks over a small pool of pages that
+# have all run the same search. Every document/XHR request passes a
+# per-host token bucket, so the crawl never exceeds the configured request
+# rate against cshub.ir no matter how many tasks are in flight.
+#
+# Parsing (EXTRACT_CARDS_JS), merging, checkpointing and the output format
+# are shared with scraper.py.
+import asyncio
+import json
+import sys
+import threading
+import time
+import urllib.parse
+
+from playwright.async_api import TimeoutError, async_playwright
+
+import browser_profile
+import scraper
+import telemetry
+
+DEFAULT_UNIVERSITY_CONCURRENCY = 4
+DEFAULT_MAJOR_CONCURRENCY = 2
+# Sustained requests/second and burst size allowed per host
+DEFAULT_RATE = 4.0
+DEFAULT_BURST = 8
+
+# Only these requests count against the rate limit
+RATE_LIMITED_TYPES = {"document", "xhr", "fetch"}
+
+
+# -------------------------------------------
+# Per-host token bucket
+# -------------------------------------------
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class HostRateLimiter:
+    """One TokenBucket per host, created on first use."""
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.throttled = 0
+
+    async def acquire(self, url):
+        host = urllib.parse.urlsplit(url).hostname or ""
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            bucket = self.buckets[host] = TokenBucket(self.rate, self.burst)
+        if bucket.tokens < 1:
+            self.throttled += 1
+        await bucket.acquire()
+
+    async def route_handler(self, route):
+        if route.request.resource_type in RATE_LIMITED_TYPES:
+            await self.acquire(route.request.url)
+        await route.continue_()
+
+
+# -------------------------------------------
+# Structured progress
+# -------------------------------------------
+class ProgressReporter:
+    """Emit one JSON object per progress event (to stderr by default)."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stderr
+        self.started = time.monotonic()
+        self.counters = {"universities_done": 0, "majors_done": 0, "cards": 0}
+
+    def emit(self, event, **fields):
+        record = {"ts": round(time.time(), 3), "elapsed": round(time.monotonic() - self.started, 3),
+                  "event": event, **fields}
+        self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.stream.flush()
+
+
+# -------------------------------------------
+# Event-driven waits (async twins of scraper.py's)
+# -------------------------------------------
+async def wait_for_xhr(phase, page, trigger, timeout=scraper.WAIT_CEILING_MS):
+    """scraper.wait_for_xhr for the async API; trigger returns an awaitable."""
+    result = start = None
+    try:
+        async with page.expect_response(scraper.is_xhr, timeout=timeout):
+            result = await trigger()
+            start = time.monotonic()
+    except TimeoutError:
+        if start is None:
+            raise
+    scraper.record_wait(phase, time.monotonic() - start)
+    return result
+
+
+async def timed_wait(phase, awaitable):
+    start = time.monotonic()
+    try:
+        await awaitable
+    except TimeoutError:
+        pass
+    scraper.record_wait(phase, time.monotonic() - start)
+
+
+def wait_for_count_stable(page, selector, expect_zero=False, timeout=scraper.WAIT_CEILING_MS):
+    return page.wait_for_function(scraper.COUNT_STABLE_JS, arg=scraper.count_stable_arg(selector, expect_zero),
+                                  polling=100, timeout=timeout)
+
+
+def wait_for_button_enabled(page, timeout=scraper.WAIT_CEILING_MS):
+    return page.locator(f"{scraper.SEARCH_BUTTON_SELECTOR}:not([disabled])").first.wait_for(
+        state="visible", timeout=timeout)
+
+
+# -------------------------------------------
+# Search flow
+# -------------------------------------------
+async def open_advanced_search(page):
+    scraper.TRANSFER_STATS.set_phase(page, "page_load")
+    with telemetry.span("page_load"):
+        start = time.perf_counter()
+        await page.goto(scraper.SEARCH_URL)
+        scraper.TRANSFER_STATS.add_load("page_load", time.perf_counter() - start)
+    advanced = page.locator(scraper.ADVANCED_SEARCH_SELECTOR)
+    await timed_wait("page_ready", advanced.wait_for(state="visible", timeout=scraper.WAIT_CEILING_MS))
+    await advanced.click()
+    box = page.locator(f"input[placeholder='{scraper.UNIVERSITY_PLACEHOLDER}']")
+    await timed_wait("advanced_search", box.wait_for(state="visible", timeout=scraper.WAIT_CEILING_MS))
+
+
+async def fill_dropdown(page, placeholder, value):
+    with telemetry.span("fill_dropdown") as span_labels:
+        span_labels["outcome"] = await _fill_dropdown(page, placeholder, value)
+
+
+async def _fill_dropdown(page, placeholder, value):
+    box = page.locator(f"input[placeholder='{placeholder}']")
+    await box.click()
+    await wait_for_xhr("suggestions", page, lambda: box.fill(value), timeout=4000)
+    await page.keyboard.press("Space")
+
+    suggestion = page.locator(f"text={value}").first
+    outcome = "ok"
+    try:
+        await suggestion.wait_for(state="visible", timeout=3000)
+        await suggestion.click()
+    except TimeoutError:
+        print(f"Warning: Timeout or element not found for university suggestion: {value}")
+        outcome = "no_suggestion"
+    await timed_wait("selection", wait_for_button_enabled(page, timeout=3000))
+    return outcome
+
+
+async def click_search_button(page):
+    btn = page.locator(scraper.SEARCH_BUTTON_SELECTOR)
+    await btn.wait_for(state="visible", timeout=15000)
+    try:
+        await btn.scroll_into_view_if_needed()
+    except Exception:
+        pass
+
+    for attempt in ("normal", "forced", "dom"):
+        with telemetry.span("search_click", strategy=attempt) as span_labels:
+            try:
+                if attempt == "normal":
+                    await btn.click(timeout=4000)
+                elif attempt == "forced":
+                    await page.evaluate(scraper.FORCE_ENABLE_JS, scraper.SEARCH_BUTTON_SELECTOR)
+                    await btn.click(force=True, timeout=4000)
+                else:
+                    await page.evaluate(scraper.DOM_CLICK_JS, scraper.SEARCH_BUTTON_SELECTOR)
+                span_labels["outcome"] = "ok"
+                return attempt
+            except Exception:
+                span_labels["outcome"] = "failed"
+    return None
+
+
+async def run_search(page, uni):
+    """Search for uni on page; returns the major titles listed, or []."""
+    await open_advanced_search(page)
+    scraper.TRANSFER_STATS.set_phase(page, "search")
+    await fill_dropdown(page, scraper.UNIVERSITY_PLACEHOLDER, uni)
+    await page.locator("body").click(position={"x": 10, "y": 10})
+    await timed_wait("button_enabled", wait_for_button_enabled(page, timeout=3000))
+    await wait_for_xhr("results_xhr", page, lambda: click_search_button(page))
+
+    try:
+        await page.wait_for_selector(scraper.RESULTS_TITLE_SELECTOR, state="visible", timeout=60000)
+    except TimeoutError:
+        return []
+    await timed_wait("majors_rendered", wait_for_count_stable(page, scraper.MAJOR_TITLE_SELECTOR, timeout=5000))
+
+    results = page.locator(scraper.RESULTS_TITLE_SELECTOR).first
+    titles = await results.locator(f"{scraper.MAJOR_PANEL_SELECTOR} {scraper.MAJOR_TITLE_SELECTOR}").all_inner_texts()
+    scraper.TRANSFER_STATS.set_phase(page, "majors")
+    return list(dict.fromkeys(t.strip() for t in titles if t.strip()))
+
+
+# -------------------------------------------
+# Per-locator fallback (async twin of scraper.parse_professor)
+# -------------------------------------------
+async def _first_text(p, selector):
+    try:
+        return (await p.locator(selector).first.inner_text(timeout=1000)).strip()
+    except Exception:
+        return ""
+
+
+async def _first_attr(p, selector, attr):
+    try:
+        return ((await p.locator(selector).first.get_attribute(attr, timeout=1000)) or "").strip()
+    except Exception:
+        return ""
+
+
+async def parse_professor(p):
+    name = await _first_text(p, 'span:has-text("نام استاد:") + span, .professor-name, h3, h2')
+    name = name.replace("نام استاد:", "").strip()
+
+    try:
+        sub_majors = [t.strip() for t in await p.locator('.result-professor__group-value').all_inner_texts() if t.strip()]
+    except Exception:
+        sub_majors = []
+    majors = ", ".join(sub_majors)
+    if not majors:
+        majors = (await _first_text(p, 'span:has-text("رشته:") + span')).replace("رشته:", "").strip()
+
+    h_index = "".join(c for c in await _first_text(p, 'span:has-text("امتیاز علمی:") + span') if c.isdigit())
+    profile_url = await _first_attr(p, 'a[href*="/fa/as"], a[href*="/as/"], a:has-text("لینک")', "href")
+    email = await _first_attr(p, 'a[href^="mailto:"]', "href")
+    email = email.replace("mailto:", "").strip() if email.startswith("mailto:") else ""
+
+    try:
+        fields = [t.strip() for t in await p.locator('.result-professor__research-value').all_inner_texts()]
+    except Exception:
+        fields = []
+    fields = list(dict.fromkeys(t for t in fields if t and len(t) < 100))
+    return name, majors, h_index, profile_url, email, fields
+
+
+async def parse_cards_per_locator(page, cleaned, major_title):
+    """scraper.parse_cards_per_locator on the async API."""
+    cards = await page.locator(scraper.CARD_SELECTOR).filter(has_text=cleaned).all()
+    if not cards:
+        print(" → Filter by text failed, using fallback with manual check...")
+        cards = []
+        for card in await page.locator(f"{scraper.CARD_SELECTOR}:visible").all():
+            try:
+                card_text = await card.inner_text()
+            except Exception:
+                continue
+            if cleaned in card_text or major_title in card_text:
+                cards.append(card)
+
+    parsed = []
+    for idx, card in enumerate(cards):
+        try:
+            if not await card.is_visible():
+                continue
+            with telemetry.span("parse_professor", major=cleaned):
+                parsed.append(await parse_professor(card))
+        except Exception as e:
+            print(f"   Error parsing card {idx+1}: {e}")
+    return parsed
+
+
+async def scrape_major(page, uni, major_title, signatures=None):
+    """
+    Expand one major panel, extract its cards in one round trip, collapse it.
+    If the bulk rows can't be trusted, the cards are parsed one locator at a
+    time instead. With a MajorSignatures cache, unchanged cards are not
+    parsed again.
+    """
+    cleaned = scraper.clean_major(major_title)
+    results = page.locator(scraper.RESULTS_TITLE_SELECTOR).first
+    panel = results.locator(f"{scraper.MAJOR_PANEL_SELECTOR}:has-text('{major_title}')").first
+    if await panel.count() == 0:
+        return None
+
+    with telemetry.span("panel_expand", major=cleaned):
+        await panel.scroll_into_view_if_needed()
+        await panel.click(timeout=8000)
+        await timed_wait("cards_loaded", wait_for_count_stable(page, scraper.CARD_SELECTOR))
+
+    with telemetry.span("cards_locate", major=cleaned) as span_labels:
+        cards = page.locator(scraper.CARD_SELECTOR)
+        signature = rows = None
+        span_labels["outcome"] = "unchanged"
+        if signatures is not None:
+            try:
+                signature = await cards.evaluate_all(scraper.CARDS_SIGNATURE_JS, [cleaned, major_title])
+            except Exception:
+                pass
+            rows = signatures.lookup(uni, cleaned, signature)
+        if rows is None:
+            span_labels["outcome"] = "bulk"
+            try:
+                rows = await cards.evaluate_all(scraper.EXTRACT_CARDS_JS, [cleaned, major_title])
+                visible_cards = await page.locator(f"{scraper.CARD_SELECTOR}:visible").count() if not rows else 0
+                rows = scraper.trusted_bulk_rows(rows, visible_cards)
+            except Exception as e:
+                print(f" → Bulk extraction error for {cleaned}: {e}")
+                rows = None
+            if rows is None:
+                print(f" → Bulk extraction failed for {cleaned}, falling back to per-card parser...")
+                span_labels["outcome"] = "per_locator"
+                rows = await parse_cards_per_locator(page, cleaned, major_title)
+            if signatures is not None:
+                signatures.store(uni, cleaned, signature, rows)
+        span_labels["cards"] = len(rows)
+
+    try:
+        await panel.click(timeout=5000)
+        await timed_wait("panel_closed", wait_for_count_stable(page, scraper.CARD_SELECTOR, expect_zero=True, timeout=3000))
+    except Exception:
+        pass
+    return [tuple(row) for row in rows]
+
+
+# -------------------------------------------
+# Tasks
+# -------------------------------------------
+async def crawl_university(browser, uni, checkpoint, limiter, progress, major_concurrency):
+    if checkpoint.is_university_done(uni):
+        progress.emit("university_skipped", university=uni)
+        return 0
+
+    progress.emit("university_started", university=uni)
+    context = await browser.new_context(storage_state=scraper.SESSION_FILE)
+    await context.route("**/*", limiter.route_handler)
+    if scraper.RESOURCE_BLOCKER is not None:
+        # Registered last, so it runs first and falls back to the limiter
+        await scraper.RESOURCE_BLOCKER.apply_async(context)
+    lock = threading.Lock()  # merge_professor's lock; uncontended here
+    professors = checkpoint.replay(uni)
+
+    try:
+        first_page = await context.new_page()
+        scraper.TRANSFER_STATS.attach_async(first_page)
+        majors = await run_search(first_page, uni)
+        pending = [m for m in majors if not checkpoint.is_major_done(uni, scraper.clean_major(m))]
+        progress.emit("majors_found", university=uni, majors=len(majors), pending=len(pending))
+
+        # Page pool: each extra page runs the same search once
+        pages = asyncio.Queue()
+        await pages.put(first_page)
+        for _ in range(min(major_concurrency, len(pending)) - 1):
+            page = await context.new_page()
+            scraper.TRANSFER_STATS.attach_async(page)
+            await run_search(page, uni)
+            await pages.put(page)
+
+        async def major_task(major_title):
+            cleaned = scraper.clean_major(major_title)
+            page = await pages.get()
+            start = time.monotonic()
+            try:
+                cards = await scrape_major(page, uni, major_title, checkpoint.signatures)
+            except Exception as e:
+                progress.emit("major_failed", university=uni, major=cleaned, error=str(e))
+                return
+            finally:
+                await pages.put(page)
+            if cards is None:
+                progress.emit("major_missing", university=uni, major=cleaned)
+                return
+
+            touched = set()
+            for card in cards:
+                if card[0].strip():
+                    scraper.merge_professor(professors, lock, uni, cleaned, card)
+                    touched.add(scraper.professor_key(uni, card))
+            checkpoint.complete_major(uni, cleaned, professors, touched)
+            progress.counters["majors_done"] += 1
+            progress.counters["cards"] += len(cards)
+            progress.emit("major_done", university=uni, major=cleaned, cards=len(cards),
+                          seconds=round(time.monotonic() - start, 3), **progress.counters)
+
+        await asyncio.gather(*(major_task(m) for m in pending))
+        for page in context.pages:
+            scraper.TRANSFER_STATS.set_phase(page, None)
+    finally:
+        await context.close()
+
+    # fsyncs OUTPUT_JSONL; keep it off the event loop
+    written = await asyncio.to_thread(scraper.finish_university, uni, professors, checkpoint)
+    progress.counters["universities_done"] += 1
+    progress.emit("university_done", university=uni, professors=written, **progress.counters)
+    return written
+
+
+async def crawl(universities, checkpoint, university_concurrency=DEFAULT_UNIVERSITY_CONCURRENCY,
+                major_concurrency=DEFAULT_MAJOR_CONCURRENCY, rate=DEFAULT_RATE, burst=DEFAULT_BURST,
+                headless=True, cdp_url=None):
+    """
+    Crawl universities; returns the number of professors written. With
+    cdp_url the crawl attaches to that (warm) browser and leaves it running.
+    """
+    limiter = HostRateLimiter(rate, burst)
+    progress = ProgressReporter()
+    semaphore = asyncio.Semaphore(university_concurrency)
+
+    async with async_playwright() as p:
+        if cdp_url:
+            browser = await p.chromium.connect_over_cdp(cdp_url)
+        else:
+            browser = await p.chromium.launch(**browser_profile.launch_options(headless))
+
+        async def bounded(uni):
+            async with semaphore:
+                try:
+                    with telemetry.bind(university=uni), telemetry.span("university", engine="async"):
+                        return await crawl_university(browser, uni, checkpoint, limiter, progress, major_concurrency)
+                except Exception as e:
+                    progress.emit("university_failed", university=uni, error=str(e))
+                    return 0
+
+        progress.emit("crawl_started", universities=len(universities),
+                      university_concurrency=university_concurrency, major_concurrency=major_concurrency,
+                      rate=rate, burst=burst)
+        totals = await asyncio.gather(*(bounded(uni) for uni in universities))
+        if not cdp_url:
+            await browser.close()
+
+    progress.emit("crawl_done", professors=sum(totals), throttled_requests=limiter.throttled,
+                  **progress.counters)
+    return sum(totals)
@@ -0,0 +1,77 @@
+# search_text.py
+# Persian-aware text normalization shared by the importer (which builds the
+# indexed search fields) and app.py (which normalizes the query the same way).
+import re
+import unicodedata
+
+# Arabic code points that have a Persian counterpart
+CHAR_MAP = str.maketrans({
+    "\u064a": "\u06cc",  # Arabic yeh -> Persian yeh
+    "\u0649": "\u06cc",  # alef maksura -> Persian yeh
+    "\u0643": "\u06a9",  # Arabic kaf -> keheh
+    "\u0629": "\u0647",  # teh marbuta -> heh
+    "\u06c0": "\u0647",  # heh with yeh above -> heh
+    "\u0623": "\u0627",  # alef with hamza above -> alef
+    "\u0625": "\u0627",  # alef with hamza below -> alef
+    "\u0624": "\u0648",  # waw with hamza -> waw
+    # Persian and Arabic-Indic digits -> ASCII
+    **{chr(0x06f0 + i): str(i) for i in range(10)},
+    **{chr(0x0660 + i): str(i) for i in range(10)},
+})
+
+# Harakat and tanwin, superscript alef, tatweel, and zero-width
+# joiners/marks. ZWNJ is dropped rather than turned into a space, so a word
+# written with or without it normalizes to the same token.
+STRIP_RE = re.compile("[\u064b-\u065f\u0670\u0640\u200c\u200d\u200e\u200f\ufeff]")
+TOKEN_RE = re.compile(r"\w+")
+
+# Shortest prefix indexed for search-as-you-type
+MIN_PREFIX = 2
+
+
+def normalize_text(text):
+    text = unicodedata.normalize("NFKC", text or "")
+    text = text.translate(CHAR_MAP)
+    text = STRIP_RE.sub("", text)
+    return text.casefold()
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(normalize_text(text))
+
+
+def prefixes(tokens):
+    """Edge n-grams of every token, so partial words still hit the index."""
+    out = set()
+    for token in tokens:
+        for n in range(MIN_PREFIX, len(token)):
+            out.add(token[:n])
+    return sorted(out)
+
+
+def build_search_fields(record):
+    """
+    Normalized copies of the searchable fields, stored on each document under
+    "search" and covered by the weighted text index.
+    """
+    fields = record.get("research_fields") or []
+    major = record.get("major") or ""
+    if isinstance(major, list):
+        major = " ".join(major)
+    parts = {
+        "name": " ".join(tokenize(record.get("name"))),
+        "university": " ".join(tokenize(record.get("university"))),
+        "major": " ".join(tokenize(major)),
+        "fields": " ".join(tokenize(" ".join(fields))),
+    }
+    all_tokens = " ".join(parts.values()).split()
+    parts["prefixes"] = " ".join(prefixes(all_tokens))
+    return parts
+
+
+def text_search_query(search_term):
+    """
+    $text search string: every token quoted, so all of them must match
+    (the default $text behaviour is OR).
+    """
+    return " ".join(f'"{token}"' for token in tokenize(search_term))
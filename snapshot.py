@@ -0,0 +1,441 @@
+# snapshot.py
+# Columnar, memory-mapped snapshot of professors.jsonl.
+#
+# The JSONL is parsed once (db_schema.coerce_types, so values match what
+# import_to_mongo stores) and written as one file of typed columns:
+#   int   id, h_index                    array('q')
+#   str   name, profile_url, email, ...  offsets array('q') + UTF-8 bytes
+#   dict  university                     codes array('i') + dictionary
+#   list  majors, research_fields        offsets array('q') + codes array('i') + dictionary
+#
+# Layout: MAGIC | uint64 header length | JSON header | 8-byte aligned
+# buffers. The header lists every column's buffers (offset, length,
+# typecode) and dictionaries. Snapshot.open() mmaps the file and hands out
+# memoryview casts over it - nothing is parsed or copied until a value is
+# read, and no per-row dicts are built unless asked for.
+#
+#   python snapshot.py build [professors.jsonl] [-o professors.snapshot]
+#   python snapshot.py export --csv professors.csv --xls university_db.professors.xls
+#   python snapshot.py info
+import argparse
+import csv
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from datetime import datetime
+
+from db_schema import SCRAPED_AT_FORMAT, coerce_types
+from jsonl_io import iter_jsonl
+
+SNAPSHOT_FILE = "professors.snapshot"
+MAGIC = b"PRFSNAP1"
+ALIGN = 8
+
+INT_COLUMNS = ("id", "h_index")
+STR_COLUMNS = ("name", "profile_url", "email", "scraped_at")
+DICT_COLUMNS = ("university",)
+LIST_COLUMNS = ("majors", "research_fields")
+COLUMNS = ("id", "name", "university", "majors", "h_index", "profile_url", "email", "research_fields",
+           "scraped_at")
+
+# professors.csv header -> column ("major" is the joined majors list)
+CSV_EXPORT_COLUMNS = [
+    ("No.", "id"),
+    ("Name", "name"),
+    ("University", "university"),
+    ("Major", "major"),
+    ("H-Index", "h_index"),
+    ("Profile URL", "profile_url"),
+    ("Email", "email"),
+    ("Research Fields", "research_fields"),
+]
+# Compass-style .xls header; research_fields is flattened to research_fields[0..n]
+XLS_EXPORT_COLUMNS = ["id", "name", "university", "major", "h_index", "profile_url", "email"]
+XLS_MAX_ROWS = 65535  # BIFF8 sheet limit, minus the header
+
+
+# -------------------------------------------
+# Writing
+# -------------------------------------------
+class _Dictionary:
+    """value -> code, codes assigned in first-seen order."""
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class SnapshotBuilder:
+    """Accumulates normalized records column by column; write() lays them out."""
+
+    def __init__(self):
+        self.rows = 0
+        self.ints = {name: array("q") for name in INT_COLUMNS}
+        self.strs = {name: (array("q", [0]), bytearray()) for name in STR_COLUMNS}
+        self.dicts = {name: (array("i"), _Dictionary()) for name in DICT_COLUMNS}
+        self.lists = {name: (array("q", [0]), array("i"), _Dictionary()) for name in LIST_COLUMNS}
+
+    def add(self, record):
+        record = coerce_types(dict(record))
+        if isinstance(record["scraped_at"], datetime):
+            record["scraped_at"] = record["scraped_at"].strftime(SCRAPED_AT_FORMAT)
+
+        for name, values in self.ints.items():
+            values.append(record[name])
+        for name, (offsets, data) in self.strs.items():
+            data += (record.get(name) or "").encode("utf-8")
+            offsets.append(len(data))
+        for name, (codes, dictionary) in self.dicts.items():
+            codes.append(dictionary.code(record.get(name) or ""))
+        for name, (offsets, codes, dictionary) in self.lists.items():
+            codes.extend(dictionary.code(value) for value in record[name])
+            offsets.append(len(codes))
+        self.rows += 1
+
+    def _buffers(self):
+        """(column, header entry, [(buffer name, bytes-like)])"""
+        for name, values in self.ints.items():
+            yield name, {"kind": "int"}, [("values", values)]
+        for name, (offsets, data) in self.strs.items():
+            yield name, {"kind": "str"}, [("offsets", offsets), ("data", data)]
+        for name, (codes, dictionary) in self.dicts.items():
+            yield name, {"kind": "dict", "dictionary": dictionary.values}, [("codes", codes)]
+        for name, (offsets, codes, dictionary) in self.lists.items():
+            longest = max((offsets[i + 1] - offsets[i] for i in range(self.rows)), default=0)
+            yield (name, {"kind": "list", "dictionary": dictionary.values, "max_length": longest},
+                   [("offsets", offsets), ("codes", codes)])
+
+    def write(self, path):
+        """Write the snapshot to path via a temp file + rename."""
+        columns = {}
+        layout = []
+        position = 0
+        for name, entry, buffers in self._buffers():
+            entry["buffers"] = {}
+            for buffer_name, buffer in buffers:
+                typecode = buffer.typecode if isinstance(buffer, array) else "B"
+                length = len(buffer) * (buffer.itemsize if isinstance(buffer, array) else 1)
+                entry["buffers"][buffer_name] = [position, length, typecode]
+                layout.append((position, buffer))
+                position += _padded(length)
+            columns[name] = entry
+
+        header = json.dumps({"rows": self.rows, "byteorder": sys.byteorder, "columns": columns},
+                            ensure_ascii=False).encode("utf-8")
+        header += b" " * (_padded(len(header)) - len(header))
+        base = len(MAGIC) + 8 + len(header)
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<Q", len(header)))
+            f.write(header)
+            for offset, buffer in layout:
+                f.seek(base + offset)
+                f.write(buffer)
+            f.truncate(base + position)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return self.rows
+
+
+def _padded(length):
+    return (length + ALIGN - 1) // ALIGN * ALIGN
+
+
+def build_snapshot(source="professors.jsonl", path=SNAPSHOT_FILE):
+    """Stream source (JSONL) into a snapshot at path; returns the row count."""
+    builder = SnapshotBuilder()
+    for record in iter_jsonl(source):
+        builder.add(record)
+    return builder.write(path)
+
+
+# -------------------------------------------
+# Column views (zero-copy over the mmap)
+# -------------------------------------------
+class IntColumn:
+    def __init__(self, values):
+        self.values = values  # memoryview, format 'q'
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, i):
+        return self.values[i]
+
+    def __iter__(self):
+        return iter(self.values)
+
+
+class StrColumn:
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class DictColumn:
+    """Dictionary-encoded strings; codes are comparable/groupable without decoding."""
+
+    def __init__(self, codes, dictionary):
+        self.codes = codes
+        self.dictionary = dictionary
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        return self.dictionary[self.codes[i]]
+
+    def __iter__(self):
+        return (self.dictionary[code] for code in self.codes)
+
+
+class ListColumn:
+    """Dictionary-encoded string lists: row i is codes[offsets[i]:offsets[i + 1]]."""
+
+    def __init__(self, offsets, codes, dictionary, max_length=0):
+        self.offsets = offsets
+        self.codes = codes
+        self.dictionary = dictionary
+        self.max_length = max_length
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def row_codes(self, i):
+        return self.codes[self.offsets[i]:self.offsets[i + 1]]
+
+    def __getitem__(self, i):
+        return [self.dictionary[code] for code in self.row_codes(i)]
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class Snapshot:
+    """
+    A snapshot file opened read-only via mmap. Column views borrow the
+    mapping, so they are only valid until close().
+
+        with Snapshot.open("professors.snapshot") as snap:
+            h = snap["h_index"]           # memoryview-backed, no parsing
+            sum(h) / len(h)
+    """
+
+    def __init__(self, path, f, mm, header):
+        self.path = path
+        self._f = f
+        self._mm = mm
+        self._views = []
+        self.rows = header["rows"]
+        self.header = header
+        self.columns = {}
+        for name, entry in header["columns"].items():
+            self.columns[name] = self._column(entry)
+
+    @classmethod
+    def open(cls, path=SNAPSHOT_FILE):
+        f = open(path, "rb")
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            f.close()
+            raise
+        try:
+            if mm[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not a professors snapshot")
+            (header_length,) = struct.unpack_from("<Q", mm, len(MAGIC))
+            start = len(MAGIC) + 8
+            header = json.loads(mm[start:start + header_length])
+            if header["byteorder"] != sys.byteorder:
+                raise ValueError(f"{path} was written on a {header['byteorder']}-endian machine")
+            header["base"] = start + header_length
+            return cls(path, f, mm, header)
+        except BaseException:
+            mm.close()
+            f.close()
+            raise
+
+    def _buffer(self, spec):
+        offset, length, typecode = spec
+        start = self.header["base"] + offset
+        view = memoryview(self._mm)[start:start + length]
+        self._views.append(view)
+        if typecode != "B":
+            view = view.cast(typecode)
+            self._views.append(view)
+        return view
+
+    def _column(self, entry):
+        buffers = {name: self._buffer(spec) for name, spec in entry["buffers"].items()}
+        kind = entry["kind"]
+        if kind == "int":
+            return IntColumn(buffers["values"])
+        if kind == "str":
+            return StrColumn(buffers["offsets"], buffers["data"])
+        if kind == "dict":
+            return DictColumn(buffers["codes"], entry["dictionary"])
+        return ListColumn(buffers["offsets"], buffers["codes"], entry["dictionary"], entry.get("max_length", 0))
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __len__(self):
+        return self.rows
+
+    def record(self, i):
+        """Row i as a record dict (same fields as professors.jsonl, typed)."""
+        record = {name: self.columns[name][i] for name in COLUMNS}
+        record["major"] = ", ".join(record["majors"])
+        return record
+
+    def iter_records(self):
+        for i in range(self.rows):
+            yield self.record(i)
+
+    def close(self):
+        self.columns = {}
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mm.close()
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_records(path=SNAPSHOT_FILE):
+    """Stream record dicts out of a snapshot (for import_to_mongo.iter_records)."""
+    with Snapshot.open(path) as snap:
+        yield from snap.iter_records()
+
+
+# -------------------------------------------
+# Exports (one streaming pass over the columns)
+# -------------------------------------------
+def export_csv(snap, path):
+    """professors.csv: UTF-8 with BOM, research fields joined with ", "."""
+    columns = snap.columns
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow([header for header, _ in CSV_EXPORT_COLUMNS])
+        for i in range(snap.rows):
+            writer.writerow([
+                columns["id"][i],
+                columns["name"][i],
+                columns["university"][i],
+                ", ".join(columns["majors"][i]),
+                columns["h_index"][i],
+                columns["profile_url"][i],
+                columns["email"][i],
+                ", ".join(columns["research_fields"][i]),
+            ])
+    os.replace(tmp_path, path)
+    return snap.rows
+
+
+def export_xls(snap, path):
+    """
+    university_db.professors.xls in the Compass layout (one
+    research_fields[n] column per list slot, as wide as the longest list).
+    """
+    try:
+        import xlwt
+    except ImportError:
+        raise SystemExit("Writing .xls files requires xlwt: pip install xlwt")
+    if snap.rows > XLS_MAX_ROWS:
+        raise SystemExit(f".xls sheets hold at most {XLS_MAX_ROWS} rows; export CSV instead")
+
+    columns = snap.columns
+    fields = columns["research_fields"]
+    book = xlwt.Workbook(encoding="utf-8")
+    sheet = book.add_sheet(os.path.splitext(os.path.basename(path))[0][:31])
+    header = XLS_EXPORT_COLUMNS + [f"research_fields[{n}]" for n in range(fields.max_length)]
+    for c, name in enumerate(header):
+        sheet.write(0, c, name)
+    for i in range(snap.rows):
+        row = sheet.row(i + 1)
+        row.write(0, columns["id"][i])
+        row.write(1, columns["name"][i])
+        row.write(2, columns["university"][i])
+        row.write(3, ", ".join(columns["majors"][i]))
+        row.write(4, columns["h_index"][i])
+        row.write(5, columns["profile_url"][i])
+        row.write(6, columns["email"][i])
+        for n, value in enumerate(fields[i]):
+            row.write(len(XLS_EXPORT_COLUMNS) + n, value)
+        if i % 1000 == 0:
+            sheet.flush_row_data()
+
+    tmp_path = f"{path}.tmp"
+    book.save(tmp_path)
+    os.replace(tmp_path, path)
+    return snap.rows
+
+
+def print_info(snap):
+    size = os.path.getsize(snap.path)
+    print(f"{snap.path}: {snap.rows} rows, {size / 1024:.1f} KiB")
+    for name, entry in snap.header["columns"].items():
+        nbytes = sum(length for _, length, _ in entry["buffers"].values())
+        extra = f", {len(entry['dictionary'])} distinct" if "dictionary" in entry else ""
+        print(f"  {name:<16} {entry['kind']:<5} {nbytes / 1024:9.1f} KiB{extra}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Columnar snapshot of professors.jsonl")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Write a snapshot from a JSONL file")
+    build.add_argument("source", nargs="?", default="professors.jsonl")
+    build.add_argument("-o", "--output", default=SNAPSHOT_FILE)
+
+    export = sub.add_parser("export", help="Derive the CSV/XLS copies from a snapshot")
+    export.add_argument("snapshot", nargs="?", default=SNAPSHOT_FILE)
+    export.add_argument("--csv", help="e.g. professors.csv")
+    export.add_argument("--xls", help="e.g. university_db.professors.xls")
+
+    info = sub.add_parser("info", help="Show the columns and their sizes")
+    info.add_argument("snapshot", nargs="?", default=SNAPSHOT_FILE)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        rows = build_snapshot(args.source, args.output)
+        print(f"Wrote {rows} rows to {args.output}")
+    elif args.command == "export":
+        if not (args.csv or args.xls):
+            parser.error("export needs --csv and/or --xls")
+        with Snapshot.open(args.snapshot) as snap:
+            if args.csv:
+                print(f"Wrote {export_csv(snap, args.csv)} rows to {args.csv}")
+            if args.xls:
+                print(f"Wrote {export_xls(snap, args.xls)} rows to {args.xls}")
+    else:
+        with Snapshot.open(args.snapshot) as snap:
+            print_info(snap)
@@ -0,0 +1,64 @@
+// Filter, sort and page links (data-partial) inside #results fetch only the
+// results fragment (/results?...) and swap it in, instead of reloading the
+// whole page with its CSS and fonts. The address bar keeps the full-page
+// URL, so reloads, bookmarks and back/forward still work.
+(function () {
+    const container = document.getElementById('results');
+    if (!container || !window.fetch || !window.history.pushState) {
+        return;
+    }
+    const resultsUrl = container.dataset.resultsUrl;
+    let pending = null;
+
+    function apply(html) {
+        container.innerHTML = html;
+        const fragment = container.firstElementChild;
+        if (fragment && fragment.dataset.title) {
+            document.title = fragment.dataset.title;
+        }
+        const themeLink = document.getElementById('theme-link');
+        if (fragment && themeLink && fragment.dataset.themeLink) {
+            themeLink.href = fragment.dataset.themeLink;
+        }
+    }
+
+    async function load(query, push) {
+        if (pending) {
+            pending.abort();
+        }
+        pending = new AbortController();
+        container.setAttribute('aria-busy', 'true');
+        try {
+            const response = await fetch(resultsUrl + query, {signal: pending.signal, credentials: 'same-origin'});
+            if (!response.ok) {
+                throw new Error(response.status);
+            }
+            apply(await response.text());
+            if (push) {
+                history.pushState({partial: true}, '', location.pathname + query);
+            }
+            container.scrollIntoView({block: 'start'});
+        } catch (e) {
+            if (e.name !== 'AbortError') {
+                // Fall back to a normal navigation
+                location.href = location.pathname + query;
+            }
+        } finally {
+            container.removeAttribute('aria-busy');
+        }
+    }
+
+    container.addEventListener('click', function (event) {
+        const link = event.target.closest('a[data-partial]');
+        if (!link || event.defaultPrevented || event.button !== 0 ||
+                event.metaKey || event.ctrlKey || event.shiftKey || event.altKey) {
+            return;
+        }
+        event.preventDefault();
+        load(new URL(link.href, location.href).search, true);
+    });
+
+    window.addEventListener('popstate', function () {
+        load(location.search, false);
+    });
+})();
@@ -0,0 +1,630 @@
+# storage.py
+# Storage backends behind app.py's listing, API and facet views.
+#
+#   MongoStorage  - the professors collection (db_client.MongoConnection),
+#                   served from the indexes in db_schema.INDEX_PLAN
+#   MemoryStorage - professors.jsonl (or a .snapshot / .csv / .xls) loaded
+#                   into process memory with the same normalization as
+#                   import_to_mongo.py, so both answer every query shape the
+#                   same way
+#
+# Both implement:
+#   dataset_version()            cache key; changes when the data does
+#   facet_index(version)         facets.FacetIndex for chips / /api/facets
+#   query_page(...)              one listing page (see MongoStorage.query_page)
+#   export(...)                  every match, in listing order
+#   estimated_count(), health(), close()
+import base64
+import math
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+from bson import json_util
+
+import telemetry
+from db_client import MongoConnection
+from db_schema import SORT_FIELDS, TEXT_INDEX_WEIGHTS, get_dataset_version, normalize_record
+from facets import FacetIndex, collect_facets, intersect_sorted
+from search_text import text_search_query, tokenize
+
+# Fields returned by export() (the API's record fields)
+EXPORT_FIELDS = ["id", "name", "university", "major", "majors", "h_index",
+                 "profile_url", "email", "research_fields", "scraped_at"]
+
+
+# -------------------------------------------
+# Keyset cursors and sort order (shared)
+# -------------------------------------------
+def encode_cursor(doc, sort_field):
+    """Opaque cursor for a row: its sort key plus _id as the tie-breaker."""
+    raw = json_util.dumps([doc.get(sort_field), doc["_id"]])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(token):
+    try:
+        value, _id = json_util.loads(base64.urlsafe_b64decode(token.encode("ascii")).decode("utf-8"))
+        return value, _id
+    except Exception:
+        return None
+
+
+def sort_spec(sort_by, sort_dir, text_query):
+    """Returns (sort_field, sort_direction, rank_by_relevance)."""
+    # Set default sort field to 'university' ascending (1) as requested.
+    sort_field = SORT_FIELDS.get(sort_by, 'university')
+    sort_direction = 1 if sort_dir.lower() == 'asc' else -1
+    return sort_field, sort_direction, bool(text_query) and sort_by == 'relevance'
+
+
+def page_result(professors, total_count, per_page, sort_field, rank_by_relevance):
+    next_cursor = prev_cursor = None
+    if professors and not rank_by_relevance:
+        prev_cursor = encode_cursor(professors[0], sort_field)
+        next_cursor = encode_cursor(professors[-1], sort_field)
+    return {
+        "professors": professors,
+        "total_count": total_count,
+        "total_pages": math.ceil(total_count / per_page),
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
+    }
+
+
+# -------------------------------------------
+# MongoDB
+# -------------------------------------------
+def keyset_filter(sort_field, sort_direction, cursor, before=False):
+    """
+    Rows strictly after (or, with before=True, strictly before) the cursor
+    row in (sort_field, _id) order - an index range instead of a skip.
+    """
+    value, _id = cursor
+    forward = (sort_direction == 1) != before
+    op = "$gt" if forward else "$lt"
+    return {"$or": [
+        {sort_field: {op: value}},
+        {sort_field: value, "_id": {op: _id}},
+    ]}
+
+
+def build_query(search_term, research_fields_filter):
+    """Returns (mongo query, $text search string or "")."""
+    query = {}
+    text_query = text_search_query(search_term) if search_term else ""
+    if text_query:
+        # Search by name, university, major, or research fields through the
+        # weighted text index over the normalized "search" fields (built by
+        # import_to_mongo.py), instead of a collection scan per keystroke.
+        query["$text"] = {"$search": text_query}
+
+    # Add research fields filter to query
+    if research_fields_filter:
+        # Match documents where research_fields array contains ALL selected fields
+        query["research_fields"] = {"$all": research_fields_filter}
+
+    return query, text_query
+
+
+class MongoStorage:
+    kind = "mongo"
+
+    # How long the dataset version is trusted before re-reading it
+    VERSION_CHECK_INTERVAL = 5 # seconds
+
+    # Up to this many facet-matched ids the query becomes an id $in lookup;
+    # above it the index-backed research_fields $all filter is cheaper.
+    FACET_IN_LIMIT = 1000
+
+    def __init__(self, config, count_cache=None):
+        self.connection = MongoConnection(config)
+        self.count_cache = count_cache
+        self.version = None
+        self._version_checked_at = 0.0
+        # Facet index, reloaded whenever the dataset version changes
+        self._facet_state = {"version": None, "index": FacetIndex({}, {})}
+
+    @property
+    def collection(self):
+        return self.connection.collection
+
+    @property
+    def db(self):
+        return self.connection.db
+
+    def dataset_version(self):
+        now = time.monotonic()
+        if self.version is None or now - self._version_checked_at > self.VERSION_CHECK_INTERVAL:
+            self.version = get_dataset_version(self.db)
+            self._version_checked_at = now
+        return self.version
+
+    def facet_index(self, version):
+        if self._facet_state["version"] != version:
+            try:
+                self._facet_state["index"] = FacetIndex.load(self.db)
+            except Exception as e:
+                print(f"Could not load facets: {e}")
+                self._facet_state["index"] = FacetIndex({}, {})
+            self._facet_state["version"] = version
+        return self._facet_state["index"]
+
+    def cached_count(self, query, version=None):
+        """
+        Total for query, recounted at most once per count_cache TTL.
+        The unfiltered listing uses the collection's metadata estimate.
+        """
+        if not query:
+            return self.collection.estimated_document_count()
+        if self.count_cache is None:
+            return self.collection.count_documents(query)
+
+        key = (version, json_util.dumps(query, sort_keys=True))
+        count = self.count_cache.get(key)
+        if count is None:
+            count = self.collection.count_documents(query)
+            self.count_cache.set(key, count)
+        return count
+
+    def estimated_count(self):
+        return self.collection.estimated_document_count()
+
+    def query_page(self, search_term, research_fields_filter, sort_by, sort_dir, page,
+                   after_token='', before_token='', per_page=20, version=None):
+        """
+        Run the listing query for one page.
+
+        Returns a dict with professors, total_count, total_pages and the
+        prev/next keyset cursors.
+        """
+        query, text_query = build_query(search_term, research_fields_filter)
+
+        # Conjunctive fields= filter answered by intersecting facet postings
+        facet_ids = None
+        facets = self.facet_index(version)
+        if research_fields_filter and facets:
+            facet_ids = facets.match_all("research_fields", research_fields_filter)
+            if len(facet_ids) <= self.FACET_IN_LIMIT:
+                del query["research_fields"]
+                query["id"] = {"$in": facet_ids}
+
+        with telemetry.span("count") as span_labels:
+            if facet_ids is not None and not text_query:
+                total_count = len(facet_ids)
+                span_labels["outcome"] = "facets"
+            else:
+                total_count = self.cached_count(query, version)
+
+        # Determine sorting parameters
+        sort_field, sort_direction, rank_by_relevance = sort_spec(sort_by, sort_dir, text_query)
+
+        # Prev/next links carry opaque after/before cursors; plain page numbers
+        # (e.g. jumping straight to a page) still fall back to skip.
+        after = decode_cursor(after_token)
+        before = decode_cursor(before_token)
+
+        find_span = telemetry.span("find", strategy="relevance" if rank_by_relevance else
+                                   "keyset" if (after or before) else "skip")
+        with find_span:
+            professors = self._find_page(query, sort_field, sort_direction, rank_by_relevance,
+                                         after, before, page, per_page)
+        return page_result(professors, total_count, per_page, sort_field, rank_by_relevance)
+
+    def _find_page(self, query, sort_field, sort_direction, rank_by_relevance, after, before, page, per_page):
+        collection = self.collection
+        if rank_by_relevance:
+            # textScore cannot be range-queried, so relevance pages use skip;
+            # search result sets are small.
+            professors = list(collection.find(query, {"score": {"$meta": "textScore"}})
+                              .sort([("score", {"$meta": "textScore"})])
+                              .skip((page - 1) * per_page)
+                              .limit(per_page))
+        elif after or before:
+            page_query = {"$and": [query, keyset_filter(sort_field, sort_direction, before or after, before=bool(before))]}
+            direction = -sort_direction if before else sort_direction
+            professors = list(collection.find(page_query)
+                              .sort([(sort_field, direction), ("_id", direction)])
+                              .limit(per_page))
+            if before:
+                professors.reverse()
+        else:
+            # h_index is stored as an int (db_schema.normalize_record), so every
+            # column sorts with a plain find walking the (field, _id) index.
+            professors = list(collection.find(query)
+                              .sort([(sort_field, sort_direction), ("_id", sort_direction)])
+                              .skip((page - 1) * per_page)
+                              .limit(per_page))
+        return professors
+
+    def export(self, search_term, research_fields_filter, sort_by, sort_dir):
+        """Unpaged cursor over every match, in the listing's sort order."""
+        query, text_query = build_query(search_term, research_fields_filter)
+        sort_field, sort_direction, rank_by_relevance = sort_spec(sort_by, sort_dir, text_query)
+        projection = {field: 1 for field in EXPORT_FIELDS}
+        if rank_by_relevance:
+            projection["score"] = {"$meta": "textScore"}
+            order = [("score", {"$meta": "textScore"})]
+        else:
+            order = [(sort_field, sort_direction), ("_id", sort_direction)]
+        return self.collection.find(query, projection).sort(order).batch_size(1000)
+
+    def health(self):
+        return {"backend": self.kind, **self.connection.health()}
+
+    def close(self):
+        self.connection.close()
+
+
+# -------------------------------------------
+# In-process
+# -------------------------------------------
+def text_scores(search):
+    """
+    term -> score over a document's normalized search fields, with MongoDB's
+    text index scoring (FTSSpec::_scoreStringV2): per field, repeated terms
+    add 1, 1/2, 1/4, ..., scaled by the field weight and by how much of the
+    field the term makes up, plus 10% when the term is the whole field.
+    """
+    scores = {}
+    for field, weight in TEXT_INDEX_WEIGHTS.items():
+        raw = search.get(field.split(".", 1)[1]) or ""
+        tokens = raw.split()
+        terms = {}
+        for token in tokens:
+            exp, count, freq = terms.get(token, (0, 0, 0.0))
+            exp = exp * 2 if exp else 1
+            terms[token] = (exp, count + 1, freq + 1 / exp)
+        for term, (_, count, freq) in terms.items():
+            coeff = 0.5 * count / len(tokens) + 0.5
+            adjustment = 1.1 if raw == term else 1.0
+            scores[term] = scores.get(term, 0.0) + weight * freq * coeff * adjustment
+    return scores
+
+
+def sort_value(value):
+    """
+    Comparable stand-in for a sort field value, in MongoDB's cross-type
+    order: missing / None first, then numbers, then strings, then anything
+    else by its repr. A record without the field, or a column mixing None
+    and strings, sorts like it does in Mongo instead of raising TypeError.
+    """
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    return (3, repr(value))
+
+
+class MemoryDataset:
+    """
+    One immutable load of the dataset. MemoryStorage swaps whole instances,
+    so a request never sees a half-built index.
+
+      docs        row -> document; _id is the row number
+      values      sort field -> sort_value() of every row
+      order       sort field -> array of rows in (value, _id) order
+      terms       token -> (array of rows, array of scores)
+      postings    research field -> array of rows
+    """
+
+    def __init__(self, records, version, source=None):
+        self.version = version
+        self.source = source
+        self.loaded_at = time.time()
+
+        # Same coercion and identity upserts as import_to_mongo.py: a repeated
+        # identity overwrites the earlier document in place
+        self.docs = []
+        rows = {}
+        for record in records:
+            record.pop("_id", None)
+            record = normalize_record(record)
+            identity = record["identity"] = _record_identity(record)
+            row = rows.get(identity)
+            if row is None:
+                row = rows[identity] = len(self.docs)
+                self.docs.append(record)
+            else:
+                self.docs[row] = record
+            record["_id"] = row
+
+        self.values = {}
+        self.order = {}
+        for field in set(SORT_FIELDS.values()):
+            values = [sort_value(doc.get(field)) for doc in self.docs]
+            self.values[field] = values
+            self.order[field] = array("q", sorted(range(len(values)), key=lambda row: (values[row], row)))
+
+        terms = {}
+        postings = {}
+        for row, doc in enumerate(self.docs):
+            for term, score in text_scores(doc["search"]).items():
+                entry = terms.get(term)
+                if entry is None:
+                    entry = terms[term] = (array("q"), array("d"))
+                entry[0].append(row)
+                entry[1].append(score)
+            for field in doc["research_fields"]:
+                postings.setdefault(field, array("q")).append(row)
+        self.terms = terms
+        self.postings = postings
+
+        facet_postings, counts = collect_facets(self.docs)
+        counts["research_fields"] = {value: len(ids) for value, ids in facet_postings["research_fields"].items()}
+        self.facets = FacetIndex({facet: {value: array("q", ids) for value, ids in values.items()}
+                                  for facet, values in facet_postings.items()}, counts)
+
+    def __len__(self):
+        return len(self.docs)
+
+    def match(self, tokens, research_fields_filter):
+        """Sorted rows matching every token and every research field, or None for all rows."""
+        lists = []
+        for token in tokens:
+            entry = self.terms.get(token)
+            if entry is None:
+                return []
+            lists.append(entry[0])
+        for field in research_fields_filter:
+            rows = self.postings.get(field)
+            if rows is None:
+                return []
+            lists.append(rows)
+        return intersect_sorted(lists) if lists else None
+
+    def score(self, row, tokens):
+        total = 0.0
+        for token in tokens:
+            rows, scores = self.terms[token]
+            total += scores[bisect_left(rows, row)]
+        return total
+
+
+def _record_identity(record):
+    # Imported here: import_to_mongo pulls in the file readers and bulk writers
+    from import_to_mongo import record_identity
+    return record_identity(record)
+
+
+def _read_records(path):
+    from import_to_mongo import iter_records
+    return iter_records(path)
+
+
+class MemoryStorage:
+    """
+    The whole dataset in process memory: presorted row arrays per sort
+    field, an inverted index over the normalized search tokens and sorted
+    research-field postings. Reloads (atomically, on a background thread)
+    when the source file's mtime or size changes; requests keep serving the
+    current dataset until the new one is swapped in. Writers should replace
+    the file with a rename, as fix_ids.py and dedup.py --in-place do.
+    """
+    kind = "memory"
+
+    # How often the source file is stat()ed for changes
+    RELOAD_CHECK_INTERVAL = 2 # seconds
+
+    # Filtered sets below 1/SMALL_MATCH_RATIO of the rows are sorted
+    # directly instead of walking the presorted array
+    SMALL_MATCH_RATIO = 16
+
+    def __init__(self, path="professors.jsonl"):
+        self.path = path
+        self.dataset = None
+        self.load_seconds = None
+        self.load_error = None
+        self._checked_at = 0.0
+        self._reload_lock = threading.Lock()
+        # File version whose load failed; not retried until the file changes
+        self._failed_version = None
+        self.reload()
+
+    @staticmethod
+    def file_version(path):
+        """mtime/size fingerprint of path; identical in every worker process."""
+        stat = os.stat(path)
+        return int(stat.st_mtime_ns) ^ (stat.st_size << 1)
+
+    @property
+    def version(self):
+        return self.dataset.version if self.dataset else None
+
+    def reload(self, force=False):
+        """Rebuild the dataset if the file changed; returns True if it was swapped in."""
+        # One reloading thread; the others keep serving the current dataset
+        if not self._reload_lock.acquire(blocking=self.dataset is None):
+            return False
+        version = None
+        try:
+            version = self.file_version(self.path)
+            if not force and self.dataset is not None and version in (self.dataset.version, self._failed_version):
+                return False
+            start = time.perf_counter()
+            dataset = MemoryDataset(_read_records(self.path), version, self.path)
+            if not dataset.docs and self.dataset is not None and self.dataset.docs:
+                raise ValueError("no records (file truncated or still being written?)")
+            self.load_seconds = time.perf_counter() - start
+            self.dataset = dataset
+            self.load_error = None
+            self._failed_version = None
+            print(f"Loaded {len(dataset)} professors from {self.path} in {self.load_seconds:.2f}s")
+            return True
+        except Exception as e:
+            # Keep serving the last good dataset
+            self.load_error = str(e)
+            if self.dataset is None:
+                raise
+            self._failed_version = version
+            print(f"Could not reload {self.path}: {e}")
+            return False
+        finally:
+            self._reload_lock.release()
+
+    def dataset_version(self):
+        now = time.monotonic()
+        if now - self._checked_at > self.RELOAD_CHECK_INTERVAL:
+            self._checked_at = now
+            self._reload_in_background()
+        return self.dataset.version
+
+    def _reload_in_background(self):
+        """Start a reload thread if the file changed; the request does not wait for it."""
+        try:
+            version = self.file_version(self.path)
+        except OSError as e:
+            self.load_error = str(e)
+            return
+        if version in (self.dataset.version, self._failed_version) or self._reload_lock.locked():
+            return
+        threading.Thread(target=self.reload, name="memory-storage-reload", daemon=True).start()
+
+    def facet_index(self, version):
+        return self.dataset.facets
+
+    def estimated_count(self):
+        return len(self.dataset)
+
+    def _matches(self, dataset, search_term, research_fields_filter):
+        """(rows or None for all, query tokens, text query)"""
+        text_query = text_search_query(search_term) if search_term else ""
+        tokens = list(dict.fromkeys(tokenize(search_term))) if text_query else []
+        return dataset.match(tokens, research_fields_filter), tokens, text_query
+
+    def _ordered(self, dataset, rows, sort_field):
+        """
+        (rows in ascending (value, _id) order, membership mask or None).
+        Small matches are sorted directly; large ones walk the presorted
+        array and skip non-members.
+        """
+        order = dataset.order[sort_field]
+        if rows is None:
+            return order, None
+        if len(rows) * self.SMALL_MATCH_RATIO < len(order):
+            values = dataset.values[sort_field]
+            return sorted(rows, key=lambda row: (values[row], row)), None
+        mask = bytearray(len(order))
+        for row in rows:
+            mask[row] = 1
+        return order, mask
+
+    def query_page(self, search_term, research_fields_filter, sort_by, sort_dir, page,
+                   after_token='', before_token='', per_page=20, version=None):
+        """Same contract and results as MongoStorage.query_page."""
+        dataset = self.dataset
+        with telemetry.span("count", outcome="memory"):
+            rows, tokens, text_query = self._matches(dataset, search_term, research_fields_filter)
+            total_count = len(dataset) if rows is None else len(rows)
+
+        sort_field, sort_direction, rank_by_relevance = sort_spec(sort_by, sort_dir, text_query)
+        after = self._cursor(after_token)
+        before = self._cursor(before_token)
+
+        find_span = telemetry.span("find", strategy="relevance" if rank_by_relevance else
+                                   "keyset" if (after or before) else "skip", outcome="memory")
+        with find_span:
+            if rank_by_relevance:
+                start = (page - 1) * per_page
+                professors = self._ranked(dataset, rows, tokens)[start:start + per_page]
+            else:
+                ordered, mask = self._ordered(dataset, rows, sort_field)
+                picked = self._slice(dataset, ordered, mask, sort_field, sort_direction,
+                                     before or after, bool(before), (page - 1) * per_page, per_page)
+                professors = [dataset.docs[row] for row in picked]
+        return page_result(professors, total_count, per_page, sort_field, rank_by_relevance)
+
+    @staticmethod
+    def _cursor(token):
+        cursor = decode_cursor(token)
+        # A cursor minted by the Mongo backend carries an ObjectId
+        if cursor is None or not isinstance(cursor[1], int):
+            return None
+        return cursor
+
+    @staticmethod
+    def _slice(dataset, ordered, mask, sort_field, sort_direction, cursor, before, skip, limit):
+        """Up to limit rows of ordered (filtered by mask) in display order."""
+        lo, hi = 0, len(ordered)
+        if cursor is not None:
+            values = dataset.values[sort_field]
+            key = (sort_value(cursor[0]), cursor[1])
+            position = lambda row: (values[row], row)
+            forward = (sort_direction == 1) != before
+            if forward:
+                lo = bisect_right(ordered, key, key=position)
+            else:
+                hi = bisect_left(ordered, key, key=position)
+            skip = 0
+        step = sort_direction if cursor is None or not before else -sort_direction
+        positions = range(lo, hi) if step == 1 else range(hi - 1, lo - 1, -1)
+        if mask is None:
+            # Every position is a match: skip by index arithmetic
+            positions = positions[skip:skip + limit]
+            skip = 0
+
+        picked = []
+        for i in positions:
+            row = ordered[i]
+            if mask is not None and not mask[row]:
+                continue
+            if skip:
+                skip -= 1
+                continue
+            picked.append(row)
+            if len(picked) == limit:
+                break
+        if before:
+            picked.reverse()
+        return picked
+
+    @staticmethod
+    def _ranked(dataset, rows, tokens):
+        scored = sorted(((dataset.score(row, tokens), row) for row in rows), key=lambda pair: (-pair[0], pair[1]))
+        return [dict(dataset.docs[row], score=score) for score, row in scored]
+
+    def export(self, search_term, research_fields_filter, sort_by, sort_dir):
+        dataset = self.dataset
+        rows, tokens, text_query = self._matches(dataset, search_term, research_fields_filter)
+        sort_field, sort_direction, rank_by_relevance = sort_spec(sort_by, sort_dir, text_query)
+        if rank_by_relevance:
+            yield from self._ranked(dataset, rows, tokens)
+            return
+        ordered, mask = self._ordered(dataset, rows, sort_field)
+        positions = range(len(ordered)) if sort_direction == 1 else range(len(ordered) - 1, -1, -1)
+        for i in positions:
+            row = ordered[i]
+            if mask is None or mask[row]:
+                yield dataset.docs[row]
+
+    def health(self):
+        dataset = self.dataset
+        report = {
+            "status": "ok" if dataset is not None else "error",
+            "backend": self.kind,
+            "source": self.path,
+            "documents": len(dataset) if dataset else 0,
+            "dataset_version": self.version,
+            "loaded_at": dataset.loaded_at if dataset else None,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+        }
+        if self.load_error:
+            report["last_reload_error"] = self.load_error
+        return report
+
+    def close(self):
+        pass
+
+
+def create_storage(config, count_cache=None):
+    """The backend named by config["STORAGE"] ("mongo" or "memory")."""
+    kind = config.get("STORAGE", "mongo")
+    if kind == "memory":
+        return MemoryStorage(config.get("STORAGE_PATH", "professors.jsonl"))
+    if kind == "mongo":
+        return MongoStorage(config, count_cache)
+    raise ValueError(f"Unknown STORAGE backend: {kind!r}")
@@ -0,0 +1,175 @@
+# telemetry.py
+# Timing spans for the scraper and the web app.
+#
+# Every finished span is
+#   - appended to a JSON-lines trace file (if one is configured), with all
+#     of its labels - university, major, endpoint, ...
+#   - folded into in-process Prometheus histograms, keyed on the span name
+#     and the low-cardinality labels in METRIC_LABELS only (a label per
+#     university or major would blow up the series count).
+#
+# Spans nest: the enclosing span's name is recorded as "parent". Nesting is
+# tracked with a contextvar, so it is per thread and per asyncio task.
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Labels that become Prometheus labels; everything else stays in the traces
+METRIC_LABELS = ("strategy", "outcome", "endpoint", "status", "engine")
+
+# Histogram buckets, in seconds (spans range from sub-ms renders to
+# multi-second page loads)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_bound_labels = contextvars.ContextVar("bound_labels", default={})
+
+
+class Tracer:
+    def __init__(self, trace_path=None, prefix="cshub"):
+        self.trace_path = trace_path
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._trace_file = None
+        # (name, metric label items) -> [bucket counts..., sum, count]
+        self._histograms = {}
+        self._counters = {}
+
+    def configure(self, trace_path=None, prefix=None):
+        with self._lock:
+            if self._trace_file is not None:
+                self._trace_file.close()
+                self._trace_file = None
+            self.trace_path = trace_path
+            if prefix:
+                self.prefix = prefix
+
+    @contextmanager
+    def bind(self, **labels):
+        """Add labels (e.g. university=...) to every span opened inside the block."""
+        token = _bound_labels.set({**_bound_labels.get(), **labels})
+        try:
+            yield
+        finally:
+            _bound_labels.reset(token)
+
+    @contextmanager
+    def span(self, name, **labels):
+        """
+        Time the enclosed block as span `name`. Yields the label dict, so the
+        block can add labels (e.g. outcome) before the span is recorded; an
+        exception sets outcome="error".
+        """
+        labels = {**_bound_labels.get(), **labels}
+        parent = _current_span.get()
+        token = _current_span.set(name)
+        start = time.perf_counter()
+        error = None
+        try:
+            yield labels
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            _current_span.reset(token)
+            if error is not None:
+                labels.setdefault("outcome", "error")
+                labels["error"] = error
+            self.record(name, time.perf_counter() - start, parent=parent, **labels)
+
+    def record(self, name, seconds, parent=None, **labels):
+        """Record an already measured span (e.g. from request hooks)."""
+        metric_key = (name, tuple((k, str(labels[k])) for k in METRIC_LABELS if k in labels))
+        with self._lock:
+            hist = self._histograms.get(metric_key)
+            if hist is None:
+                hist = self._histograms[metric_key] = [0] * len(BUCKETS) + [0.0, 0]
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    hist[i] += 1
+            hist[-2] += seconds
+            hist[-1] += 1
+
+            if self.trace_path:
+                if self._trace_file is None:
+                    self._trace_file = open(self.trace_path, "a", encoding="utf-8")
+                line = {"ts": round(time.time(), 3), "span": name, "ms": round(seconds * 1000, 3)}
+                if parent:
+                    line["parent"] = parent
+                line.update(labels)
+                self._trace_file.write(json.dumps(line, ensure_ascii=False, default=str) + "\n")
+                self._trace_file.flush()
+
+    def increment(self, name, value=1, **labels):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def summary(self):
+        """{span name: {"count": n, "seconds": total}} over all label sets."""
+        out = {}
+        with self._lock:
+            for (name, _), hist in self._histograms.items():
+                entry = out.setdefault(name, {"count": 0, "seconds": 0.0})
+                entry["count"] += hist[-1]
+                entry["seconds"] += hist[-2]
+        return out
+
+    def render_prometheus(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        metric = f"{self.prefix}_span_duration_seconds"
+        lines = [f"# HELP {metric} Duration of instrumented spans.", f"# TYPE {metric} histogram"]
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        for (name, label_items), hist in histograms:
+            labels = [("span", name)] + list(label_items)
+            for i, bound in enumerate(BUCKETS):
+                lines.append(f"{metric}_bucket{_labels(labels + [('le', repr(float(bound)))])} {hist[i]}")
+            lines.append(f"{metric}_bucket{_labels(labels + [('le', '+Inf')])} {hist[-1]}")
+            lines.append(f"{metric}_sum{_labels(labels)} {hist[-2]:.6f}")
+            lines.append(f"{metric}_count{_labels(labels)} {hist[-1]}")
+
+        seen = set()
+        for (name, label_items), value in counters:
+            counter = f"{self.prefix}_{name}_total"
+            if counter not in seen:
+                seen.add(counter)
+                lines.append(f"# TYPE {counter} counter")
+            lines.append(f"{counter}{_labels(list(label_items))} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Write the metrics to path (e.g. for node_exporter's textfile collector)."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(items):
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+# Process-wide tracer used by scraper.py and app.py
+TRACER = Tracer()
+span = TRACER.span
+bind = TRACER.bind
+record = TRACER.record
+increment = TRACER.increment
+configure = TRACER.configure
+render_prometheus = TRACER.render_prometheus
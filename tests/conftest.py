@@ -0,0 +1,11 @@
+# tests/conftest.py
+# The modules under test are top-level scripts; make the repo importable
+# however pytest is started.
+import os
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(REPO_DIR, "benchmarks", "fixtures")
+
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
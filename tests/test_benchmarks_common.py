@@ -0,0 +1,14 @@
+# tests/test_benchmarks_common.py
+# Nearest-rank percentiles used by every benchmark report.
+from benchmarks.common import percentile
+
+
+def test_nearest_rank():
+    values = list(range(1, 11))
+    assert percentile(values, 50) == 5  # round(5.5) would give 6
+    assert percentile(values, 95) == 10
+    assert percentile(values, 25) == 3
+    assert percentile(values, 0) == 1
+    assert percentile(values, 100) == 10
+    assert percentile([7, 8], 50) == 7
+    assert percentile([], 50) is None
@@ -0,0 +1,50 @@
+# tests/test_browser_profile.py
+# CDP endpoint discovery against a stub /json/version server.
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import browser_profile
+
+
+class VersionHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/json/version":
+            self.send_error(404)
+            return
+        body = json.dumps({"Browser": "Chrome/Stub"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_port():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), VersionHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def test_cdp_endpoint_answers_only_where_a_browser_listens(stub_port):
+    assert browser_profile.cdp_endpoint(stub_port) == f"http://127.0.0.1:{stub_port}"
+    assert browser_profile.cdp_endpoint(browser_profile.free_port()) is None
+
+
+def test_wait_for_cdp_gives_up(stub_port):
+    assert browser_profile.wait_for_cdp(stub_port, timeout=0) == f"http://127.0.0.1:{stub_port}"
+    assert browser_profile.wait_for_cdp(browser_profile.free_port(), timeout=0.3) is None
+
+
+def test_launch_options_use_the_given_port():
+    port = browser_profile.free_port()
+    assert f"--remote-debugging-port={port}" in browser_profile.launch_options(True, port)["args"]
@@ -0,0 +1,49 @@
+# tests/test_checkpoint.py
+# CrawlCheckpoint: resume state and the output-append bracket.
+from checkpoint import CrawlCheckpoint
+
+
+def open_checkpoint(tmp_path, resume=False):
+    return CrawlCheckpoint(state_path=str(tmp_path / "state.json"),
+                           journal_path=str(tmp_path / "journal.jsonl"), resume=resume)
+
+
+def test_resume_skips_finished_work_and_replays_the_journal(tmp_path):
+    checkpoint = open_checkpoint(tmp_path)
+    professors = {"a": {"name": "a"}, "b": {"name": "b"}}
+    checkpoint.complete_major("U1", "M1", professors, ["a", "b"])
+    checkpoint.complete_university("U0")
+    checkpoint.close()
+
+    resumed = open_checkpoint(tmp_path, resume=True)
+    assert resumed.is_university_done("U0")
+    assert resumed.is_major_done("U1", "M1") and not resumed.is_major_done("U1", "M2")
+    assert resumed.replay("U1") == professors
+    resumed.close()
+
+
+def test_interrupted_append_is_truncated_on_resume(tmp_path):
+    output = tmp_path / "professors.jsonl"
+    output.write_text('{"id": 1}\n', encoding="utf-8")
+    checkpoint = open_checkpoint(tmp_path)
+    checkpoint.begin_output("U1", str(output))
+    with open(output, "a", encoding="utf-8") as f:
+        f.write('{"id": 2}\n{"id": 3}\n')
+    checkpoint.close()  # dies before complete_university("U1")
+
+    resumed = open_checkpoint(tmp_path, resume=True)
+    assert output.read_text(encoding="utf-8") == '{"id": 1}\n'
+    assert not resumed.is_university_done("U1")
+    resumed.close()
+
+
+def test_completed_append_is_kept(tmp_path):
+    output = tmp_path / "professors.jsonl"
+    checkpoint = open_checkpoint(tmp_path)
+    checkpoint.begin_output("U1", str(output))
+    output.write_text('{"id": 1}\n', encoding="utf-8")
+    checkpoint.complete_university("U1")
+    checkpoint.close()
+
+    open_checkpoint(tmp_path, resume=True).close()
+    assert output.read_text(encoding="utf-8") == '{"id": 1}\n'
@@ -0,0 +1,64 @@
+# tests/test_cshub_api.py
+# Replay of recorded API exchanges against the local stub server.
+import os
+
+import pytest
+
+import cshub_api
+from conftest import FIXTURES_DIR
+
+TEHRAN = "دانشگاه تهران"
+SHARIF = "دانشگاه صنعتی شریف"
+SHIRAZ = "دانشگاه شیراز"
+
+
+@pytest.fixture(scope="module")
+def exchanges():
+    return cshub_api.load_exchanges(os.path.join(FIXTURES_DIR, "cshub_api_two_universities.json"))
+
+
+@pytest.fixture(scope="module")
+def stub(exchanges):
+    server = cshub_api.serve_fixtures(exchanges, port=0)
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def replay(universities, exchanges, base_url):
+    return list(cshub_api.crawl_http(universities, exchanges, base_url=base_url, session_file=None))
+
+
+def test_each_university_gets_its_own_recording(exchanges, stub):
+    for uni, names in ((TEHRAN, {"علی رضایی", "مریم احمدی"}), (SHARIF, {"حسین کریمی"})):
+        results = replay([uni], exchanges, stub)
+        assert {card[0] for _, card in results} == names
+        assert {card_uni for card_uni, _ in results} == {uni}
+
+
+def test_get_and_post_are_both_replayed_once(exchanges, stub):
+    # One GET and one POST recording per university; the other
+    # university's recordings turn into the same two requests
+    results = replay([SHARIF], exchanges, stub)
+    assert len(results) == 2
+
+
+def test_unrecorded_university_gets_nothing(exchanges, stub):
+    assert replay([SHIRAZ], exchanges, stub) == []
+
+
+def test_stub_route_ignores_encoding_and_order():
+    plus = cshub_api.stub_route("get", "/api/p?university=a+b&page=1")
+    percent = cshub_api.stub_route("GET", "/api/p?page=1&university=a%20b")
+    assert plus == percent
+    assert (cshub_api.stub_route("POST", "/s", '{"u": "a", "page": 1}')
+            == cshub_api.stub_route("POST", "/s", '{"page": 1, "u": "a"}'))
+    assert cshub_api.stub_route("POST", "/s", '{"u": "a"}') != cshub_api.stub_route("POST", "/s", '{"u": "b"}')
+
+
+def test_menu_entries_are_not_professors():
+    payload = {
+        "menu": [{"title": "Home", "url": "/"}, {"name": "Search", "link": "/professor-search"}],
+        "items": [{"name": "Dr. A", "email": "a@example.com"}],
+    }
+    assert [card[0] for _, card in cshub_api.parse_api_payload(payload)] == ["Dr. A"]
@@ -0,0 +1,59 @@
+# tests/test_db_client.py
+# Pool statistics fed by pymongo's connection pool events.
+import os
+
+from pymongo import monitoring
+
+from db_client import MongoConnection, PoolStats, config_from_env
+
+ADDRESS = ("localhost", 27017)
+
+
+def pool_listeners(connection):
+    """The pool listeners pymongo dispatches to for this connection's client."""
+    return [listener for listener in connection.client.options.event_listeners
+            if isinstance(listener, monitoring.ConnectionPoolListener)]
+
+
+def test_pool_events_reach_the_counters():
+    # Nothing listens on port 1, and connect=False: no server needed
+    connection = MongoConnection(config_from_env({"MONGO_URI": "mongodb://127.0.0.1:1/",
+                                                  "MONGO_SERVER_SELECTION_TIMEOUT_MS": 100}))
+    listeners = pool_listeners(connection)
+    assert listeners == [connection.pool_stats]
+
+    for listener in listeners:
+        listener.connection_created(monitoring.ConnectionCreatedEvent(ADDRESS, 1))
+        listener.connection_checked_out(None)
+        listener.pool_cleared(monitoring.PoolClearedEvent(ADDRESS))
+        listener.pool_cleared(monitoring.PoolClearedEvent(ADDRESS))
+        listener.connection_checked_in(None)
+
+    report = connection.health()
+    assert report["status"] == "error"
+    assert report["pool"] == {"open": 1, "checked_out": 0, "peak_checked_out": 1, "created": 1,
+                              "closed": 0, "checkout_failures": 0, "pools_cleared": 2}
+    connection.close()
+
+
+def test_every_pool_event_has_a_handler():
+    stats = PoolStats()
+    for name in dir(monitoring.ConnectionPoolListener):
+        if not name.startswith("_"):
+            assert callable(getattr(stats, name)), name
+
+
+def test_config_from_env(monkeypatch):
+    monkeypatch.setenv("MONGO_MAX_POOL_SIZE", "7")
+    config = config_from_env({"MONGO_DATABASE": "other"})
+    assert config["MONGO_MAX_POOL_SIZE"] == 7
+    assert config["MONGO_DATABASE"] == "other"
+    assert config["MONGO_COLLECTION"] == "professors"
+
+
+def test_client_is_rebuilt_after_fork(monkeypatch):
+    connection = MongoConnection(config_from_env({"MONGO_URI": "mongodb://127.0.0.1:1/"}))
+    parent = connection.client
+    assert connection.client is parent
+    monkeypatch.setattr(os, "getpid", lambda: -1)
+    assert connection.client is not parent
@@ -0,0 +1,101 @@
+# tests/test_dedup.py
+# Identity resolution: exact keys, same-name links, fuzzy blocks and merging.
+import threading
+
+import crawl_output
+import dedup
+
+
+def groups_of(records, **kwargs):
+    groups, _ = dedup.resolve(records, **kwargs)
+    return sorted(sorted(group) for group in groups)
+
+
+def test_email_and_url_links():
+    records = [
+        {"name": "الف", "email": "A@ut.ac.ir"},
+        {"name": "ب", "email": "a@ut.ac.ir "},
+        {"name": "پ", "profile_url": "https://www.ut.ac.ir/~p/"},
+        {"name": "ت", "profile_url": "http://ut.ac.ir/~p"},
+    ]
+    assert groups_of(records) == [[0, 1], [2, 3]]
+
+
+def test_same_normalized_name_at_the_same_university():
+    records = [
+        {"name": "دکتر محمد‌علی کریمی", "university": "دانشگاه تهران"},
+        {"name": "محمدعلی كريمي", "university": "دانشگاه  تهران"},
+        {"name": "محمدعلی کریمی", "university": "دانشگاه شریف"},
+    ]
+    assert groups_of(records) == [[0, 1], [2]]
+
+
+def test_namesakes_with_different_emails_stay_apart():
+    records = [
+        {"name": "علی رضایی", "university": "U", "email": "a@u.ir"},
+        {"name": "علی رضایی", "university": "U", "email": "b@u.ir"},
+    ]
+    groups, stats = dedup.resolve(records)
+    assert len(groups) == 2
+    assert stats["namesakes_kept_apart"] == 1
+
+
+def test_same_name_links_past_an_incompatible_first_record():
+    records = [
+        {"name": "علی رضایی", "university": "U", "email": "a@u.ir", "profile_url": "u.ir/~w"},
+        {"name": "علی رضایی", "university": "U", "email": "b@u.ir"},
+        {"name": "علی رضایی", "university": "U", "profile_url": "u.ir/~v"},
+    ]
+    assert groups_of(records) == [[0], [1, 2]]
+
+
+def test_spelling_variants_meet_behind_a_common_first_name(monkeypatch):
+    monkeypatch.setattr(dedup, "MAX_BLOCK", 5)
+    records = [{"name": f"محمد {surname}", "university": "U"}
+               for surname in ("احمدی", "کاظمی", "حسینی", "نوری", "صادقی", "کرمانی", "رضایی")]
+    records.append({"name": "محمد رضائی", "university": "U"})
+    groups = groups_of(records)
+    assert [6, 7] in groups
+    assert len(groups) == 7
+
+
+def test_merge_records():
+    merged = dedup.merge_records([
+        {"id": 9, "name": "علی رضائی", "major": "هوش مصنوعی", "h_index": "12", "research_fields": ["a"],
+         "scraped_at": "2024-01-01 00:00:00"},
+        {"id": 3, "name": "علی رضایی", "major": "نرم افزار، هوش مصنوعی", "h_index": "20", "email": "a@u.ir",
+         "research_fields": ["b", "a"], "scraped_at": "2024-02-01 00:00:00"},
+        {"id": 5, "name": "علی رضایی", "h_index": "7"},
+    ])
+    assert merged["id"] == 3
+    assert merged["name"] == "علی رضایی"
+    assert merged["email"] == "a@u.ir"
+    assert merged["major"] == "نرم افزار, هوش مصنوعی"
+    assert merged["research_fields"] == ["b", "a"]
+    assert merged["h_index"] == "20"
+    assert merged["scraped_at"] == "2024-02-01 00:00:00"
+
+
+def test_dedup_records_sorted_by_id():
+    records = [{"id": 2, "name": "ب", "email": "x@u.ir"}, {"id": 1, "name": "الف"}, {"id": 3, "name": "ج", "email": "x@u.ir"}]
+    merged, stats = dedup.dedup_records(records)
+    assert [r["id"] for r in merged] == [1, 2]
+    assert stats["linked_email"] == 1
+
+
+def test_identity_key_order():
+    assert dedup.identity_key({"email": "A@u.ir", "profile_url": "x"}) == "email:a@u.ir"
+    assert dedup.identity_key({"profile_url": "https://www.u.ir/~a/"}) == "url:u.ir/~a"
+    assert dedup.identity_key({"name": "محمد علی", "university": "U"}) == dedup.name_key("محمدعلی", "U")
+
+
+def test_crawl_merge_keys_on_name_not_email():
+    professors, lock = {}, threading.Lock()
+    with_email = ("علی رضایی", "هوش مصنوعی", "12", "", "a@u.ir", ["x"])
+    without_email = ("علی  رضایی", "", "12", "", "", ["y"])
+    assert crawl_output.merge_professor(professors, lock, "U", "هوش مصنوعی", with_email)
+    assert crawl_output.merge_professor(professors, lock, "U", "", without_email) is None
+    (record,) = professors.values()
+    assert record["major_list"] == ["هوش مصنوعی"]
+    assert record["research_fields"] == ["x", "y"]
+    assert record["email"] == "a@u.ir"
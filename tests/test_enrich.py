@@ -0,0 +1,106 @@
+# tests/test_enrich.py
+# Profile fetching against a local stub server: 200 then 304, truncated,
+# stale and 404 pages, across two runs sharing one cache.
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+import enrich
+
+
+def page(title, interests=("Machine Learning",)):
+    items = "".join(f"<li>{interest}</li>" for interest in interests)
+    return (f"<html><head><title>{title}</title></head><body><h1>{title}</h1><p>Associate Professor</p>"
+            f"<h2>Research Interests</h2><ul>{items}</ul></body></html>")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    hits = {}
+    validators = {}
+
+    def do_GET(self):
+        n = self.hits[self.path] = self.hits.get(self.path, 0) + 1
+        self.validators.setdefault(self.path, []).append(self.headers.get("If-None-Match"))
+        if self.path == "/etag":
+            if self.headers.get("If-None-Match") == '"v1"':
+                return self.reply(304)
+            return self.reply(200, page("Etag Page"), etag='"v1"')
+        if self.path == "/big":
+            return self.reply(200, page("Big Page") + " " * (enrich.MAX_BODY_BYTES + 1), etag='"big"')
+        if self.path == "/flaky":
+            return self.reply(200, page("Flaky Page"), etag='"f1"') if n == 1 else self.reply(500)
+        if self.path == "/gone":
+            return self.reply(200, page("Gone Page"), etag='"g1"') if n == 1 else self.reply(404)
+        self.reply(404)
+
+    def reply(self, status, body="", etag=None):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+        if status != 304:
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def base_url():
+    StubHandler.hits, StubHandler.validators = {}, {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def run_once(source, output, cache_dir):
+    written, fetcher = asyncio.run(enrich.enrich(str(source), str(output), cache_dir=str(cache_dir)))
+    with open(output, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    return written, fetcher, {r["name"]: r["profile"] for r in records if "profile" in r}
+
+
+def test_two_runs_share_the_cache(base_url, tmp_path):
+    source = tmp_path / "professors.jsonl"
+    names = ["etag", "big", "flaky", "gone"]
+    records = [{"id": i, "name": name, "profile_url": f"{base_url}/{name}"} for i, name in enumerate(names, 1)]
+    records.append({"id": 5, "name": "no url", "profile_url": ""})
+    source.write_text("".join(json.dumps(r) + "\n" for r in records), encoding="utf-8")
+    cache_dir = tmp_path / "cache"
+
+    written, fetcher, first = run_once(source, tmp_path / "first.jsonl", cache_dir)
+    assert written == 5
+    assert {name: first[name]["status"] for name in names} == {
+        "etag": "fetched", "big": "truncated", "flaky": "fetched", "gone": "fetched"}
+    assert first["etag"]["title"] == "Etag Page"
+    assert first["etag"]["rank"] == "Associate Professor"
+    assert first["etag"]["research_interests"] == ["Machine Learning"]
+    assert first["big"]["title"] == "Big Page"  # parsed as far as it goes
+    assert "no url" not in first and fetcher.outcomes["no_url"] == 1
+
+    written, fetcher, second = run_once(source, tmp_path / "second.jsonl", cache_dir)
+    assert written == 5
+    assert second["etag"]["status"] == "not_modified"
+    assert second["etag"]["title"] == "Etag Page"
+    # A truncated body is never cached, so it is fetched again unconditionally
+    assert second["big"]["status"] == "truncated"
+    assert StubHandler.validators["/big"] == [None, None]
+    assert second["flaky"]["status"] == "stale"
+    assert second["flaky"]["title"] == "Flaky Page"
+    # A page that is gone is not resurrected from the cache
+    assert second["gone"]["status"] == "http_404"
+    assert "title" not in second["gone"]
+    assert StubHandler.validators["/etag"] == [None, '"v1"']
@@ -0,0 +1,55 @@
+# tests/test_facets.py
+# Facet postings, their intersection and the facets collection.
+import random
+
+import pytest
+
+from facets import FacetIndex, build_facets, intersect_sorted, write_facets
+
+mongomock = pytest.importorskip("mongomock")
+
+
+def test_intersect_sorted_matches_set_intersection():
+    rng = random.Random(7)
+    for _ in range(200):
+        lists = [sorted(rng.sample(range(300), rng.randint(0, 120))) for _ in range(rng.randint(1, 4))]
+        expected = sorted(set.intersection(*map(set, lists)))
+        assert intersect_sorted(lists) == expected
+
+
+def test_intersect_sorted_edge_cases():
+    assert intersect_sorted([]) == []
+    assert intersect_sorted([[1, 2, 3]]) == [1, 2, 3]
+    assert intersect_sorted([[1, 5, 9], []]) == []
+    assert intersect_sorted([[9], [1, 2, 3]]) == []
+
+
+def test_build_facets():
+    collection = mongomock.MongoClient().db.professors_staging
+    collection.insert_many([
+        {"id": 3, "university": "U1", "majors": ["M1", "M2"], "research_fields": ["ai", "ai", "nlp"]},
+        {"id": 1, "university": "U1", "majors": ["M1"], "research_fields": ["ai"]},
+        {"id": 2, "university": "", "majors": [], "research_fields": []},
+    ])
+    postings, counts = build_facets(collection)
+    assert postings == {"research_fields": {"ai": [1, 3], "nlp": [3]}}
+    assert counts == {"university": {"U1": 2}, "major": {"M1": 2, "M2": 1}}
+
+
+def test_write_and_load_facets():
+    db = mongomock.MongoClient().db
+    postings = {"research_fields": {"ai": [1, 3], "nlp": [3]}}
+    assert write_facets(db, postings, {"university": {"U1": 2}}) == 3
+    index = FacetIndex.load(db)
+    assert index.count("research_fields", "ai") == 2
+    assert index.count("university", "U1") == 2
+    assert index.match_all("research_fields", ["ai", "nlp"]) == [3]
+    assert index.match_all("research_fields", ["ai", "missing"]) == []
+
+
+def test_empty_import_clears_live_facets():
+    db = mongomock.MongoClient().db
+    write_facets(db, {"research_fields": {"ai": [1]}}, {"university": {"U1": 1}})
+    assert write_facets(db, {"research_fields": {}}, {"university": {}}) == 0
+    assert db.facets.count_documents({}) == 0
+    assert not FacetIndex.load(db)
@@ -0,0 +1,130 @@
+# tests/test_import_to_mongo.py
+# The staging-swap import against an in-memory MongoDB (mongomock).
+import json
+
+import pytest
+
+import import_to_mongo
+from db_schema import get_dataset_version
+
+mongomock = pytest.importorskip("mongomock")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = mongomock.MongoClient()
+    client.close = lambda: None  # one client shared by every import in a test
+    monkeypatch.setattr(import_to_mongo, "MongoClient", lambda *args, **kwargs: client)
+    return client
+
+
+def write_jsonl(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return str(path)
+
+
+def professor(i, **fields):
+    return dict({"id": i, "name": f"استاد {i}", "university": "دانشگاه تهران", "major": "هوش مصنوعی",
+                 "h_index": str(i), "profile_url": f"https://ut.ac.ir/~p{i}", "email": f"p{i}@ut.ac.ir",
+                 "research_fields": ["یادگیری ماشین"]}, **fields)
+
+
+def test_reimport_is_idempotent_and_swaps_staging_in(client, tmp_path):
+    path = write_jsonl(tmp_path / "professors.jsonl", [professor(i) for i in range(1, 6)])
+    for _ in range(2):
+        assert import_to_mongo.import_data_to_mongodb(path, "db", "professors", batch_size=2) == 5
+    db = client["db"]
+    assert db.professors.count_documents({}) == 5
+    assert "professors_staging" not in db.list_collection_names()
+
+
+def test_repeated_identity_keeps_the_last_record(client, tmp_path):
+    path = write_jsonl(tmp_path / "professors.jsonl",
+                       [professor(1), professor(2, email="P1@ut.ac.ir", name="استاد یک")])
+    import_to_mongo.import_data_to_mongodb(path, "db", "professors")
+    docs = list(client["db"].professors.find({}, {"_id": 0, "identity": 1, "name": 1}))
+    assert docs == [{"identity": "email:p1@ut.ac.ir", "name": "استاد یک"}]
+
+
+def test_identity_falls_back_to_url_then_name():
+    assert import_to_mongo.record_identity({"profile_url": "https://www.ut.ac.ir/~a/"}) == "url:ut.ac.ir/~a"
+    assert import_to_mongo.record_identity({"name": " a ", "university": "U"}) == "name:a|u"
+
+
+def test_csv_input(client, tmp_path):
+    path = tmp_path / "professors.csv"
+    path.write_text("﻿No.,Name,University,Major,H-Index,Profile URL,Email,Research Fields\n"
+                    '1,الف,دانشگاه تهران,نرم افزار,4,,a@ut.ac.ir,"x, y"\n', encoding="utf-8")
+    import_to_mongo.import_data_to_mongodb(str(path), "db", "professors")
+    doc = client["db"].professors.find_one({}, {"_id": 0})
+    assert doc["name"] == "الف" and doc["research_fields"] == ["x", "y"]
+
+
+def test_facets_follow_the_swap(client, tmp_path, monkeypatch):
+    db = client["db"]
+    path = write_jsonl(tmp_path / "professors.jsonl", [professor(1), professor(2, research_fields=["رباتیک"])])
+    import_to_mongo.import_data_to_mongodb(path, "db", "professors")
+    facets = {(d["facet"], d["value"]): d["count"] for d in db.facets.find()}
+    assert facets[("research_fields", "یادگیری ماشین")] == 1
+    assert facets[("research_fields", "رباتیک")] == 1
+    version = get_dataset_version(db)
+
+    # A failed swap leaves the live data and its facets on the previous import
+    def fail(self, *args, **kwargs):
+        raise RuntimeError("rename failed")
+    monkeypatch.setattr(mongomock.Collection, "rename", fail)
+    path = write_jsonl(tmp_path / "next.jsonl", [professor(3, research_fields=["شبکه"])])
+    with pytest.raises(RuntimeError):
+        import_to_mongo.import_data_to_mongodb(path, "db", "professors")
+    assert {d["value"] for d in db.facets.find({"facet": "research_fields"})} == {"یادگیری ماشین", "رباتیک"}
+    assert db.professors.count_documents({}) == 2
+    assert get_dataset_version(db) == version
+
+
+def test_duplicate_ids_fail_before_the_swap(client, tmp_path):
+    path = write_jsonl(tmp_path / "professors.jsonl", [professor(1)])
+    import_to_mongo.import_data_to_mongodb(path, "db", "professors")
+    path = write_jsonl(tmp_path / "dup.jsonl", [professor(1), professor(2, id=1)])
+    with pytest.raises(Exception):
+        import_to_mongo.import_data_to_mongodb(path, "db", "professors")
+    assert [d["id"] for d in client["db"].professors.find()] == [1]
+
+
+def read_changelog(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_delta_import_inserts_replaces_and_deletes(client, tmp_path):
+    changelog = str(tmp_path / "changes.jsonl")
+    first = write_jsonl(tmp_path / "first.jsonl", [professor(i) for i in range(1, 4)])
+    counts = import_to_mongo.import_delta_to_mongodb(first, "db", "professors", changelog_path=changelog)
+    assert counts["insert"] == 3
+    db = client["db"]
+    version = get_dataset_version(db)
+
+    second = write_jsonl(tmp_path / "second.jsonl", [professor(1), professor(2, h_index="40"), professor(4)])
+    counts = import_to_mongo.import_delta_to_mongodb(second, "db", "professors", batch_size=1, changelog_path=changelog)
+    assert (counts["insert"], counts["update"], counts["delete"], counts["unchanged"]) == (1, 1, 1, 1)
+    assert sorted(doc["id"] for doc in db.professors.find()) == [1, 2, 4]
+    assert db.professors.find_one({"id": 2})["h_index"] == 40
+    assert get_dataset_version(db) > version
+
+    changes = read_changelog(changelog)[3:]
+    assert sorted((c["op"], c["id"]) for c in changes) == [("delete", 3), ("insert", 4), ("update", 2)]
+    assert {c["version"] for c in changes} == {get_dataset_version(db)}
+    update = next(c for c in changes if c["op"] == "update")
+    assert update["previous_hash"] and update["previous_hash"] != update["content_hash"]
+
+
+def test_unchanged_delta_writes_nothing(client, tmp_path):
+    changelog = tmp_path / "changes.jsonl"
+    path = write_jsonl(tmp_path / "professors.jsonl", [professor(i) for i in range(1, 3)])
+    import_to_mongo.import_delta_to_mongodb(path, "db", "professors", changelog_path=str(changelog))
+    version = get_dataset_version(client["db"])
+    counts = import_to_mongo.import_delta_to_mongodb(path, "db", "professors", changelog_path=str(changelog))
+    assert counts["unchanged"] == 2 and not counts["insert"] + counts["update"] + counts["delete"]
+    assert get_dataset_version(client["db"]) == version
+    assert len(read_changelog(changelog)) == 2
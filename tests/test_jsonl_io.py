@@ -0,0 +1,61 @@
+# tests/test_jsonl_io.py
+# Tail-seek reads, atomic writes and streaming renumbering.
+import json
+import os
+
+import pytest
+
+from fix_ids import fix_ids
+from jsonl_io import atomic_write_json, iter_jsonl, iter_lines_reversed, read_last_id, read_last_record
+
+
+def write_lines(path, records, tail=""):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.write(tail)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 65536])
+def test_lines_reversed_across_chunk_boundaries(tmp_path, chunk_size):
+    path = tmp_path / "lines.txt"
+    path.write_bytes("اول\nsecond line\n\nthird".encode("utf-8"))
+    lines = [line.decode("utf-8") for line in iter_lines_reversed(str(path), chunk_size=chunk_size)]
+    assert lines == ["third", "", "second line", "اول"]
+
+
+def test_last_id_skips_torn_final_line(tmp_path):
+    path = tmp_path / "professors.jsonl"
+    write_lines(path, [{"id": i, "name": f"استاد {i}"} for i in range(1, 501)], tail='{"id": 501, "na')
+    assert read_last_id(str(path)) == 500
+    assert read_last_record(str(path))["name"] == "استاد 500"
+
+
+def test_last_id_of_missing_empty_and_idless_files(tmp_path):
+    assert read_last_id(str(tmp_path / "missing.jsonl")) == 0
+    (tmp_path / "empty.jsonl").write_text("\n\n", encoding="utf-8")
+    assert read_last_id(str(tmp_path / "empty.jsonl")) == 0
+    write_lines(tmp_path / "noid.jsonl", [{"name": "x"}])
+    assert read_last_id(str(tmp_path / "noid.jsonl")) == 0
+
+
+def test_iter_jsonl_skips_torn_line(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    write_lines(path, [{"id": 1}, {"id": 2}], tail='{"id": 3')
+    assert [r["id"] for r in iter_jsonl(str(path))] == [1, 2]
+
+
+def test_atomic_write_replaces_without_leftovers(tmp_path):
+    path = tmp_path / "state.json"
+    atomic_write_json(str(path), {"v": 1})
+    atomic_write_json(str(path), {"v": 2, "name": "دانشگاه"})
+    assert json.loads(path.read_text(encoding="utf-8")) == {"v": 2, "name": "دانشگاه"}
+    assert os.listdir(tmp_path) == ["state.json"]
+
+
+def test_fix_ids_renumbers_in_place(tmp_path):
+    path = tmp_path / "professors.jsonl"
+    write_lines(path, [{"id": 7, "name": "a"}, {"id": 7, "name": "b"}, {"id": 3, "name": "c"}], tail="\n")
+    assert fix_ids(str(path)) == 3
+    assert [(r["id"], r["name"]) for r in iter_jsonl(str(path))] == [(1, "a"), (2, "b"), (3, "c")]
+    assert os.listdir(tmp_path) == ["professors.jsonl"]
@@ -0,0 +1,101 @@
+# tests/test_memory_storage.py
+# The in-memory backend behind the app: keyset paging, ETag/304 and sort order.
+import json
+
+import pytest
+
+pytest.importorskip("flask")
+
+from app import create_app
+from storage import MemoryStorage, sort_value
+
+UNIVERSITIES = ["دانشگاه تهران", "دانشگاه شریف", "دانشگاه امیرکبیر"]
+
+
+def professor(i):
+    return {"id": i, "name": f"استاد {i}", "university": UNIVERSITIES[i % 3], "major": "نرم افزار",
+            "h_index": str(i % 5), "profile_url": f"https://u.ir/~p{i}", "email": f"p{i}@u.ir",
+            "research_fields": ["یادگیری ماشین"] if i % 2 else ["شبکه"],
+            "scraped_at": "2024-05-01 10:00:00"}
+
+
+@pytest.fixture
+def dataset_path(tmp_path):
+    path = tmp_path / "professors.jsonl"
+    path.write_text("".join(json.dumps(professor(i), ensure_ascii=False) + "\n" for i in range(1, 24)),
+                    encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def client(dataset_path):
+    return create_app({"STORAGE": "memory", "STORAGE_PATH": dataset_path}).test_client()
+
+
+def api_page(client, **params):
+    response = client.get("/api/professors", query_string=dict({"per_page": 5}, **params))
+    assert response.status_code == 200
+    return response.get_json()
+
+
+@pytest.mark.parametrize("sort_dir", ["asc", "desc"])
+def test_keyset_cursors_walk_every_row_once(client, sort_dir):
+    everything = [p["id"] for p in api_page(client, sort_by="h_index", sort_dir=sort_dir, per_page=100)["professors"]]
+
+    pages, cursor = [], ""
+    while True:
+        page = api_page(client, sort_by="h_index", sort_dir=sort_dir, after=cursor)
+        if not page["professors"]:
+            break
+        pages.append(page)
+        cursor = page["next_cursor"]
+    walked = [p["id"] for page in pages for p in page["professors"]]
+    assert len(walked) == 23 and len(set(walked)) == 23
+
+    expected = sorted(range(1, 24), key=lambda i: (i % 5, i))
+    assert walked == everything == (expected if sort_dir == "asc" else expected[::-1])
+
+    # Going back from the third page lands on the second
+    back = api_page(client, sort_by="h_index", sort_dir=sort_dir, before=pages[2]["prev_cursor"])
+    assert back["professors"] == pages[1]["professors"]
+
+
+def test_offset_pages_match_keyset_pages(client):
+    first = api_page(client, sort_by="name")
+    second = api_page(client, sort_by="name", page=2)
+    assert api_page(client, sort_by="name", after=first["next_cursor"])["professors"] == second["professors"]
+
+
+def test_listing_etag_and_304(client):
+    response = client.get("/", query_string={"sort_by": "name"})
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    again = client.get("/", query_string={"sort_by": "name"}, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+
+    other = client.get("/", query_string={"sort_by": "h_index"}, headers={"If-None-Match": etag})
+    assert other.status_code == 200 and other.headers["ETag"] != etag
+
+
+def test_filters_and_search(client):
+    page = api_page(client, fields="شبکه", per_page=100)
+    assert page["total_count"] == 11
+    assert all(p["research_fields"] == ["شبکه"] for p in page["professors"])
+    assert api_page(client, search="استاد 7", sort_by="relevance")["professors"][0]["id"] == 7
+
+
+def test_sort_value_orders_missing_numbers_then_strings():
+    values = ["b", 3, None, "a", 1.5]
+    assert sorted(values, key=sort_value) == [None, 1.5, 3, "a", "b"]
+
+
+def test_reload_keeps_the_last_good_dataset(dataset_path):
+    storage = MemoryStorage(dataset_path)
+    version = storage.version
+    with open(dataset_path, "w", encoding="utf-8"):
+        pass  # truncated mid-write
+    assert storage.reload() is False
+    assert storage.version == version and len(storage.dataset) == 23
+    assert storage.health()["last_reload_error"]
@@ -0,0 +1,39 @@
+# tests/test_search_text.py
+# Persian normalization shared by the importer and the query side.
+from search_text import build_search_fields, normalize_text, prefixes, text_search_query, tokenize
+
+
+def test_arabic_letters_fold_to_persian():
+    # Arabic yeh / kaf / teh marbuta vs. their Persian forms
+    assert normalize_text("علي") == normalize_text("علی")
+    assert normalize_text("كامپيوتر") == normalize_text("کامپیوتر")
+    assert normalize_text("مدرسة") == "مدرسه"
+
+
+def test_zwnj_diacritics_and_tatweel_are_dropped():
+    assert normalize_text("می‌خواهم") == normalize_text("میخواهم")
+    assert normalize_text("عَلِی") == "علی"
+    assert normalize_text("علـــی") == "علی"
+
+
+def test_digits_and_case():
+    assert normalize_text("۱۲۳ ١٢٣") == "123 123"
+    assert normalize_text("Machine LEARNING") == "machine learning"
+
+
+def test_tokenize_splits_on_punctuation():
+    assert tokenize("هوش مصنوعی، یادگیری-ماشین (AI)") == ["هوش", "مصنوعی", "یادگیری", "ماشین", "ai"]
+    assert tokenize(None) == []
+
+
+def test_query_quotes_every_token():
+    assert text_search_query("Deep  learning") == '"deep" "learning"'
+
+
+def test_prefixes_and_search_fields():
+    assert prefixes(["شبکه"]) == ["شب", "شبک"]
+    fields = build_search_fields({"name": "علي رضايي", "university": "دانشگاه تهران",
+                                  "major": ["هوش مصنوعی"], "research_fields": ["بینایی ماشین"]})
+    assert fields["name"] == "علی رضایی"
+    assert fields["major"] == "هوش مصنوعی"
+    assert "رض" in fields["prefixes"].split()
@@ -0,0 +1,68 @@
+# tests/test_snapshot.py
+# Building a columnar snapshot and reading it back through the mmap views.
+import json
+
+import pytest
+
+import import_to_mongo
+import snapshot
+
+RECORDS = [
+    {"id": 1, "name": "علی رضایی", "university": "دانشگاه تهران", "major": "هوش مصنوعی، نرم افزار",
+     "h_index": "12", "profile_url": "https://ut.ac.ir/~a", "email": "a@ut.ac.ir",
+     "research_fields": ["یادگیری ماشین", "بینایی"], "scraped_at": "2024-05-01 10:00:00"},
+    {"id": 2, "name": "مریم احمدی", "university": "دانشگاه شریف", "major": "نرم افزار",
+     "h_index": "", "profile_url": "", "email": "", "research_fields": [], "scraped_at": "2024-05-02 11:30:00"},
+    {"id": 3, "name": "رضا کریمی", "university": "دانشگاه تهران", "major": "",
+     "h_index": 7, "profile_url": "", "email": "", "research_fields": ["بینایی"], "scraped_at": "2024-05-03 09:15:00"},
+]
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    source = tmp_path / "professors.jsonl"
+    source.write_text("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in RECORDS), encoding="utf-8")
+    path = str(tmp_path / "professors.snapshot")
+    assert snapshot.build_snapshot(str(source), path) == len(RECORDS)
+    return path
+
+
+def test_columns_round_trip(snapshot_path):
+    with snapshot.Snapshot.open(snapshot_path) as snap:
+        assert len(snap) == 3
+        assert list(snap["id"]) == [1, 2, 3]
+        assert list(snap["h_index"]) == [12, 0, 7]
+        assert list(snap["university"]) == ["دانشگاه تهران", "دانشگاه شریف", "دانشگاه تهران"]
+        assert snap["majors"][0] == ["هوش مصنوعی", "نرم افزار"]
+        assert snap["majors"][2] == []
+        assert snap["research_fields"][1] == []
+        assert snap["email"][1] == "" and snap["profile_url"][2] == ""
+
+        record = snap.record(0)
+        assert record["name"] == "علی رضایی"
+        assert record["major"] == "هوش مصنوعی, نرم افزار"
+        assert record["research_fields"] == ["یادگیری ماشین", "بینایی"]
+        assert record["scraped_at"] == "2024-05-01 10:00:00"
+
+
+def test_snapshot_records_match_the_jsonl_import(snapshot_path, tmp_path):
+    source = tmp_path / "professors.jsonl"
+    expected = [import_to_mongo.normalize_record(r) for r in import_to_mongo.iter_records(str(source))]
+    actual = [import_to_mongo.normalize_record(r) for r in snapshot.iter_records(snapshot_path)]
+    assert actual == expected
+
+
+def test_open_rejects_other_files(tmp_path):
+    path = tmp_path / "not.snapshot"
+    path.write_bytes(b"{}\n" * 8)
+    with pytest.raises(ValueError):
+        snapshot.Snapshot.open(str(path))
+
+
+def test_export_csv(snapshot_path, tmp_path):
+    out = tmp_path / "professors.csv"
+    with snapshot.Snapshot.open(snapshot_path) as snap:
+        assert snapshot.export_csv(snap, str(out)) == 3
+    lines = out.read_text(encoding="utf-8-sig").splitlines()
+    assert lines[0] == "No.,Name,University,Major,H-Index,Profile URL,Email,Research Fields"
+    assert lines[1].startswith('1,علی رضایی,دانشگاه تهران,"هوش مصنوعی, نرم افزار",12,')
@@ -0,0 +1,132 @@
+# tests/test_work_queue.py
+# The SQLite work queue under several worker processes, with lease expiry.
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+import work_queue
+from work_queue import SqliteWorkQueue
+
+MAJORS = ["هوش مصنوعی", "نرم افزار", "شبکه", "سخت افزار"]
+
+
+def fake_cards(uni, major):
+    # The first professor teaches in every major, so export has something to merge
+    return [("استاد مشترک", major, "10", "", "", [major]),
+            (f"استاد {major}", "", "3", "", "", []),
+            ("", "", "", "", "", [])]
+
+
+def run_fake_worker(path, lease_seconds, completions):
+    """A worker without a browser: lists majors or returns fake_cards()."""
+    queue = SqliteWorkQueue(path)
+    worker = work_queue.worker_name()
+    while True:
+        task = queue.claim(worker, lease_seconds)
+        if task is None:
+            if not queue.remaining():
+                break
+            time.sleep(0.05)
+            continue
+        time.sleep(0.01)  # let the other workers interleave
+        majors = () if task["major"] else MAJORS
+        cards = fake_cards(task["university"], task["major"]) if task["major"] else ()
+        if queue.complete(task, worker, cards, majors):
+            completions.put((task["id"], worker))
+    queue.close()
+
+
+def crash_holding_a_lease(path, lease_seconds, claimed):
+    queue = SqliteWorkQueue(path)
+    task = queue.claim(work_queue.worker_name(), lease_seconds)
+    claimed.put(task["id"])
+    claimed.close()
+    claimed.join_thread()
+    os._exit(1)  # no complete(), no fail(): the lease just runs out
+
+
+@pytest.fixture
+def queue_path(tmp_path):
+    path = str(tmp_path / "queue.sqlite3")
+    queue = SqliteWorkQueue(path)
+    queue.seed(["دانشگاه تهران", "دانشگاه شریف"])
+    queue.close()
+    return path
+
+
+def test_expired_lease_is_leased_again(queue_path):
+    queue = SqliteWorkQueue(queue_path)
+    first = queue.claim("a", lease_seconds=0.05)
+    assert queue.claim("b", lease_seconds=60)["id"] != first["id"]
+    time.sleep(0.1)
+    again = queue.claim("c", lease_seconds=60)
+    assert again["id"] == first["id"] and again["attempts"] == 2
+    assert not queue.heartbeat(first, "a")
+    assert not queue.complete(first, "a", majors=MAJORS)
+    assert queue.complete(again, "c", majors=MAJORS)
+    queue.close()
+
+
+def test_lease_expiring_on_the_last_attempt_fails_the_task(queue_path):
+    queue = SqliteWorkQueue(queue_path, max_attempts=2)
+    for _ in range(2):
+        task = queue.claim("a", lease_seconds=0.01, prefer="دانشگاه تهران")
+        time.sleep(0.05)
+    assert queue.claim("b", prefer="دانشگاه تهران")["university"] == "دانشگاه شریف"
+    states = {t["university"]: (t["state"], t["error"]) for t in queue.tasks()}
+    assert states["دانشگاه تهران"] == ("failed", "lease expired")
+    assert task["attempts"] == 2
+    queue.close()
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_worker_processes_complete_every_task_once(queue_path, tmp_path):
+    ctx = multiprocessing.get_context("fork")
+    claimed, completions = ctx.Queue(), ctx.Queue()
+
+    crasher = ctx.Process(target=crash_holding_a_lease, args=(queue_path, 0.5, claimed))
+    crasher.start()
+    crasher.join(10)
+    abandoned = claimed.get(timeout=5)
+
+    workers = [ctx.Process(target=run_fake_worker, args=(queue_path, 5, completions)) for _ in range(3)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join(60)
+        assert process.exitcode == 0
+
+    done = []
+    while len(done) < 2 + 2 * len(MAJORS):
+        done.append(completions.get(timeout=5))
+    assert completions.empty()
+    assert len({task_id for task_id, _ in done}) == len(done)
+
+    queue = SqliteWorkQueue(queue_path)
+    tasks = {t["id"]: t for t in queue.tasks()}
+    assert len(tasks) == len(done)
+    assert all(t["state"] == "done" for t in tasks.values())
+    assert tasks[abandoned]["attempts"] == 2
+    assert tasks[abandoned]["finished_by"] != f"{socket.gethostname()}:{crasher.pid}"
+    assert all(t["attempts"] == 1 for task_id, t in tasks.items() if task_id != abandoned)
+
+    out = tmp_path / "professors.jsonl"
+    assert work_queue.export(queue, str(out)) == 2 * (1 + len(MAJORS))
+    queue.close()
+    records = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    assert [r["id"] for r in records] == list(range(1, len(records) + 1))
+    shared = [r for r in records if r["name"] == "استاد مشترک"]
+    assert [r["major"] for r in shared] == [", ".join(MAJORS)] * 2
+
+
+def test_export_does_not_need_playwright(queue_path, tmp_path):
+    code = ("import sys, work_queue\n"
+            f"work_queue.export(work_queue.SqliteWorkQueue({queue_path!r}), {str(tmp_path / 'out.jsonl')!r})\n"
+            "assert 'playwright' not in sys.modules, 'playwright was imported'\n")
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=os.path.dirname(work_queue.__file__))
@@ -0,0 +1,668 @@
+# work_queue.py
+# Persistent, leased (university, major-group) work queue, so one crawl can
+# be spread over several processes and machines.
+#
+# Tasks:
+#   (uni, "")     list the university's major groups and enqueue one task
+#                 per major (seeded from the university list)
+#   (uni, major)  expand that major and parse its cards
+#
+# A worker claims a task under a lease and renews it from a heartbeat
+# thread while it works. If the lease runs out (the worker died, hung or
+# lost the network) the task is claimable again; after max_attempts claims
+# it is marked failed instead. Workers prefer tasks of the university whose
+# search results they already have open, so a major costs one panel click
+# rather than a fresh search.
+#
+# Cards are written to a results sink keyed by (task, position): completing
+# a task replaces its rows, so retried or duplicated tasks never duplicate
+# professors, and only the worker that holds the lease can complete it.
+# `export` merges the sink into professors.jsonl exactly like a scraper run.
+#
+# Backends: a SQLite file (any number of processes on one machine) or
+# MongoDB (several machines; pass a mongodb:// URL as --queue).
+#
+#   python work_queue.py seed "دانشگاه تهران" "دانشگاه صنعتی شریف"
+#   python work_queue.py work --workers 4             # on each machine
+#   python work_queue.py status --watch 30
+#   python work_queue.py export -o professors.jsonl
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import statistics
+import threading
+import time
+from collections import Counter
+
+import browser_profile
+import crawl_output
+import telemetry
+
+QUEUE_DB = "crawl_queue.sqlite3"
+LEASE_SECONDS = 120
+MAX_ATTEMPTS = 3
+POLL_SECONDS = 2.0
+THROUGHPUT_WINDOW = 600 # seconds of history behind the "recent" rate
+STRAGGLER_FACTOR = 3.0 # leased tasks running this many medians are reported
+
+STATES = ("pending", "leased", "done", "failed")
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def card_rows(uni, cards):
+    """(position, identity, card) for every named card, identity as crawl_output.professor_key()."""
+    return [(position, crawl_output.professor_key(uni, card), list(card))
+            for position, card in enumerate(cards) if card[0] and card[0].strip()]
+
+
+def open_queue(url=QUEUE_DB, max_attempts=MAX_ATTEMPTS):
+    """A SqliteWorkQueue for a file path, a MongoWorkQueue for a mongodb:// URL."""
+    if url.startswith(("mongodb://", "mongodb+srv://")):
+        return MongoWorkQueue(url, max_attempts)
+    return SqliteWorkQueue(url, max_attempts)
+
+
+# -------------------------------------------
+# SQLite backend
+# -------------------------------------------
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    university TEXT NOT NULL,
+    major TEXT NOT NULL,
+    uni_order INTEGER NOT NULL,
+    major_order INTEGER NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    started_at REAL,
+    finished_at REAL,
+    finished_by TEXT,
+    cards INTEGER,
+    error TEXT,
+    UNIQUE (university, major)
+);
+CREATE INDEX IF NOT EXISTS tasks_claim ON tasks (state, uni_order, major_order);
+CREATE TABLE IF NOT EXISTS results (
+    task_id INTEGER NOT NULL REFERENCES tasks (id),
+    position INTEGER NOT NULL,
+    identity TEXT NOT NULL,
+    card TEXT NOT NULL,
+    PRIMARY KEY (task_id, position)
+);
+"""
+
+
+class SqliteWorkQueue:
+    """
+    Queue and results sink in one SQLite file. Every state change runs in
+    a BEGIN IMMEDIATE transaction, so concurrent processes serialize on the
+    database lock and a claim can never hand one task to two workers.
+    """
+
+    def __init__(self, path=QUEUE_DB, max_attempts=MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        # Shared with the heartbeat thread, under _lock
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def seed(self, universities):
+        """Add a listing task per university not queued yet; returns how many were added."""
+        with self._transaction() as db:
+            base = db.execute("SELECT COALESCE(MAX(uni_order) + 1, 0) FROM tasks").fetchone()[0]
+            added = 0
+            for i, uni in enumerate(universities):
+                cur = db.execute("INSERT OR IGNORE INTO tasks (university, major, uni_order, major_order) "
+                                 "VALUES (?, '', ?, -1)", (uni, base + i))
+                added += cur.rowcount
+            return added
+
+    def reset(self):
+        with self._transaction() as db:
+            db.execute("DELETE FROM results")
+            db.execute("DELETE FROM tasks")
+
+    def claim(self, worker, lease_seconds=LEASE_SECONDS, prefer=None):
+        """Lease the next claimable task (pending or lease expired) to worker; None if there is none."""
+        now = time.time()
+        with self._transaction() as db:
+            db.execute("UPDATE tasks SET state = 'failed', lease_owner = NULL, error = 'lease expired' "
+                       "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?", (now, self.max_attempts))
+            row = db.execute("SELECT id, university, major, attempts FROM tasks "
+                             "WHERE state = 'pending' OR (state = 'leased' AND lease_expires < ?) "
+                             "ORDER BY university = ? DESC, uni_order, major_order LIMIT 1", (now, prefer)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE tasks SET state = 'leased', lease_owner = ?, lease_expires = ?, started_at = ?, "
+                       "attempts = attempts + 1, error = NULL WHERE id = ?",
+                       (worker, now + lease_seconds, now, row["id"]))
+            return {"id": row["id"], "university": row["university"], "major": row["major"],
+                    "attempts": row["attempts"] + 1}
+
+    def heartbeat(self, task, worker, lease_seconds=LEASE_SECONDS):
+        """Extend worker's lease on task; False if the lease was lost to another worker."""
+        with self._transaction() as db:
+            cur = db.execute("UPDATE tasks SET lease_expires = ? WHERE id = ? AND state = 'leased' AND lease_owner = ?",
+                             (time.time() + lease_seconds, task["id"], worker))
+            return cur.rowcount == 1
+
+    def complete(self, task, worker, cards=(), majors=()):
+        """
+        Store task's cards (replacing any earlier rows) and the major tasks
+        it discovered, and mark it done - all or nothing. False, with nothing
+        written, if worker no longer holds the lease.
+        """
+        rows = card_rows(task["university"], cards)
+        now = time.time()
+        with self._transaction() as db:
+            cur = db.execute("UPDATE tasks SET state = 'done', lease_owner = NULL, lease_expires = NULL, "
+                             "finished_at = ?, finished_by = ?, cards = ? "
+                             "WHERE id = ? AND state = 'leased' AND lease_owner = ?",
+                             (now, worker, len(rows), task["id"], worker))
+            if cur.rowcount != 1:
+                return False
+            db.execute("DELETE FROM results WHERE task_id = ?", (task["id"],))
+            db.executemany("INSERT INTO results (task_id, position, identity, card) VALUES (?, ?, ?, ?)",
+                           [(task["id"], position, identity, json.dumps(card, ensure_ascii=False))
+                            for position, identity, card in rows])
+            if majors:
+                uni_order = db.execute("SELECT uni_order FROM tasks WHERE id = ?", (task["id"],)).fetchone()[0]
+                db.executemany("INSERT OR IGNORE INTO tasks (university, major, uni_order, major_order) "
+                               "VALUES (?, ?, ?, ?)",
+                               [(task["university"], major, uni_order, i) for i, major in enumerate(majors)])
+            return True
+
+    def fail(self, task, worker, error):
+        """Give task back (or mark it failed after max_attempts claims)."""
+        with self._transaction() as db:
+            db.execute("UPDATE tasks SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                       "lease_owner = NULL, lease_expires = NULL, error = ? "
+                       "WHERE id = ? AND state = 'leased' AND lease_owner = ?",
+                       (self.max_attempts, error, task["id"], worker))
+
+    def retry_failed(self):
+        with self._transaction() as db:
+            return db.execute("UPDATE tasks SET state = 'pending', attempts = 0, error = NULL "
+                              "WHERE state = 'failed'").rowcount
+
+    def remaining(self):
+        """Tasks not finished yet (pending or leased)."""
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM tasks WHERE state IN ('pending', 'leased')").fetchone()[0]
+
+    def tasks(self):
+        with self._lock:
+            return [dict(row) for row in self._db.execute("SELECT * FROM tasks ORDER BY uni_order, major_order")]
+
+    def iter_results(self):
+        """(university, major, card) of every stored card, in crawl order."""
+        with self._lock:
+            rows = self._db.execute("SELECT t.university, t.major, r.card FROM results r JOIN tasks t ON t.id = r.task_id "
+                                    "WHERE t.state = 'done' ORDER BY t.uni_order, t.major_order, r.position").fetchall()
+        for row in rows:
+            yield row["university"], row["major"], json.loads(row["card"])
+
+    def close(self):
+        self._db.close()
+
+
+# -------------------------------------------
+# MongoDB backend
+# -------------------------------------------
+class MongoWorkQueue:
+    """
+    Queue and results sink in MongoDB (database from the URL path, default
+    crawl_queue), for workers on several machines. Claims are single
+    find_one_and_update calls, so they are atomic per task.
+
+    Without multi-document transactions, complete() writes the cards before
+    flipping the task to done; if the lease is lost in between, the rows it
+    wrote are replaced by whoever completes the task.
+    """
+
+    def __init__(self, url, max_attempts=MAX_ATTEMPTS):
+        from pymongo import ASCENDING, MongoClient, ReturnDocument
+
+        self.url = url
+        self.max_attempts = max_attempts
+        self._after = ReturnDocument.AFTER
+        self._client = MongoClient(url)
+        db = self._client.get_default_database(default="crawl_queue")
+        self._tasks = db["tasks"]
+        self._results = db["results"]
+        self._tasks.create_index([("university", ASCENDING), ("major", ASCENDING)], unique=True)
+        self._tasks.create_index([("state", ASCENDING), ("uni_order", ASCENDING), ("major_order", ASCENDING)])
+        self._results.create_index([("task_id", ASCENDING), ("position", ASCENDING)], unique=True)
+
+    @staticmethod
+    def _new_task(uni, major, uni_order, major_order):
+        return {"university": uni, "major": major, "uni_order": uni_order, "major_order": major_order,
+                "state": "pending", "attempts": 0, "lease_owner": None, "lease_expires": None,
+                "started_at": None, "finished_at": None, "finished_by": None, "cards": None, "error": None}
+
+    def _upsert_task(self, uni, major, uni_order, major_order):
+        result = self._tasks.update_one({"university": uni, "major": major},
+                                        {"$setOnInsert": self._new_task(uni, major, uni_order, major_order)},
+                                        upsert=True)
+        return 1 if result.upserted_id is not None else 0
+
+    def seed(self, universities):
+        last = self._tasks.find_one({}, {"uni_order": 1}, sort=[("uni_order", -1)])
+        base = last["uni_order"] + 1 if last else 0
+        return sum(self._upsert_task(uni, "", base + i, -1) for i, uni in enumerate(universities))
+
+    def reset(self):
+        self._results.delete_many({})
+        self._tasks.delete_many({})
+
+    def claim(self, worker, lease_seconds=LEASE_SECONDS, prefer=None):
+        now = time.time()
+        self._tasks.update_many(
+            {"state": "leased", "lease_expires": {"$lt": now}, "attempts": {"$gte": self.max_attempts}},
+            {"$set": {"state": "failed", "lease_owner": None, "error": "lease expired"}})
+        claimable = {"$or": [{"state": "pending"}, {"state": "leased", "lease_expires": {"$lt": now}}]}
+        update = {"$set": {"state": "leased", "lease_owner": worker, "lease_expires": now + lease_seconds,
+                           "started_at": now, "error": None},
+                  "$inc": {"attempts": 1}}
+        queries = [{**claimable, "university": prefer}] if prefer is not None else []
+        for query in queries + [claimable]:
+            doc = self._tasks.find_one_and_update(query, update, sort=[("uni_order", 1), ("major_order", 1)],
+                                                  return_document=self._after)
+            if doc is not None:
+                return {"id": doc["_id"], "university": doc["university"], "major": doc["major"],
+                        "attempts": doc["attempts"]}
+        return None
+
+    def _owned(self, task, worker):
+        return {"_id": task["id"], "state": "leased", "lease_owner": worker}
+
+    def heartbeat(self, task, worker, lease_seconds=LEASE_SECONDS):
+        result = self._tasks.update_one(self._owned(task, worker),
+                                        {"$set": {"lease_expires": time.time() + lease_seconds}})
+        return result.matched_count == 1
+
+    def complete(self, task, worker, cards=(), majors=()):
+        doc = self._tasks.find_one(self._owned(task, worker), {"uni_order": 1})
+        if doc is None:
+            return False
+        rows = card_rows(task["university"], cards)
+        self._results.delete_many({"task_id": task["id"]})
+        if rows:
+            self._results.insert_many([{"task_id": task["id"], "position": position, "identity": identity, "card": card}
+                                       for position, identity, card in rows])
+        for i, major in enumerate(majors):
+            self._upsert_task(task["university"], major, doc["uni_order"], i)
+        result = self._tasks.update_one(self._owned(task, worker), {"$set": {
+            "state": "done", "lease_owner": None, "lease_expires": None,
+            "finished_at": time.time(), "finished_by": worker, "cards": len(rows)}})
+        return result.matched_count == 1
+
+    def fail(self, task, worker, error):
+        doc = self._tasks.find_one(self._owned(task, worker), {"attempts": 1})
+        if doc is None:
+            return
+        state = "failed" if doc["attempts"] >= self.max_attempts else "pending"
+        self._tasks.update_one(self._owned(task, worker), {"$set": {
+            "state": state, "lease_owner": None, "lease_expires": None, "error": error}})
+
+    def retry_failed(self):
+        return self._tasks.update_many({"state": "failed"},
+                                       {"$set": {"state": "pending", "attempts": 0, "error": None}}).modified_count
+
+    def remaining(self):
+        return self._tasks.count_documents({"state": {"$in": ["pending", "leased"]}})
+
+    def tasks(self):
+        tasks = []
+        for doc in self._tasks.find({}, sort=[("uni_order", 1), ("major_order", 1)]):
+            doc["id"] = doc.pop("_id")
+            tasks.append(doc)
+        return tasks
+
+    def iter_results(self):
+        for task in self._tasks.find({"state": "done"}, {"university": 1, "major": 1},
+                                     sort=[("uni_order", 1), ("major_order", 1)]):
+            for row in self._results.find({"task_id": task["_id"]}, sort=[("position", 1)]):
+                yield task["university"], task["major"], row["card"]
+
+    def close(self):
+        self._client.close()
+
+
+# -------------------------------------------
+# Worker
+# -------------------------------------------
+class Heartbeat:
+    """
+    Renews a task's lease every lease_seconds / 3 from a background thread
+    while the task runs. lost is set if another worker took the task over.
+    """
+
+    def __init__(self, queue, task, worker, lease_seconds=LEASE_SECONDS):
+        self.queue = queue
+        self.task = task
+        self.worker = worker
+        self.lease_seconds = lease_seconds
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.lease_seconds / 3):
+            try:
+                if not self.queue.heartbeat(self.task, self.worker, self.lease_seconds):
+                    self.lost = True
+                    print(f"  → [{self.worker}] Lease lost on {self.task['university']} / {self.task['major']}")
+                    return
+            except Exception as e:
+                # A missed beat is not fatal; the lease has slack for two more
+                print(f"  → [{self.worker}] Heartbeat failed: {e}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_task(scraper, page, task, current):
+    """
+    Run one task on page, whose search currently shows `current`'s results.
+    Returns (majors, cards); raises if the page did not give an answer.
+    """
+    uni, major = task["university"], task["major"]
+    if not major or current != uni:
+        scraper.open_advanced_search(page)
+        scraper.submit_search(page, uni)
+        majors = scraper.list_majors(page, uni)
+        if majors is None:
+            raise RuntimeError("no search results")
+        if not major:
+            return majors, ()
+    cards = scraper.scrape_major(page, uni, major)
+    if cards is None:
+        raise RuntimeError("major panel could not be opened")
+    return (), cards
+
+
+def run_worker(queue_url=QUEUE_DB, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS, headless=True,
+               cdp_url=None, search_url=None, max_tasks=None):
+    """
+    Claim and run tasks until the queue has nothing left (or max_tasks are
+    done). Each worker process has its own browser context; with cdp_url it
+    attaches to that browser instead of launching one.
+    """
+    import scraper
+    from playwright.sync_api import sync_playwright
+
+    if search_url:
+        scraper.SEARCH_URL = search_url
+    worker = worker_name()
+    queue = open_queue(queue_url, max_attempts)
+    done = 0
+
+    with sync_playwright() as p:
+        if cdp_url:
+            browser = p.chromium.connect_over_cdp(cdp_url)
+        else:
+            browser = p.chromium.launch(**browser_profile.launch_options(headless))
+        context = browser.new_context(storage_state=scraper.SESSION_FILE)
+        scraper.RESOURCE_BLOCKER.apply(context)
+        page = context.new_page()
+        scraper.TRANSFER_STATS.attach(page)
+
+        current = None # university whose search results are on the page
+        while max_tasks is None or done < max_tasks:
+            task = queue.claim(worker, lease_seconds, prefer=current)
+            if task is None:
+                if not queue.remaining():
+                    break
+                # Others still hold leases; wait in case one of them expires
+                time.sleep(POLL_SECONDS)
+                continue
+
+            uni, major = task["university"], task["major"]
+            print(f"\n=== [{worker}] {uni} / {major or '(list majors)'} (attempt {task['attempts']}) ===")
+            with Heartbeat(queue, task, worker, lease_seconds):
+                try:
+                    with telemetry.bind(university=uni), telemetry.span("queue_task", kind="major" if major else "list"):
+                        majors, cards = run_task(scraper, page, task, current)
+                except Exception as e:
+                    current = None
+                    print(f"  → [{worker}] Task failed: {e}")
+                    queue.fail(task, worker, str(e))
+                    continue
+            current = uni
+            if queue.complete(task, worker, cards, majors):
+                done += 1
+                if majors:
+                    print(f"  → Queued {len(majors)} major groups of {uni}")
+            else:
+                print(f"  → [{worker}] Lease on {uni} / {major} was taken over; result dropped")
+
+        context.close()
+        if not cdp_url:
+            browser.close()
+
+    print(f"=== [{worker}] Finished: {done} tasks ===")
+    scraper.TRANSFER_STATS.report(scraper.RESOURCE_BLOCKER)
+    queue.close()
+    return done
+
+
+def run_workers(count, **options):
+    """Run count worker processes on this machine and wait for them."""
+    if count == 1:
+        return run_worker(**options)
+    processes = [multiprocessing.Process(target=run_worker, kwargs=options) for _ in range(count)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+# -------------------------------------------
+# Coordinator: throughput and stragglers
+# -------------------------------------------
+def task_label(task):
+    return f"{task['university']} / {task['major'] or '(list majors)'}"
+
+
+def find_stragglers(tasks, now=None, factor=STRAGGLER_FACTOR):
+    """
+    (task, reason) for leased tasks whose lease ran out, that have run
+    longer than factor x the median of finished tasks of the same kind, or
+    that are on a retry. Slowest first.
+    """
+    now = now or time.time()
+    medians = {}
+    for listing in (True, False):
+        durations = [t["finished_at"] - t["started_at"] for t in tasks
+                     if t["state"] == "done" and (not t["major"]) == listing]
+        if len(durations) >= 3:
+            medians[listing] = statistics.median(durations)
+
+    stragglers = []
+    for t in tasks:
+        if t["state"] != "leased":
+            continue
+        running = now - t["started_at"]
+        median = medians.get(not t["major"])
+        if t["lease_expires"] < now:
+            reason = f"lease expired {now - t['lease_expires']:.0f}s ago, claimable again"
+        elif median and running > factor * median:
+            reason = f"running {running:.0f}s, {running / median:.1f}x the median {median:.0f}s"
+        elif t["attempts"] > 1:
+            reason = f"attempt {t['attempts']}, running {running:.0f}s"
+        else:
+            continue
+        stragglers.append((running, t, f"{reason} ({t['lease_owner']})"))
+    stragglers.sort(key=lambda item: -item[0])
+    return [(t, reason) for _, t, reason in stragglers]
+
+
+def report(queue, window=THROUGHPUT_WINDOW, factor=STRAGGLER_FACTOR):
+    now = time.time()
+    tasks = queue.tasks()
+    states = Counter(t["state"] for t in tasks)
+    print(f"=== {len(tasks)} tasks: " + ", ".join(f"{states[s]} {s}" for s in STATES) + " ===")
+
+    universities = {t["university"] for t in tasks}
+    listed = {t["university"] for t in tasks if not t["major"] and t["state"] == "done"}
+    print(f"  → Major groups listed for {len(listed)}/{len(universities)} universities")
+
+    done = [t for t in tasks if t["state"] == "done"]
+    if done:
+        first = min(t["started_at"] for t in tasks if t["started_at"])
+        elapsed = max(max(t["finished_at"] for t in done) - first, 1e-9)
+        cards = sum(t["cards"] or 0 for t in done)
+        print(f"  → Overall: {len(done)} tasks, {cards} cards in {elapsed / 60:.1f} min "
+              f"({len(done) / elapsed * 60:.1f} tasks/min, {cards / elapsed * 60:.0f} cards/min)")
+
+        recent = [t for t in done if t["finished_at"] >= now - window]
+        rate = len(recent) / min(window, max(now - first, 1e-9))
+        print(f"  → Last {window / 60:.0f} min: {len(recent)} tasks, {sum(t['cards'] or 0 for t in recent)} cards "
+              f"({rate * 60:.1f} tasks/min)")
+        remaining = states["pending"] + states["leased"]
+        if remaining and rate:
+            more = " (more once every university is listed)" if len(listed) < len(universities) else ""
+            print(f"  → {remaining} tasks left, about {remaining / rate / 60:.0f} min at the recent rate{more}")
+
+        per_worker = Counter(t["finished_by"] for t in recent)
+        leases = {t["lease_owner"]: t for t in tasks if t["state"] == "leased"}
+        if per_worker or leases:
+            print(f"  → Workers (tasks finished in the last {window / 60:.0f} min, current task):")
+            for name in sorted(set(per_worker) | set(leases)):
+                current = task_label(leases[name]) if name in leases else "-"
+                print(f"     {name:<32} {per_worker[name]:>5}  {current}")
+
+    stragglers = find_stragglers(tasks, now, factor)
+    if stragglers:
+        print("  → Stragglers:")
+        for t, reason in stragglers:
+            print(f"     {task_label(t)}: {reason}")
+
+    failed = [t for t in tasks if t["state"] == "failed"]
+    if failed:
+        print("  → Failed (`retry` re-queues them):")
+        for t in failed:
+            print(f"     {task_label(t)}: {t['error']}")
+
+
+# -------------------------------------------
+# Export the sink to professors.jsonl
+# -------------------------------------------
+def export(queue, path):
+    """
+    Merge the stored cards per university with crawl_output.merge_professor
+    and append them to path via crawl_output.write_professors (fresh IDs),
+    so the output matches a single-process crawl. Returns the professors
+    written.
+    """
+    lock = threading.Lock()
+    total = 0
+    current, professors = None, {}
+    for uni, major, card in queue.iter_results():
+        if uni != current:
+            if professors:
+                total += crawl_output.write_professors(professors, path)
+            current, professors = uni, {}
+        crawl_output.merge_professor(professors, lock, uni, crawl_output.clean_major(major), tuple(card))
+    if professors:
+        total += crawl_output.write_professors(professors, path)
+    return total
+
+
+def read_universities(args):
+    universities = list(args.universities)
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as f:
+            universities += [line.strip() for line in f if line.strip()]
+    if not universities:
+        import scraper
+
+        universities = scraper.UNIVERSITIES
+    return universities
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Leased crawl work queue shared by several scraper processes/hosts")
+    parser.add_argument("--queue", default=os.environ.get("CRAWL_QUEUE", QUEUE_DB),
+                        help="SQLite file, or a mongodb:// URL for workers on several machines (env CRAWL_QUEUE)")
+    parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS,
+                        help="Claims per task before it is marked failed")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    seed = sub.add_parser("seed", help="Queue a listing task per university")
+    seed.add_argument("universities", nargs="*", help="University names (default: scraper.UNIVERSITIES)")
+    seed.add_argument("--file", help="Also read university names from this file, one per line")
+    seed.add_argument("--fresh", action="store_true", help="Drop every task and stored result first")
+
+    work = sub.add_parser("work", help="Claim and run tasks until the queue is drained")
+    work.add_argument("--workers", type=int, default=1, help="Worker processes on this machine")
+    work.add_argument("--lease", type=float, default=LEASE_SECONDS, help="Lease length in seconds")
+    work.add_argument("--max-tasks", type=int, help="Stop each worker after this many tasks")
+    work.add_argument("--headed", action="store_true", help="Show the browser windows")
+    work.add_argument("--browser-cdp", help="Attach to this browser (CDP URL) instead of launching one per worker")
+    work.add_argument("--search-url", help="Crawl this search page instead (e.g. benchmarks/fixture_site.py)")
+
+    status = sub.add_parser("status", help="Throughput, workers, stragglers and failures")
+    status.add_argument("--window", type=float, default=THROUGHPUT_WINDOW, help="Seconds behind the recent rate")
+    status.add_argument("--factor", type=float, default=STRAGGLER_FACTOR,
+                        help="Report leased tasks running this many times the median")
+    status.add_argument("--watch", type=float, help="Repeat every this many seconds until the queue is drained")
+
+    sub.add_parser("retry", help="Put failed tasks back in the queue")
+
+    export_cmd = sub.add_parser("export", help="Append the merged results to a professors JSONL file")
+    export_cmd.add_argument("-o", "--output", default="professors.jsonl")
+    args = parser.parse_args()
+
+    if args.command == "work":
+        run_workers(args.workers, queue_url=args.queue, lease_seconds=args.lease, max_attempts=args.max_attempts,
+                    headless=not args.headed, cdp_url=args.browser_cdp, search_url=args.search_url,
+                    max_tasks=args.max_tasks)
+    else:
+        queue = open_queue(args.queue, args.max_attempts)
+        if args.command == "seed":
+            if args.fresh:
+                queue.reset()
+            print(f"Queued {queue.seed(read_universities(args))} universities in {args.queue}")
+        elif args.command == "status":
+            while True:
+                report(queue, args.window, args.factor)
+                if not args.watch or not queue.remaining():
+                    break
+                time.sleep(args.watch)
+                print()
+        elif args.command == "retry":
+            print(f"Re-queued {queue.retry_failed()} failed tasks")
+        else:
+            print(f"Wrote {export(queue, args.output)} professors to {args.output}")
+        queue.close()